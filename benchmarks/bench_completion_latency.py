@@ -0,0 +1,172 @@
+"""Prompt completion latency: /history polling vs. the /ws event stream
+
+Usage:
+    python benchmarks/bench_completion_latency.py --jobs 20 --history 5000
+
+Starts a local fake ComfyUI (``/prompt``, ``/history``, ``/history/<id>``,
+``/progress`` and a minimal ``/ws`` endpoint) that finishes each prompt after
+a random delay, with ``--history`` old entries in its history to mimic a
+server that has been up for a while. Measures the gap between the job
+finishing on the server and the client noticing, for the original 1 s
+polling loop and for ComfyUIAPI.wait_for_prompt.
+"""
+import os
+import sys
+import json
+import time
+import uuid
+import base64
+import random
+import struct
+import hashlib
+import argparse
+import importlib
+import threading
+import types
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+import requests
+
+# Import the node package's API module without running its ComfyUI-only __init__
+REPO_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+package = types.ModuleType('xobiomesh')
+package.__path__ = [REPO_DIR]
+sys.modules['xobiomesh'] = package
+ComfyUIAPI = importlib.import_module('xobiomesh.xO_comfyui_api').ComfyUIAPI
+
+WS_GUID = "258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+
+class FakeComfyUI:
+    def __init__(self, history_size, job_range):
+        self.history = {uuid.uuid4().hex: {'outputs': {'9': {'images': [{'filename': f'old_{i}.png'}]}},
+                                           'status': {'status_str': 'success'}} for i in range(history_size)}
+        self.job_range = job_range
+        self.finished_at = {}
+        self.clients = {}  # client_id -> socket
+        self.lock = threading.Lock()
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def log_message(self, *args):
+                pass
+
+            def reply(self, payload):
+                body = json.dumps(payload).encode()
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_GET(self):
+                if self.path.startswith('/ws'):
+                    return fake.upgrade(self)
+                if self.path.startswith('/history/'):
+                    prompt_id = self.path[len('/history/'):]
+                    with fake.lock:
+                        entry = fake.history.get(prompt_id)
+                    return self.reply({prompt_id: entry} if entry else {})
+                if self.path == '/history':
+                    with fake.lock:
+                        return self.reply(dict(fake.history))
+                if self.path == '/progress':
+                    return self.reply({'value': 0})
+                return self.reply({})
+
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+                prompt_id = uuid.uuid4().hex
+                delay = random.uniform(*fake.job_range)
+                threading.Timer(delay, fake.finish, (prompt_id, body.get('client_id'))).start()
+                self.reply({'prompt_id': prompt_id, 'number': 0})
+
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.server.daemon_threads = True
+        self.port = self.server.server_address[1]
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def upgrade(self, handler):
+        client_id = handler.path.partition('clientId=')[2]
+        key = handler.headers['Sec-WebSocket-Key']
+        accept = base64.b64encode(hashlib.sha1((key + WS_GUID).encode()).digest()).decode()
+        handler.send_response(101)
+        handler.send_header('Upgrade', 'websocket')
+        handler.send_header('Connection', 'Upgrade')
+        handler.send_header('Sec-WebSocket-Accept', accept)
+        handler.end_headers()
+        handler.wfile.flush()
+        with self.lock:
+            self.clients[client_id] = handler.connection
+        handler.close_connection = True
+        # Hold the handler thread until the client goes away
+        try:
+            while handler.connection.recv(1024):
+                pass
+        except OSError:
+            pass
+
+    def send(self, client_id, event):
+        sock = self.clients.get(client_id)
+        if not sock:
+            return
+        payload = json.dumps(event).encode()
+        header = bytes([0x81]) + (bytes([len(payload)]) if len(payload) < 126 else bytes([126]) + struct.pack('>H', len(payload)))
+        try:
+            sock.sendall(header + payload)
+        except OSError:
+            pass
+
+    def finish(self, prompt_id, client_id):
+        with self.lock:
+            self.history[prompt_id] = {'outputs': {'9': {'images': [{'filename': f'{prompt_id}.png'}]}},
+                                       'status': {'status_str': 'success'}}
+            self.finished_at[prompt_id] = time.perf_counter()
+        self.send(client_id, {'type': 'executing', 'data': {'node': None, 'prompt_id': prompt_id}})
+
+def legacy_wait(base_url, prompt_id, timeout=300):
+    """The original wait_for_prompt: /progress and the full /history once a second"""
+    start = time.time()
+    while time.time() - start < timeout:
+        requests.get(f"{base_url}/progress").json()
+        history = requests.get(f"{base_url}/history").json().get(prompt_id)
+        if history and 'outputs' in history:
+            return history
+        time.sleep(1)
+
+def measure(fake, jobs, wait):
+    api = ComfyUIAPI(port=fake.port)
+    lags = []
+    try:
+        for _ in range(jobs):
+            prompt_id = api.submit_prompt({'1': {'class_type': 'Noop', 'inputs': {}}})['prompt_id']
+            wait(api, prompt_id)
+            lags.append(time.perf_counter() - fake.finished_at[prompt_id])
+    finally:
+        api.close()
+    lags.sort()
+    return lags
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--jobs', type=int, default=20)
+    parser.add_argument('--history', type=int, default=5000, help='Old prompts already in the server history')
+    parser.add_argument('--min-job', type=float, default=0.2)
+    parser.add_argument('--max-job', type=float, default=1.5)
+    args = parser.parse_args()
+
+    fake = FakeComfyUI(args.history, (args.min_job, args.max_job))
+    runs = [
+        ('polling (original)', lambda api, prompt_id: legacy_wait(api.base_url, prompt_id)),
+        ('websocket', lambda api, prompt_id: api.wait_for_prompt(prompt_id)),
+    ]
+    print(f"{args.jobs} jobs of {args.min_job}-{args.max_job}s, {args.history} entries in /history")
+    for name, wait in runs:
+        lags = measure(fake, args.jobs, wait)
+        mean = sum(lags) / len(lags)
+        print(f"{name:20s} completion lag mean {mean * 1000:7.1f} ms   "
+              f"p50 {lags[len(lags) // 2] * 1000:7.1f} ms   max {lags[-1] * 1000:7.1f} ms")
+
+if __name__ == '__main__':
+    main()
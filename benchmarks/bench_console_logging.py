@@ -0,0 +1,137 @@
+"""Per-log-call overhead of the console stream with 0, 10 and 100 subscribers
+
+Usage:
+    python benchmarks/bench_console_logging.py --calls 20000
+
+Compares the original formatter, which wrote every record to every
+/api/console socket inside the logging call, with the ring buffer and
+background ConsoleBroadcaster (batches fanned out through the asyncio SSE hub).
+Subscribers are local socket pairs drained by one reader thread.
+"""
+import os
+import sys
+import json
+import time
+import socket
+import logging
+import argparse
+import selectors
+import threading
+from datetime import datetime
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'gallery_server'))
+
+from console_stream import ConsoleBroadcaster
+from sse_hub import SSEHub
+
+class Drain(threading.Thread):
+    """Reads and discards everything the subscribers are sent"""
+
+    def __init__(self):
+        super().__init__(daemon=True)
+        self.selector = selectors.DefaultSelector()
+        self.received = 0
+        self.start()
+
+    def add(self, sock):
+        self.selector.register(sock, selectors.EVENT_READ)
+
+    def run(self):
+        while True:
+            if not self.selector.get_map():
+                time.sleep(0.01)
+                continue
+            for key, _ in self.selector.select(timeout=0.1):
+                try:
+                    data = key.fileobj.recv(65536)
+                except OSError:
+                    data = b''
+                if not data:
+                    self.selector.unregister(key.fileobj)
+                self.received += len(data)
+
+class LegacyFormatter(logging.Formatter):
+    """The pre-broadcaster behaviour: synchronous write to every client per record"""
+
+    def __init__(self, clients):
+        super().__init__('%(asctime)s - %(levelname)s - %(message)s')
+        self.clients = clients
+
+    def format(self, record):
+        console_data = {
+            'time': datetime.fromtimestamp(record.created).strftime('%Y-%m-%d %H:%M:%S'),
+            'level': record.levelname,
+            'message': record.msg
+        }
+        for client in self.clients:
+            client.write(f"data: {json.dumps(console_data)}\n\n".encode())
+            client.flush()
+        return super().format(record)
+
+class BroadcasterFormatter(logging.Formatter):
+    def __init__(self, broadcaster):
+        super().__init__('%(asctime)s - %(levelname)s - %(message)s')
+        self.broadcaster = broadcaster
+
+    def format(self, record):
+        self.broadcaster.push(record)
+        return super().format(record)
+
+def make_logger(name, formatter):
+    logger = logging.Logger(name)
+    handler = logging.StreamHandler(open(os.devnull, 'w'))
+    handler.setFormatter(formatter)
+    logger.addHandler(handler)
+    return logger
+
+def time_calls(logger, calls):
+    start = time.perf_counter()
+    for i in range(calls):
+        logger.info(f"📋 Benchmark record {i}")
+    return (time.perf_counter() - start) / calls
+
+def run_legacy(subscribers, calls, drain):
+    clients = []
+    for _ in range(subscribers):
+        ours, theirs = socket.socketpair()
+        drain.add(theirs)
+        clients.append(ours.makefile('wb', buffering=0))
+    try:
+        return time_calls(make_logger(f'legacy{subscribers}', LegacyFormatter(clients)), calls)
+    finally:
+        for client in clients:
+            client.close()
+
+def run_broadcaster(subscribers, calls, drain):
+    hub = SSEHub()
+    broadcaster = ConsoleBroadcaster()
+    broadcaster.hub = hub
+    for _ in range(subscribers):
+        ours, theirs = socket.socketpair()
+        drain.add(theirs)
+        hub.reserve()
+        hub.adopt('console', ours)
+    while hub.stats()['channels'].get('console', 0) < subscribers:
+        time.sleep(0.01)
+    per_call = time_calls(make_logger(f'broadcaster{subscribers}', BroadcasterFormatter(broadcaster)), calls)
+    # Let the last batch go out before the next round
+    time.sleep(broadcaster.interval * 3)
+    hub.close()
+    return per_call
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--calls', type=int, default=20000)
+    args = parser.parse_args()
+
+    drain = Drain()
+    baseline = time_calls(make_logger('baseline', logging.Formatter('%(asctime)s - %(levelname)s - %(message)s')), args.calls)
+    print(f"plain logging: {baseline * 1e6:8.2f} us/call")
+    for subscribers in (0, 10, 100):
+        legacy = run_legacy(subscribers, args.calls, drain)
+        batched = run_broadcaster(subscribers, args.calls, drain)
+        print(f"{subscribers:>3} subscribers: legacy {legacy * 1e6:8.2f} us/call   "
+              f"broadcaster {batched * 1e6:8.2f} us/call")
+
+if __name__ == '__main__':
+    main()
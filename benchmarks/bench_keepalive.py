@@ -0,0 +1,86 @@
+"""Requests/sec against a running gallery server, one connection per request vs. persistent connections
+
+Usage:
+    python benchmarks/bench_keepalive.py --url http://127.0.0.1:8200 --clients 6 --requests 2000
+
+Fetches the first page of /api/images and then requests its thumbnails the
+way a browser tab does: ``--clients`` parallel connections (browsers open 6
+per host). "per-request" sends ``Connection: close`` so every request pays
+a TCP setup and a fresh worker dispatch, which is what the server did when it
+spoke HTTP/1.0; "keep-alive" reuses each connection.
+"""
+import json
+import time
+import argparse
+import threading
+import http.client
+from urllib.parse import urlparse
+
+def discover_paths(host, port, limit):
+    conn = http.client.HTTPConnection(host, port, timeout=30)
+    conn.request('GET', f'/api/images?limit={limit}')
+    response = conn.getresponse()
+    data = json.loads(response.read())
+    conn.close()
+    images = data['images'] if isinstance(data, dict) else data
+    paths = [image['thumbnail'] for image in images if image.get('thumbnail')]
+    return paths or ['/api/server-stats']
+
+def run_client(host, port, paths, count, keep_alive, results, index):
+    conn = None
+    done = errors = 0
+    for i in range(count):
+        path = paths[(index * count + i) % len(paths)]
+        try:
+            if conn is None:
+                conn = http.client.HTTPConnection(host, port, timeout=30)
+            headers = {} if keep_alive else {'Connection': 'close'}
+            conn.request('GET', path, headers=headers)
+            response = conn.getresponse()
+            response.read()
+            done += 1
+            if not keep_alive or response.will_close:
+                conn.close()
+                conn = None
+        except (OSError, http.client.HTTPException):
+            errors += 1
+            if conn:
+                conn.close()
+            conn = None
+    if conn:
+        conn.close()
+    results[index] = (done, errors)
+
+def measure(host, port, paths, clients, total, keep_alive):
+    per_client = max(1, total // clients)
+    results = [None] * clients
+    threads = [threading.Thread(target=run_client, args=(host, port, paths, per_client, keep_alive, results, i))
+               for i in range(clients)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+    done = sum(r[0] for r in results)
+    errors = sum(r[1] for r in results)
+    return done / elapsed, errors, elapsed
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--url', default='http://127.0.0.1:8200')
+    parser.add_argument('--clients', type=int, default=6)
+    parser.add_argument('--requests', type=int, default=2000)
+    parser.add_argument('--page', type=int, default=200, help='Images whose thumbnails are requested')
+    args = parser.parse_args()
+
+    url = urlparse(args.url)
+    host, port = url.hostname, url.port or 80
+    paths = discover_paths(host, port, args.page)
+    print(f"{args.requests} requests over {args.clients} clients, {len(paths)} distinct paths")
+    for name, keep_alive in (('per-request', False), ('keep-alive', True)):
+        rate, errors, elapsed = measure(host, port, paths, args.clients, args.requests, keep_alive)
+        print(f"{name:12s} {rate:9.0f} req/s   {elapsed:6.2f} s   errors {errors}")
+
+if __name__ == '__main__':
+    main()
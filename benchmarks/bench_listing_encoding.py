@@ -0,0 +1,58 @@
+"""Size and encode time of an image listing: plain JSON vs. columnar, uncompressed vs. gzip/brotli
+
+Usage:
+    python benchmarks/bench_listing_encoding.py --images 20000 --folders 40
+
+Builds a synthetic /api/images listing shaped like ImageCatalog entries (nested
+date folders, ComfyUI-style file names, content-addressed thumbnails) and
+reports the body size for every format/encoding combination the server offers.
+"""
+import os
+import sys
+import json
+import time
+import random
+import argparse
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'gallery_server'))
+from compression import to_columns, compress, supported_encodings
+
+def synthetic_listing(count, folders):
+    started = datetime(2024, 1, 1)
+    folder_names = [f"renders/{started + timedelta(days=i):%Y-%m-%d}/batch_{i % 7}/" for i in range(folders)]
+    images = []
+    for i in range(count):
+        name = f"ComfyUI_{i:05d}_.png"
+        images.append({
+            'path': random.choice(folder_names) + name,
+            'name': name,
+            'date': (started + timedelta(seconds=37 * i)).strftime('%Y-%m-%d %H:%M:%S'),
+            'size': random.randint(400_000, 3_000_000),
+            'thumbnail': f"/thumbnails/{random.getrandbits(128):032x}.jpg"
+        })
+    return images
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--images', type=int, default=20000)
+    parser.add_argument('--folders', type=int, default=40)
+    args = parser.parse_args()
+
+    images = synthetic_listing(args.images, args.folders)
+    bodies = {
+        'json': json.dumps(images).encode(),
+        'columns': json.dumps(to_columns(images)).encode(),
+    }
+    baseline = len(bodies['json'])
+    print(f"{args.images} images in {args.folders} folders")
+    for name, body in bodies.items():
+        for encoding in (None,) + supported_encodings():
+            started = time.perf_counter()
+            encoded = compress(body, encoding)
+            elapsed = time.perf_counter() - started
+            print(f"{name:8s} {encoding or 'identity':9s} {len(encoded) / 1024:9.0f} KiB   "
+                  f"{baseline / len(encoded):5.1f}x smaller   {elapsed * 1000:6.1f} ms")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,120 @@
+"""Thumbnail throughput and peak memory: reduced-decode path vs the original full decode
+
+Usage:
+    python benchmarks/bench_thumbnails.py --count 12 --width 6144 --height 6144
+
+A synthetic directory of large PNG and JPEG images is created (or reused with
+--dir), then each implementation runs in a fresh process so its peak RSS is
+reported on its own.
+"""
+import os
+import sys
+import time
+import shutil
+import argparse
+import tempfile
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'gallery_server'))
+
+from PIL import Image
+import thumbnails
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+def legacy_thumbnail(image_path, cache_dir):
+    """The pre-fast-path implementation: full decode, convert, then LANCZOS"""
+    size = thumbnails.THUMBNAIL_SIZE
+    thumb_path = os.path.join(cache_dir, os.path.basename(image_path) + '.jpg')
+    with Image.open(image_path) as img:
+        if img.mode in ('RGBA', 'P'):
+            img = img.convert('RGB')
+        aspect = img.width / img.height
+        if aspect > 1:
+            new_width, new_height = size[0], int(size[0] / aspect)
+        else:
+            new_width, new_height = int(size[1] * aspect), size[1]
+        img.thumbnail((new_width, new_height), Image.Resampling.LANCZOS, reducing_gap=None)
+        thumb = Image.new('RGB', size, (0, 0, 0))
+        thumb.paste(img, ((size[0] - new_width) // 2, (size[1] - new_height) // 2))
+        thumb.save(thumb_path, 'JPEG', quality=85, optimize=True)
+    return thumb_path
+
+def fast_thumbnail(image_path, cache_dir):
+    return thumbnails.generate_thumbnail(image_path, cache_dir)
+
+IMPLEMENTATIONS = {
+    'legacy': legacy_thumbnail,
+    'fast': fast_thumbnail,
+}
+
+def peak_rss_mb():
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is bytes on macOS and kilobytes elsewhere
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+def run_implementation(name, images, cache_dir):
+    """Runs inside a fresh worker process"""
+    func = IMPLEMENTATIONS[name]
+    start = time.perf_counter()
+    for path in images:
+        func(path, cache_dir)
+    elapsed = time.perf_counter() - start
+    return elapsed, peak_rss_mb()
+
+def make_images(directory, count, width, height):
+    os.makedirs(directory, exist_ok=True)
+    images = []
+    # A smooth gradient with noise on top compresses like a real render
+    base = Image.linear_gradient('L').resize((width, height))
+    noise = Image.effect_noise((width, height), 64)
+    rgb = Image.merge('RGB', (base, noise, base.transpose(Image.Transpose.FLIP_LEFT_RIGHT)))
+    for i in range(count):
+        if i % 2:
+            path = os.path.join(directory, f'synthetic_{i:03d}.jpg')
+            if not os.path.exists(path):
+                rgb.save(path, 'JPEG', quality=92)
+        else:
+            path = os.path.join(directory, f'synthetic_{i:03d}.png')
+            if not os.path.exists(path):
+                rgba = rgb.copy()
+                rgba.putalpha(255)
+                rgba.save(path, 'PNG', compress_level=1)
+        images.append(path)
+    return images
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--count', type=int, default=12)
+    parser.add_argument('--width', type=int, default=6144)
+    parser.add_argument('--height', type=int, default=6144)
+    parser.add_argument('--dir', help='Reuse (or create) the synthetic images here instead of a temp dir')
+    args = parser.parse_args()
+
+    image_dir = args.dir or tempfile.mkdtemp(prefix='xo_thumb_bench_')
+    print(f"Preparing {args.count} images of {args.width}x{args.height} in {image_dir}")
+    images = make_images(image_dir, args.count, args.width, args.height)
+
+    for name in IMPLEMENTATIONS:
+        cache_dir = tempfile.mkdtemp(prefix=f'xo_thumb_{name}_')
+        try:
+            # Spawn (not fork) so the child does not inherit the generator's memory
+            with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context('spawn')) as executor:
+                elapsed, peak = executor.submit(run_implementation, name, images, cache_dir).result()
+        finally:
+            shutil.rmtree(cache_dir, ignore_errors=True)
+        rate = len(images) / elapsed if elapsed else float('inf')
+        peak_text = f"{peak:8.1f} MB" if peak is not None else "     n/a"
+        print(f"{name:>8}: {rate:7.2f} thumbnails/sec  peak RSS {peak_text}  ({elapsed:.2f}s total)")
+
+    if not args.dir:
+        shutil.rmtree(image_dir, ignore_errors=True)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,93 @@
+"""Throughput and memory of the streaming ZIP export
+
+Usage:
+    python benchmarks/bench_zip_export.py --files 5000 --size 1.5
+    python benchmarks/bench_zip_export.py --url http://127.0.0.1:8200 --folder 2024-06-01
+
+Without ``--url``, writes ``--files`` random PNG-sized files to a temporary
+directory and streams them through stream_zip/ChunkedWriter into a sink that
+only counts bytes, reporting MB/s and the peak Python heap (tracemalloc). With
+``--url``, downloads ``/api/export`` from a running gallery server instead.
+"""
+import os
+import sys
+import time
+import shutil
+import argparse
+import tempfile
+import tracemalloc
+import http.client
+from urllib.parse import urlparse, urlencode
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'gallery_server'))
+from zip_export import ChunkedWriter, stream_zip
+
+class CountingSink:
+    def __init__(self):
+        self.bytes = 0
+
+    def write(self, data):
+        self.bytes += len(data)
+        return len(data)
+
+    def flush(self):
+        pass
+
+def bench_local(files, size_mb):
+    root = tempfile.mkdtemp(prefix='zip-export-')
+    try:
+        block = os.urandom(int(size_mb * 1024 * 1024))
+        entries = []
+        for i in range(files):
+            path = os.path.join(root, f"ComfyUI_{i:05d}_.png")
+            with open(path, 'wb') as f:
+                f.write(block)
+            entries.append((f"batch/ComfyUI_{i:05d}_.png", path))
+
+        sink = CountingSink()
+        tracemalloc.start()
+        started = time.perf_counter()
+        writer = ChunkedWriter(sink)
+        count, total = stream_zip(writer, iter(entries))
+        writer.close()
+        elapsed = time.perf_counter() - started
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        print(f"{count} files, {total / 1024 ** 2:.0f} MB in {elapsed:.2f} s = {total / 1024 ** 2 / elapsed:.0f} MB/s, "
+              f"peak heap {peak / 1024 ** 2:.1f} MB, {sink.bytes / 1024 ** 2:.0f} MB on the wire")
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+def bench_server(url, folder, since, until):
+    parsed = urlparse(url)
+    conn = http.client.HTTPConnection(parsed.hostname, parsed.port or 80, timeout=60)
+    query = urlencode({k: v for k, v in (('folder', folder), ('since', since), ('until', until)) if v})
+    started = time.perf_counter()
+    conn.request('GET', f'/api/export?{query}')
+    response = conn.getresponse()
+    total = 0
+    while True:
+        chunk = response.read(1024 * 1024)
+        if not chunk:
+            break
+        total += len(chunk)
+    elapsed = time.perf_counter() - started
+    print(f"HTTP {response.status}: {total / 1024 ** 2:.0f} MB in {elapsed:.2f} s = {total / 1024 ** 2 / elapsed:.0f} MB/s")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--files', type=int, default=5000)
+    parser.add_argument('--size', type=float, default=1.5, help='MB per file')
+    parser.add_argument('--url')
+    parser.add_argument('--folder')
+    parser.add_argument('--since')
+    parser.add_argument('--until')
+    args = parser.parse_args()
+
+    if args.url:
+        bench_server(args.url, args.folder, args.since, args.until)
+    else:
+        bench_local(args.files, args.size)
+
+if __name__ == '__main__':
+    main()
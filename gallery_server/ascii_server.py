@@ -1,6 +1,6 @@
 import os
 import logging
-from http.server import HTTPServer, SimpleHTTPRequestHandler
+from http.server import SimpleHTTPRequestHandler
 import webbrowser
 from datetime import datetime
 import sys
@@ -9,20 +9,37 @@ import time
 from watchdog.observers import Observer
 from watchdog.events import FileSystemEventHandler
 import threading
-from PIL import Image
 import io
 import hashlib
+import itertools
 from email.utils import formatdate
 import socket
+import select
 import mimetypes
 import shutil
-from urllib.parse import unquote
+from urllib.parse import unquote, urlparse, parse_qs
 import subprocess
 import requests
-from queue import Queue
+from queue import Empty
 import glob
 from ollama import Client
 from collections import defaultdict
+from thumbnails import ThumbnailPool, VariantUnavailable, VARIANT_FORMATS, variant_filename, snap_variant_size, choose_variant_format
+from thumbnail_cache import ThumbnailCache
+from sprite_sheets import SpriteSheets, MAX_SPRITE_TILES
+from server_pool import ThreadedHTTPServer, MAX_KEEPALIVE_REQUESTS
+from sse_hub import SSEHub
+from console_stream import ConsoleBroadcaster
+from event_coalescer import EventCoalescer
+from http_utils import parse_range, file_etag, etag_matches, not_modified_since, encoded_etag, identity_etag
+from compression import PrecompressedCache, choose_encoding, compress, to_columns, COMPRESSION_THRESHOLD
+from image_catalog import ImageCatalog, IMAGE_EXTENSIONS, DEFAULT_PAGE_SIZE, parse_date_bound
+from text_index import TextFileIndex, TEXT_EXTENSIONS
+from search_index import SearchIndex, DEFAULT_SEARCH_LIMIT
+from workflow_cache import WorkflowCache
+from zip_export import ChunkedWriter, stream_zip
+from bulk_jobs import JobQueue, BulkOperations
+from backend_pool import BackendPool, NoBackendAvailable, parse_backends, DEFAULT_BACKENDS
 
 # Configure logging with colors for better visibility
 class ColorFormatter(logging.Formatter):
@@ -37,39 +54,11 @@ class ColorFormatter(logging.Formatter):
 
     def format(self, record):
         color = self.COLORS.get(record.levelname, self.COLORS['RESET'])
-        formatted_time = datetime.fromtimestamp(record.created).strftime('%Y-%m-%d %H:%M:%S')
         message = f"{color}{record.msg}{self.COLORS['RESET']}"
         
-        # Add to console queue with size limit
+        # Buffer for console clients; the broadcaster thread does the network I/O
         try:
-            console_data = {
-                'time': formatted_time,
-                'level': record.levelname,
-                'message': record.msg
-            }
-            
-            # Remove oldest message if queue is full
-            if console_queue.full():
-                try:
-                    console_queue.get_nowait()
-                except:
-                    pass
-            
-            console_queue.put(console_data)
-            
-            # Notify console clients
-            dead_clients = set()
-            for client in connection_manager.console_clients:
-                try:
-                    client.write(f"data: {json.dumps(console_data)}\n\n".encode())
-                    client.flush()
-                except:
-                    dead_clients.add(client)
-            
-            # Remove dead clients
-            for client in dead_clients:
-                connection_manager.remove_client(client, is_console=True)
-                
+            console_broadcaster.push(record)
         except:
             pass
         
@@ -91,8 +80,15 @@ for handler in logging.getLogger().handlers:
 
 # Global variables
 MAX_CONSOLE_MESSAGES = 1000
-MAX_CLIENTS = 100
+MAX_CLIENTS = 100  # Concurrent SSE streams (/events + /api/console)
+POOL_WORKERS = 32  # Threads serving regular HTTP requests
+POOL_QUEUE_SIZE = 256  # Accepted connections waiting for a worker before we answer 503
+REQUEST_TIMEOUT = 30  # Seconds a client may stall mid-request before its connection is dropped
+KEEPALIVE_GRACE = 0.002  # Seconds a worker waits for a follow-up request before parking the connection
 CLEANUP_INTERVAL = 300  # 5 minutes
+# 'asyncio' serves every SSE stream from one event loop; 'threads' keeps one blocked thread per stream
+SSE_MODE = os.environ.get('XO_GALLERY_SSE_MODE', 'asyncio')
+SSE_MAX_CLIENTS = int(os.environ.get('XO_GALLERY_SSE_MAX_CLIENTS', '10000'))  # Streams held by the asyncio hub
 
 # Add this new class for connection management
 class ConnectionManager:
@@ -142,123 +138,230 @@ class ConnectionManager:
 
 # Replace global variables with ConnectionManager
 connection_manager = ConnectionManager()
-console_queue = Queue(maxsize=MAX_CONSOLE_MESSAGES)
+console_broadcaster = ConsoleBroadcaster(MAX_CONSOLE_MESSAGES)
+sse_hub = None  # SSEHub when running in asyncio SSE mode
 
 # Add thumbnail configuration
-THUMBNAIL_SIZE = (250, 250)  # Size for thumbnails
-THUMBNAIL_CACHE_DIR = 'thumbnails'  # Directory to store thumbnails
+# Directory to store thumbnails (absolute, so it doesn't move with the launch directory)
+THUMBNAIL_CACHE_DIR = os.path.abspath(os.environ.get(
+    'XO_GALLERY_THUMBNAIL_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'thumbnails')))
+THUMBNAIL_CACHE_MAX_BYTES = int(os.environ.get('XO_GALLERY_THUMBNAIL_MAX_BYTES', 2 * 1024 ** 3))  # 0 = unlimited
+THUMBNAIL_CACHE_MAX_ENTRIES = int(os.environ.get('XO_GALLERY_THUMBNAIL_MAX_ENTRIES', '0'))  # 0 = unlimited
 REFRESH_INTERVAL = 10000  # Minimum time between image list refreshes in ms
+CATALOG_DB_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'gallery_catalog.db')
+
+# File events are batched: one SSE message per window, files only once fully written
+EVENT_WINDOW = float(os.environ.get('XO_GALLERY_EVENT_WINDOW', '1.0'))  # Seconds
+EVENT_SETTLE_TIME = float(os.environ.get('XO_GALLERY_EVENT_SETTLE', '0.5'))  # Seconds without size/mtime change
+
+# ComfyUI instances /api/run-workflow/ spreads prompts across (ports, host:port or URLs)
+COMFYUI_BACKENDS = os.environ.get('XO_GALLERY_COMFYUI_BACKENDS', DEFAULT_BACKENDS)
+
+# Where bulk "archive" jobs write their ZIPs (default: <ComfyUI>/output_archive, outside the watched tree)
+ARCHIVE_DIR = os.environ.get('XO_GALLERY_ARCHIVE_DIR')
 
-# Create thumbnail cache directory if it doesn't exist
-if not os.path.exists(THUMBNAIL_CACHE_DIR):
-    os.makedirs(THUMBNAIL_CACHE_DIR)
+# Number of thumbnail worker processes (0 = one per CPU core)
+THUMBNAIL_WORKERS = int(os.environ.get('XO_GALLERY_THUMBNAIL_WORKERS', '0'))
+
+# Persistent image index and thumbnail workers, created in run_standalone_server once output_dir is known
+catalog = None
+text_index = None
+search_index = None
+workflow_cache = None
+backend_pool = None
+thumbnail_cache = None
+thumbnail_pool = None
+sprite_sheets = None
+image_events = None
+bulk_operations = None
+bulk_jobs = None
+
+# Encoded /api/images, /api/text-files and /api/sprites bodies, keyed by their index-versioned ETag
+precompressed = PrecompressedCache()
 
 # Store conversation history per client
 conversation_histories = defaultdict()
 
+def is_image(path):
+    return path.lower().endswith(IMAGE_EXTENSIONS)
+
+def is_text(path):
+    return path.lower().endswith(TEXT_EXTENSIONS)
+
+def is_indexed(path):
+    return is_image(path) or is_text(path)
+
 class ImageChangeHandler(FileSystemEventHandler):
+    """Feeds watchdog events for images and text outputs to the coalescer; indexes update per batch"""
+
     def on_created(self, event):
-        if event.is_directory or not event.src_path.lower().endswith(('.png', '.jpg', '.jpeg', '.gif', '.webp')):
+        if not event.is_directory and is_indexed(event.src_path):
+            image_events.touched(event.src_path)
+
+    def on_modified(self, event):
+        if not event.is_directory and is_indexed(event.src_path):
+            image_events.touched(event.src_path)
+
+    def on_deleted(self, event):
+        if event.is_directory or is_indexed(event.src_path):
+            image_events.deleted(event.src_path)
+
+    def on_moved(self, event):
+        if event.is_directory:
+            image_events.moved_directory(event.src_path, event.dest_path)
             return
-            
-        try:
-            rel_path = os.path.relpath(event.src_path, output_dir).replace('\\', '/')
-            logging.info(f"🖼️ New image detected: {os.path.basename(event.src_path)}")
-            
-            image_data = {
-                'path': rel_path,
-                'name': os.path.basename(event.src_path),
-                'date': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-            }
-            
-            message = f"data: {json.dumps(image_data)}\n\n"
-            client_count = len(connection_manager.clients)
-            for client in list(connection_manager.clients):
-                try:
-                    client.write(message.encode())
-                    client.flush()
-                except:
-                    if client in connection_manager.clients:
-                        connection_manager.remove_client(client)
-                        
-            logging.info(f"📤 Notified {client_count} connected clients")
-            
-        except Exception as e:
-            logging.error(f"❌ Error handling new image: {e}")
+        if is_indexed(event.src_path):
+            image_events.deleted(event.src_path)
+        if is_indexed(event.dest_path):
+            # A rename lands a complete file, so there is nothing to wait for
+            image_events.touched(event.dest_path, settled=True)
 
-def generate_thumbnail(image_path):
-    """Generate a thumbnail for an image and cache it"""
+def apply_file_changes(upserts, removes, moves):
+    """Apply one coalesced batch of file events to the indexes and notify gallery clients once"""
     try:
-        # Ensure thumbnail directory exists
-        os.makedirs(THUMBNAIL_CACHE_DIR, exist_ok=True)
-        
-        # Generate unique thumbnail filename
-        mtime = os.path.getmtime(image_path)
-        hash_input = f"{image_path}{mtime}".encode('utf-8')
-        thumb_filename = hashlib.md5(hash_input).hexdigest() + '.jpg'
-        thumb_path = os.path.join(THUMBNAIL_CACHE_DIR, thumb_filename)
-        
-        # Check if thumbnail exists and is up to date
-        if os.path.exists(thumb_path):
-            thumb_mtime = os.path.getmtime(thumb_path)
-            if thumb_mtime >= mtime:
-                return thumb_filename
-        
-        # Generate new thumbnail
-        with Image.open(image_path) as img:
-            # Convert to RGB if necessary
-            if img.mode in ('RGBA', 'P'):
-                img = img.convert('RGB')
-            
-            # Calculate aspect ratio
-            aspect = img.width / img.height
-            if aspect > 1:
-                new_width = THUMBNAIL_SIZE[0]
-                new_height = int(THUMBNAIL_SIZE[0] / aspect)
-            else:
-                new_height = THUMBNAIL_SIZE[1]
-                new_width = int(THUMBNAIL_SIZE[1] * aspect)
-            
-            # Resize with proper aspect ratio
-            img.thumbnail((new_width, new_height), Image.Resampling.LANCZOS)
-            
-            # Create background
-            thumb = Image.new('RGB', THUMBNAIL_SIZE, (0, 0, 0))
-            # Paste resized image centered
-            x = (THUMBNAIL_SIZE[0] - new_width) // 2
-            y = (THUMBNAIL_SIZE[1] - new_height) // 2
-            thumb.paste(img, (x, y))
-            
-            # Save with optimization
-            thumb.save(thumb_path, 'JPEG', quality=85, optimize=True)
-            logging.info(f"Generated thumbnail: {thumb_path}")
-            
-        return thumb_filename
-        
+        removed = []
+        for full_path in removes:
+            text_index.remove(full_path)
+            search_index.remove(full_path)
+            if is_text(full_path):
+                continue
+            catalog.remove(full_path)
+            removed.append(catalog.rel_path(full_path))
+
+        for src_path, dest_path in moves:
+            for root, _, files in os.walk(dest_path):
+                upserts.extend(os.path.join(root, file) for file in files if is_indexed(file))
+
+        added = []
+        for full_path in upserts:
+            if is_text(full_path):
+                text_index.upsert(full_path)
+                search_index.upsert(full_path)
+                continue
+            rel_path = catalog.upsert(full_path)
+            entry = rel_path and catalog.get(rel_path)
+            if entry:
+                added.append((entry, full_path))
+            elif rel_path is None and not os.path.exists(full_path):
+                removed.append(catalog.rel_path(full_path))
+
+        if not added and not removed:
+            return
+        message = {'added': [entry for entry, _ in added]}
+        if removed:
+            message['removed'] = removed
+        client_count = broadcast_event(message)
+        logging.info(f"🖼️ {len(added)} new or changed, {len(removed)} removed images; "
+                     f"notified {client_count} connected clients")
+
+        # Queue thumbnails only now, so their events can't overtake the batch that introduces the images
+        for entry, full_path in added:
+            thumbnail_pool.submit(entry['path'], full_path)
+        for entry, full_path in added:
+            search_index.upsert(full_path)
     except Exception as e:
-        logging.error(f"Error generating thumbnail for {image_path}: {str(e)}")
+        logging.error(f"❌ Error applying file changes: {e}")
+
+def broadcast_event(data, event=None):
+    """Push one SSE message to every /events client, returning how many were addressed"""
+    message = f"data: {json.dumps(data)}\n\n"
+    if event:
+        message = f"event: {event}\n" + message
+    if sse_hub:
+        return sse_hub.publish('events', message.encode())
+    clients = list(connection_manager.clients)
+    for client in clients:
+        try:
+            client.write(message.encode())
+            client.flush()
+        except:
+            if client in connection_manager.clients:
+                connection_manager.remove_client(client)
+    return len(clients)
+
+def on_thumbnail_ready(rel_path, thumb_filename):
+    """Record a finished thumbnail and tell the gallery it can swap out the placeholder"""
+    catalog.set_thumbnail(rel_path, thumb_filename)
+    broadcast_event({
+        'path': rel_path,
+        'thumbnail': f'/thumbnails/{thumb_filename}'
+    }, event='thumbnail')
+
+def get_thumbnail_variant(thumb_filename, edge, fmt):
+    """Return the cache path of a resized variant, generating it on first request"""
+    thumb_path = thumbnail_cache.lookup(variant_filename(thumb_filename, edge, fmt))
+    if thumb_path:
+        return thumb_path
+    rel_path = catalog.path_for_thumbnail(thumb_filename)
+    if not rel_path:
         return None
+    return thumbnail_pool.variant(catalog.full_path(rel_path), thumb_filename, edge, fmt)
+
+def export_selection(selection):
+    """``(arcname, full_path)`` for an export request: explicit catalog ``paths``, or a folder/date/name filter
+
+    Raises ValueError for an empty or malformed selection. Filtered selections
+    are read from the catalog a page at a time while the archive is written.
+    """
+    paths = selection.get('paths')
+    if paths:
+        if not isinstance(paths, list):
+            raise ValueError('paths must be a list')
+        # Only catalogued images can be exported, which also keeps the paths inside output_dir
+        return ((entry['path'], catalog.full_path(entry['path']))
+                for entry in (catalog.get(str(path)) for path in dict.fromkeys(paths)) if entry)
+
+    filters = {
+        'folder': selection.get('folder') or None,
+        'since': parse_date_bound(selection.get('since')),
+        'until': parse_date_bound(selection.get('until')),
+        'name': selection.get('q') or None
+    }
+    if not any(value is not None for value in filters.values()):
+        raise ValueError('Select paths, or a folder and/or date range')
+    return ((entry['path'], catalog.full_path(entry['path'])) for entry in catalog.iter_images(**filters))
+
+def publish_job(job):
+    """Job progress goes out on /events as its own event type"""
+    broadcast_event(job, event='job')
+
+def on_thumbnails_evicted(thumb_filenames):
+    """Evicted thumbnails are regenerated lazily the next time their page is listed"""
+    catalog.clear_thumbnails(thumb_filenames)
+
+def collect_thumbnails():
+    """Drop cached thumbnails whose source image is no longer in the catalog"""
+    try:
+        thumbnail_cache.collect_garbage(catalog.thumbnail_names())
+    except Exception as e:
+        logging.error(f"❌ Error collecting thumbnails: {e}")
+
+def schedule_thumbnail_gc():
+    collect_thumbnails()
+    timer = threading.Timer(CLEANUP_INTERVAL, schedule_thumbnail_gc)
+    timer.daemon = True
+    timer.start()
+
+def build_catalog():
+    """Seed the catalog from disk, queue any thumbnails it is missing and start cache GC"""
+    try:
+        catalog.sync()
+        text_index.sync()
+        schedule_thumbnail_gc()
+        missing = catalog.missing_thumbnails()
+        if missing:
+            logging.info(f"🖼️ Queueing {len(missing)} missing thumbnails on {thumbnail_pool.workers} workers")
+        for rel_path in missing:
+            thumbnail_pool.submit(rel_path, catalog.full_path(rel_path))
+        # Last: a first full index reads every text file and PNG header
+        search_index.sync()
+    except Exception as e:
+        logging.error(f"❌ Error building image catalog: {e}")
 
 def get_image_list():
     """Get list of images in output directory"""
-    images = []
     try:
-        for root, _, files in os.walk(output_dir):
-            for file in files:
-                if file.lower().endswith(('.png', '.jpg', '.jpeg', '.gif', '.webp')):
-                    full_path = os.path.join(root, file)
-                    rel_path = os.path.relpath(full_path, output_dir).replace('\\', '/')
-                    
-                    # Generate thumbnail
-                    thumb_filename = generate_thumbnail(full_path)
-                    
-                    images.append({
-                        'path': rel_path,
-                        'name': file,
-                        'date': datetime.fromtimestamp(os.path.getmtime(full_path)).strftime('%Y-%m-%d %H:%M:%S'),
-                        'thumbnail': f'/thumbnails/{thumb_filename}' if thumb_filename else None
-                    })
-        return sorted(images, key=lambda x: x['date'], reverse=True)
+        return catalog.list_images()
     except Exception as e:
         logging.error(f"Error getting image list: {str(e)}")
         return []
@@ -292,10 +395,203 @@ class SSEHandler(threading.Thread):
         self.running = False
 
 class GalleryHandler(SimpleHTTPRequestHandler):
+    # Persistent connections: every response carries Content-Length (or closes the connection)
+    protocol_version = 'HTTP/1.1'
+    timeout = REQUEST_TIMEOUT
+    # Headers and body go out in separate writes; with Nagle on, a reused connection stalls on delayed ACKs
+    disable_nagle_algorithm = True
+
     def __init__(self, *args, **kwargs):
         self.sse_handler = None
         super().__init__(*args, **kwargs)
 
+    def setup(self):
+        super().setup()
+        self.requests_served = self.server.requests_served(self.connection)
+
+    def handle(self):
+        """Serve requests while the client keeps sending them, then park the idle connection"""
+        self.close_connection = True
+        self.handle_one_request()
+        while not self.close_connection:
+            if not self.has_pending_input():
+                # Frees this worker; the server re-queues the connection when the next request arrives
+                self.server.park(self.connection, self.requests_served)
+                return
+            self.handle_one_request()
+
+    def has_pending_input(self):
+        """True if the next request is already buffered or readable, without blocking"""
+        timeout = self.connection.gettimeout()
+        try:
+            self.connection.settimeout(0)
+            if self.rfile.peek(1):
+                return True
+            # Browsers send the next thumbnail request right away; a short wait saves a park/wake round trip
+            return bool(select.select([self.connection], [], [], KEEPALIVE_GRACE)[0])
+        except (OSError, ValueError):
+            return False
+        finally:
+            self.connection.settimeout(timeout)
+
+    def send_response(self, code, message=None):
+        super().send_response(code, message)
+        self.requests_served += 1
+        if self.requests_served >= MAX_KEEPALIVE_REQUESTS:
+            self.send_header('Connection', 'close')
+
+    def is_not_modified(self, etag, mtime=None):
+        """Evaluate If-None-Match (preferred) or If-Modified-Since against a response's validators"""
+        if_none_match = self.headers.get('If-None-Match')
+        if if_none_match:
+            return etag_matches(if_none_match, etag)
+        if mtime is not None:
+            return not_modified_since(self.headers.get('If-Modified-Since'), mtime)
+        return False
+
+    def send_not_modified(self, etag, extra_headers=None):
+        # Echo the variant the client holds (e.g. the gzip one) rather than the identity ETag
+        for candidate in self.headers.get('If-None-Match', '').split(','):
+            if identity_etag(candidate.strip().removeprefix('W/')) == identity_etag(etag):
+                etag = candidate.strip()
+                break
+        self.send_response(304)
+        self.send_header('ETag', etag)
+        for name, value in (extra_headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+
+    def adopt_stream(self, channel, frames=()):
+        """Send SSE headers and hand the socket to the asyncio hub, freeing this worker"""
+        if not sse_hub.reserve():
+            self.send_error(503, 'Too many event stream clients')
+            return
+        try:
+            self.send_response(200)
+            self.send_header('Content-type', 'text/event-stream')
+            self.send_header('Cache-Control', 'no-cache')
+            self.send_header('Connection', 'keep-alive')
+            self.end_headers()
+            self.wfile.flush()
+            # The pool only closes the socket once this handler returns, so detaching after the hand-off is safe
+            sse_hub.adopt(channel, self.connection, frames)
+        except Exception:
+            # Client gone before the hand-off (or the hub is shutting down): give the slot back
+            sse_hub.release()
+            raise
+        self.close_connection = True
+        self.server.detach(self.connection)
+
+    def send_json(self, data, status=200, etag=None, cache_control='no-cache', precompress=False):
+        """Send a JSON body with an ETag, answering 304 when the client's copy is current
+
+        Pass ``etag`` when it can be derived without serializing (e.g. from the
+        catalog version); otherwise it is a hash of the body. Bodies over
+        COMPRESSION_THRESHOLD are gzip/brotli encoded when the client accepts it;
+        with ``precompress`` the encoded body is kept for ``send_precompressed``.
+        """
+        headers = {'Cache-Control': cache_control, 'Vary': 'Accept-Encoding'}
+        if etag and status == 200 and self.is_not_modified(etag):
+            self.send_not_modified(etag, headers)
+            return
+
+        body = json.dumps(data).encode()
+        if etag is None and status == 200:
+            etag = f'"{hashlib.md5(body).hexdigest()}"'
+            if self.is_not_modified(etag):
+                self.send_not_modified(etag, headers)
+                return
+
+        requested = choose_encoding(self.headers.get('Accept-Encoding'))
+        encoding = requested if len(body) >= COMPRESSION_THRESHOLD else None
+        if encoding:
+            body = compress(body, encoding)
+        if precompress and etag and status == 200:
+            precompressed.put(etag, requested, body, encoding)
+        self.write_json(body, status, etag, encoding, headers)
+
+    def send_precompressed(self, etag, cache_control='no-cache'):
+        """Answer from the precompressed cache; returns False on a miss so the caller builds the body"""
+        requested = choose_encoding(self.headers.get('Accept-Encoding'))
+        cached = precompressed.get(etag, requested)
+        if cached is None:
+            return False
+        body, encoding = cached
+        self.write_json(body, 200, etag, encoding, {'Cache-Control': cache_control, 'Vary': 'Accept-Encoding'})
+        return True
+
+    def write_json(self, body, status, etag, encoding, headers):
+        self.send_response(status)
+        self.send_header('Content-type', 'application/json')
+        self.send_header('Access-Control-Allow-Origin', '*')
+        self.send_header('Content-Length', str(len(body)))
+        if encoding:
+            self.send_header('Content-Encoding', encoding)
+        if etag:
+            self.send_header('ETag', encoded_etag(etag, encoding))
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.end_headers()
+        if self.command != 'HEAD':
+            self.wfile.write(body)
+
+    def send_file(self, file_path, content_type=None, extra_headers=None):
+        """Stream a file to the client with sendfile, honouring a single byte Range
+
+        Every response carries a strong ETag (size + mtime) and Last-Modified, and
+        conditional requests are answered with 304.
+        """
+        if content_type is None:
+            content_type, _ = mimetypes.guess_type(file_path)
+            if content_type is None:
+                content_type = 'application/octet-stream'
+
+        with open(file_path, 'rb') as f:
+            stat = os.fstat(f.fileno())
+            file_size = stat.st_size
+            etag = file_etag(stat)
+            validators = {'Last-Modified': formatdate(stat.st_mtime, usegmt=True), **(extra_headers or {})}
+            if self.is_not_modified(etag, stat.st_mtime):
+                self.send_not_modified(etag, validators)
+                return
+
+            # A Range only applies if the client's copy (If-Range) is still current
+            range_header = self.headers.get('Range')
+            if_range = self.headers.get('If-Range')
+            if range_header and if_range and if_range.strip() != etag:
+                range_header = None
+            try:
+                byte_range = parse_range(range_header, file_size)
+            except ValueError:
+                self.send_response(416)
+                self.send_header('Content-Range', f'bytes */{file_size}')
+                self.send_header('Content-Length', '0')
+                self.end_headers()
+                return
+
+            if byte_range:
+                start, end = byte_range
+                self.send_response(206)
+                self.send_header('Content-Range', f'bytes {start}-{end}/{file_size}')
+            else:
+                start, end = 0, file_size - 1
+                self.send_response(200)
+            length = end - start + 1
+
+            self.send_header('Content-type', content_type)
+            self.send_header('Content-Length', str(length))
+            self.send_header('Accept-Ranges', 'bytes')
+            self.send_header('ETag', etag)
+            for name, value in validators.items():
+                self.send_header(name, value)
+            self.end_headers()
+
+            if self.command == 'HEAD' or length <= 0:
+                return
+            self.wfile.flush()
+            # Zero-copy where the OS supports it; socket.sendfile falls back to chunked send()
+            self.connection.sendfile(f, offset=start, count=length)
+
     def do_GET(self):
         try:
             logging.info(f"Handling request for path: {self.path}")
@@ -334,11 +630,7 @@ class GalleryHandler(SimpleHTTPRequestHandler):
                         
                         logging.info(f"Found {len(models)} Ollama models")
                         
-                        self.send_response(200)
-                        self.send_header('Content-type', 'application/json')
-                        self.send_header('Access-Control-Allow-Origin', '*')
-                        self.end_headers()
-                        self.wfile.write(json.dumps(models).encode())
+                        self.send_json(models)
                         return
                         
                     else:
@@ -362,21 +654,13 @@ class GalleryHandler(SimpleHTTPRequestHandler):
             if self.path.startswith('/static/'):
                 try:
                     # Get the file path relative to the server directory
-                    file_path = os.path.join(os.path.dirname(__file__), self.path[1:])
+                    server_dir = os.path.dirname(os.path.abspath(__file__))
+                    static_dir = os.path.join(server_dir, 'static')
+                    file_path = os.path.abspath(os.path.join(server_dir, unquote(urlparse(self.path).path)[1:]))
                     
                     # Check if file exists and is within static directory
-                    if os.path.exists(file_path) and os.path.commonpath([file_path, os.path.join(os.path.dirname(__file__), 'static')]) == os.path.join(os.path.dirname(__file__), 'static'):
-                        # Get the content type based on file extension
-                        content_type, _ = mimetypes.guess_type(file_path)
-                        if content_type is None:
-                            content_type = 'application/octet-stream'
-                        
-                        self.send_response(200)
-                        self.send_header('Content-type', content_type)
-                        self.end_headers()
-                        
-                        with open(file_path, 'rb') as f:
-                            self.wfile.write(f.read())
+                    if os.path.isfile(file_path) and os.path.commonpath([file_path, static_dir]) == static_dir:
+                        self.send_file(file_path, extra_headers={'Cache-Control': 'no-cache'})
                         return
                     else:
                         self.send_error(404, 'File not found')
@@ -389,34 +673,144 @@ class GalleryHandler(SimpleHTTPRequestHandler):
             if self.path == '/':
                 logging.info("📄 Serving gallery page")
                 try:
-                    self.send_response(200)
-                    self.send_header('Content-type', 'text/html')
-                    self.end_headers()
-                    
                     # Get the path to index.html relative to this script
                     current_dir = os.path.dirname(os.path.abspath(__file__))
                     index_path = os.path.join(current_dir, 'index.html')
                     
-                    with open(index_path, 'rb') as f:
-                        self.wfile.write(f.read())
+                    self.send_file(index_path, 'text/html', {'Cache-Control': 'no-cache'})
                     logging.info("Successfully served index.html")
                 except Exception as e:
                     logging.error(f"Error serving index.html: {str(e)}")
                     raise
                     
-            elif self.path == '/api/images':
-                logging.info("📋 Client requested image list")
+            elif self.path.startswith('/api/sprites?'):
+                # One page of /api/images plus a sheet packing all its thumbnails: two requests instead of one per image
                 try:
-                    logging.info("Getting image list")
-                    images = get_image_list()
+                    parsed_url = urlparse(self.path)
+                    query = parse_qs(parsed_url.query)
+                    
+                    columnar = query.pop('format', [None])[0] == 'columns'
+                    
+                    query_hash = hashlib.md5(parsed_url.query.encode('utf-8')).hexdigest()[:12]
+                    etag = f'"sprites-{catalog.version_tag()}-{query_hash}"'
+                    if self.is_not_modified(etag):
+                        self.send_not_modified(etag, {'Cache-Control': 'no-cache'})
+                        return
+                    if self.send_precompressed(etag):
+                        return
                     
+                    try:
+                        images, next_cursor = catalog.query_images(
+                            limit=min(int(query.get('limit', [DEFAULT_PAGE_SIZE])[0]), MAX_SPRITE_TILES),
+                            cursor=query.get('cursor', [None])[0],
+                            folder=query.get('folder', [None])[0],
+                            since=parse_date_bound(query.get('since', [None])[0]),
+                            until=parse_date_bound(query.get('until', [None])[0]),
+                            name=query.get('q', [None])[0]
+                        )
+                    except ValueError as e:
+                        self.send_error(400, str(e))
+                        return
+                    for image in images:
+                        if not image['thumbnail']:
+                            thumbnail_pool.submit(image['path'], catalog.full_path(image['path']), block=False)
+                    sheet = sprite_sheets.describe(images)
+                    
+                    payload = {'images': to_columns(images) if columnar else images, 'next_cursor': next_cursor, 'sheet': sheet}
+                    self.send_json(payload, etag=etag, precompress=all(image['thumbnail'] for image in images))
+                    
+                except Exception as e:
+                    logging.error(f"Error getting sprite page: {str(e)}")
+                    self.send_error(500, 'Internal Server Error')
+                    
+            elif self.path == '/api/jobs':
+                self.send_json({'jobs': bulk_jobs.list()}, cache_control='no-store')
+                
+            elif self.path.startswith('/api/jobs/'):
+                job = bulk_jobs.get(self.path[len('/api/jobs/'):])
+                if not job:
+                    self.send_error(404, 'Job not found')
+                    return
+                self.send_json(job.to_dict(), cache_control='no-store')
+                
+            elif self.path.startswith('/api/export?'):
+                # Folder/date exports can be plain links: /api/export?folder=&since=&until=&q=
+                query = parse_qs(urlparse(self.path).query)
+                selection = {name: values[0] for name, values in query.items() if name != 'path'}
+                if 'path' in query:
+                    selection['paths'] = query['path']
+                self.export_zip(selection)
+                
+            elif self.path.startswith('/sprites/'):
+                try:
+                    key, _, extension = os.path.basename(urlparse(self.path).path).partition('.')
+                    sheet = sprite_sheets.get(key) if extension == 'jpg' else None
+                    if not sheet:
+                        self.send_error(404, 'Sprite sheet not found')
+                        return
+                    
+                    sheet_path, body = sheet
+                    if sheet_path:
+                        # The key is a digest of its members, so a sheet never changes once written
+                        self.send_file(sheet_path, 'image/jpeg', {'Cache-Control': 'public, max-age=31536000, immutable'})
+                        return
+                    
+                    # Some thumbnails are still being regenerated; send this one without letting anyone keep it
                     self.send_response(200)
-                    self.send_header('Content-type', 'application/json')
-                    self.send_header('Access-Control-Allow-Origin', '*')
+                    self.send_header('Content-type', 'image/jpeg')
+                    self.send_header('Content-Length', str(len(body)))
                     self.send_header('Cache-Control', 'no-store')
                     self.end_headers()
+                    if self.command != 'HEAD':
+                        self.wfile.write(body)
+                        
+                except Exception as e:
+                    logging.error(f"Error serving sprite sheet {self.path}: {str(e)}")
+                    self.send_error(500, 'Internal Server Error')
+                
+            elif self.path == '/api/images' or self.path.startswith('/api/images?'):
+                logging.info("📋 Client requested image list")
+                try:
+                    parsed_url = urlparse(self.path)
+                    query = parse_qs(parsed_url.query)
+                    
+                    columnar = query.pop('format', [None])[0] == 'columns'
                     
-                    self.wfile.write(json.dumps(images).encode())
+                    # The listing only changes when the catalog does, so it can be validated without a query
+                    query_hash = hashlib.md5(parsed_url.query.encode('utf-8')).hexdigest()[:12]
+                    etag = f'"images-{catalog.version_tag()}-{query_hash}"'
+                    if self.is_not_modified(etag):
+                        self.send_not_modified(etag, {'Cache-Control': 'no-cache'})
+                        return
+                    if self.send_precompressed(etag):
+                        return
+                    
+                    if query:
+                        # Paginated listing: ?limit=&cursor=&folder=&since=&until=&q=
+                        try:
+                            images, next_cursor = catalog.query_images(
+                                limit=int(query.get('limit', [DEFAULT_PAGE_SIZE])[0]),
+                                cursor=query.get('cursor', [None])[0],
+                                folder=query.get('folder', [None])[0],
+                                since=parse_date_bound(query.get('since', [None])[0]),
+                                until=parse_date_bound(query.get('until', [None])[0]),
+                                name=query.get('q', [None])[0]
+                            )
+                        except ValueError as e:
+                            self.send_error(400, str(e))
+                            return
+                        # Regenerate thumbnails for this page that were evicted or never made
+                        for image in images:
+                            if not image['thumbnail']:
+                                thumbnail_pool.submit(image['path'], catalog.full_path(image['path']), block=False)
+                        payload = {'images': to_columns(images) if columnar else images, 'next_cursor': next_cursor}
+                    else:
+                        logging.info("Getting image list")
+                        images = get_image_list()
+                        payload = to_columns(images) if columnar else images
+                    
+                    # Pages still waiting on thumbnails are rebuilt so the regeneration above gets retried
+                    self.send_json(payload, etag=etag, precompress=all(image['thumbnail'] for image in images))
                     logging.info(f"Found {len(images)} images")
                     logging.info("Successfully sent image list")
                     
@@ -427,23 +821,47 @@ class GalleryHandler(SimpleHTTPRequestHandler):
             elif self.path.startswith('/thumbnails/'):
                 logging.info(f"🖼️ Serving thumbnail: {os.path.basename(self.path)}")
                 try:
-                    thumb_filename = os.path.basename(self.path)
-                    thumb_path = os.path.join(THUMBNAIL_CACHE_DIR, thumb_filename)
+                    parsed_url = urlparse(self.path)
+                    thumb_filename = os.path.basename(parsed_url.path)
+                    query = parse_qs(parsed_url.query)
+                    content_type = 'image/jpeg'
+                    negotiated = False
+                    # Content-addressed names never change meaning, so clients may keep them forever
+                    cache_control = 'public, max-age=31536000, immutable'
+                    
+                    if 'size' in query:
+                        # Resized variant: ?size=<long edge>[&format=webp|avif|jpeg]
+                        try:
+                            edge = snap_variant_size(int(query['size'][0]))
+                        except ValueError:
+                            self.send_error(400, 'Invalid thumbnail size')
+                            return
+                        fmt, negotiated = choose_variant_format(query.get('format', [None])[0],
+                                                                self.headers.get('Accept'))
+                        content_type = VARIANT_FORMATS[fmt][1]
+                        try:
+                            thumb_path = get_thumbnail_variant(thumb_filename, edge, fmt)
+                        except VariantUnavailable as e:
+                            # Stand in with the default thumbnail, but don't let it be cached under the variant's URL
+                            logging.warning(f"⚠️ {e}; serving the default thumbnail")
+                            thumb_path = thumbnail_cache.lookup(thumb_filename)
+                            content_type = 'image/jpeg'
+                            cache_control = 'no-store'
+                            if not thumb_path:
+                                self.send_error(503, 'Thumbnail workers are busy')
+                                return
+                    else:
+                        thumb_path = thumbnail_cache.lookup(thumb_filename)
                     
-                    if not os.path.exists(thumb_path):
+                    if not thumb_path:
                         # If thumbnail doesn't exist, return 404
                         self.send_error(404, 'Thumbnail not found')
                         return
                         
-                    self.send_response(200)
-                    self.send_header('Content-type', 'image/jpeg')
-                    self.send_header('Cache-Control', 'public, max-age=31536000')
-                    file_size = os.path.getsize(thumb_path)
-                    self.send_header('Content-Length', str(file_size))
-                    self.end_headers()
-                    
-                    with open(thumb_path, 'rb') as f:
-                        self.wfile.write(f.read())
+                    headers = {'Cache-Control': cache_control}
+                    if negotiated:
+                        headers['Vary'] = 'Accept'
+                    self.send_file(thumb_path, content_type, headers)
                     logging.info(f"Successfully served thumbnail: {thumb_path}")
                         
                 except Exception as e:
@@ -452,27 +870,17 @@ class GalleryHandler(SimpleHTTPRequestHandler):
                 
             elif self.path.startswith('/output/'):
                 try:
-                    rel_path = self.path[8:]
-                    file_path = os.path.join(output_dir, rel_path)
+                    rel_path = unquote(urlparse(self.path).path[8:])
+                    file_path = os.path.abspath(os.path.join(output_dir, rel_path))
                     logging.info(f"Serving file: {file_path}")
                     
-                    if os.path.exists(file_path) and os.path.isfile(file_path):
-                        self.send_response(200)
-                        if file_path.lower().endswith('.png'):
-                            self.send_header('Content-type', 'image/png')
-                        elif file_path.lower().endswith(('.jpg', '.jpeg')):
-                            self.send_header('Content-type', 'image/jpeg')
-                        elif file_path.lower().endswith('.gif'):
-                            self.send_header('Content-type', 'image/gif')
-                        elif file_path.lower().endswith('.webp'):
-                            self.send_header('Content-type', 'image/webp')
-                        
-                        file_size = os.path.getsize(file_path)
-                        self.send_header('Content-Length', str(file_size))
-                        self.end_headers()
-                        
-                        with open(file_path, 'rb') as f:
-                            self.wfile.write(f.read())
+                    # Security check - ensure path is within output_dir
+                    if os.path.commonpath([file_path, os.path.abspath(output_dir)]) != os.path.abspath(output_dir):
+                        self.send_error(403, 'Access denied')
+                        return
+                    
+                    if os.path.isfile(file_path):
+                        self.send_file(file_path, extra_headers={'Cache-Control': 'no-cache'})
                         logging.info(f"Successfully served file: {file_path}")
                     else:
                         logging.warning(f"File not found: {file_path}")
@@ -481,6 +889,14 @@ class GalleryHandler(SimpleHTTPRequestHandler):
                     logging.error(f"Error serving file {file_path}: {str(e)}")
                     raise
             elif self.path == '/events':
+                if sse_hub:
+                    self.adopt_stream('events')
+                    return
+                # SSE connections hold their thread; they are counted against MAX_CLIENTS, not the pool
+                if not self.server.begin_stream():
+                    self.send_error(503, 'Too many event stream clients')
+                    return
+                self.close_connection = True  # Streams run until the client leaves; never reused
                 try:
                     self.send_response(200)
                     self.send_header('Content-type', 'text/event-stream')
@@ -505,6 +921,7 @@ class GalleryHandler(SimpleHTTPRequestHandler):
                     logging.error(f"Error handling event stream: {str(e)}")
                     if self.wfile in connection_manager.clients:
                         connection_manager.remove_client(self.wfile)
+                self.server.end_stream()
                         
             elif self.path == '/api/workflow-folders':
                 try:
@@ -526,11 +943,7 @@ class GalleryHandler(SimpleHTTPRequestHandler):
                                 'count': len([f for f in glob.glob(os.path.join(base_path, "*.json"))])
                             })
                     
-                    self.send_response(200)
-                    self.send_header('Content-type', 'application/json')
-                    self.send_header('Access-Control-Allow-Origin', '*')
-                    self.end_headers()
-                    self.wfile.write(json.dumps(workflow_dirs).encode())
+                    self.send_json(workflow_dirs)
                     
                 except Exception as e:
                     logging.error(f"Error getting workflow folders: {str(e)}")
@@ -563,186 +976,20 @@ class GalleryHandler(SimpleHTTPRequestHandler):
                     
                     logging.info(f"Found {len(workflows)} workflows")
                     
-                    self.send_response(200)
-                    self.send_header('Content-type', 'application/json')
-                    self.send_header('Access-Control-Allow-Origin', '*')
-                    self.end_headers()
-                    self.wfile.write(json.dumps(workflows).encode())
+                    self.send_json(workflows)
                     
                 except Exception as e:
                     logging.error(f"Error getting workflow list: {str(e)}")
                     self.send_error(500, 'Internal Server Error')
             elif self.path.startswith('/api/run-workflow/'):
                 try:
-                    workflow_path = unquote(self.path[16:])
-                    # Try different possible workflow locations
-                    possible_paths = [
-                        os.path.join(comfy_dir, workflow_path),
-                        os.path.join(comfy_dir, 'workflows', os.path.basename(workflow_path)),
-                        os.path.join(comfy_dir, 'user', 'default', 'workflows', os.path.basename(workflow_path)),
-                        os.path.join(comfy_dir, '.users', 'default', 'workflows', os.path.basename(workflow_path))
-                    ]
-                    
-                    full_path = None
-                    for path in possible_paths:
-                        if os.path.exists(path):
-                            full_path = path
-                            break
-                    
-                    if not full_path:
-                        logging.error(f"Workflow file not found in any location. Tried: {possible_paths}")
-                        self.send_error(404, 'Workflow file not found')
-                        return
-                    
-                    logging.info(f"Found workflow at: {full_path}")
-                    
-                    # Get request body for parameters
-                    content_length = int(self.headers.get('Content-Length', 0))
-                    post_data = self.rfile.read(content_length)
-                    parameters = json.loads(post_data.decode('utf-8')).get('parameters', {})
-                    
-                    logging.info(f"Received parameters: {parameters}")
-                    
-                    # Read workflow
-                    with open(full_path, 'r', encoding='utf-8') as f:
-                        workflow_data = json.load(f)
-                    
-                    # Update workflow with provided parameters
-                    if 'nodes' in workflow_data:
-                        for node in workflow_data['nodes']:
-                            node_id = str(node.get('id'))
-                            if node_id in parameters:
-                                # Ensure widgets_values is a list
-                                if isinstance(parameters[node_id]['widgets_values'], list):
-                                    node['widgets_values'] = parameters[node_id]['widgets_values']
-                                else:
-                                    # Convert to list if it's not already
-                                    node['widgets_values'] = [parameters[node_id]['widgets_values']]
-                                logging.info(f"Updated node {node_id} with values: {node['widgets_values']}")
-                    
-                    # Format the prompt data dynamically based on workflow structure
-                    prompt_data = {
-                        "prompt": {},
-                        "client_id": "gallery_server",
-                        "extra_data": {
-                            "extra_pnginfo": {
-                                "workflow": workflow_data
-                            }
-                        }
-                    }
-
-                    # Build the prompt structure from the workflow nodes
-                    if 'nodes' in workflow_data:
-                        for node in workflow_data['nodes']:
-                            node_id = str(node.get('id'))
-                            node_data = {
-                                "class_type": node.get('type'),
-                                "inputs": {}
-                            }
-                            
-                            # Add inputs from workflow connections
-                            if 'inputs' in node:
-                                for input_name, input_data in node['inputs'].items():
-                                    if isinstance(input_data, dict) and 'link' in input_data:
-                                        # This is a connected input
-                                        continue
-                                    else:
-                                        # This is a direct input value
-                                        node_data['inputs'][input_name] = input_data
-
-                            # Add widget values if present
-                            if 'widgets_values' in node:
-                                node_data['widgets_values'] = node['widgets_values']
-
-                            prompt_data['prompt'][node_id] = node_data
-
-                    # Process connections between nodes
-                    for node in workflow_data['nodes']:
-                        node_id = str(node.get('id'))
-                        if 'inputs' in node:
-                            for input_name, input_data in node['inputs'].items():
-                                if isinstance(input_data, dict) and 'link' in input_data:
-                                    # Find the source node and output
-                                    for link in workflow_data.get('links', []):
-                                        if link[0] == input_data['link']:  # If link ID matches
-                                            from_node = str(link[1])
-                                            from_output = link[3]
-                                            # Add the connection to inputs
-                                            prompt_data['prompt'][node_id]['inputs'][input_name] = {
-                                                'node': from_node,
-                                                'output': from_output
-                                            }
-                                            break
-
-                    logging.info("Sending workflow to ComfyUI...")
-                    logging.info(f"Prompt data: {json.dumps(prompt_data, indent=2)}")
-                    
-                    # Send modified workflow to ComfyUI
-                    api_url = "http://127.0.0.1:8189/prompt"
-                    headers = {
-                        'Content-Type': 'application/json',
-                        'Accept': 'application/json'
-                    }
-                    
-                    try:
-                        response = requests.post(api_url, json=prompt_data, headers=headers)
-                        logging.info(f"ComfyUI response status: {response.status_code}")
-                        logging.info(f"ComfyUI response headers: {response.headers}")
-                        logging.info(f"ComfyUI response text: {response.text}")
-                        
-                        if response.status_code == 200:
-                            response_data = response.json()
-                            logging.info(f"ComfyUI response data: {response_data}")
-                            
-                            self.send_response(200)
-                            self.send_header('Content-type', 'application/json')
-                            self.send_header('Access-Control-Allow-Origin', '*')
-                            self.end_headers()
-                            self.wfile.write(json.dumps({
-                                'success': True,
-                                'message': 'Workflow started successfully',
-                                'prompt_id': response_data.get('prompt_id')
-                            }).encode())
-                        else:
-                            error_msg = f"ComfyUI returned status code {response.status_code}"
-                            try:
-                                error_data = response.json()
-                                error_msg += f": {json.dumps(error_data)}"
-                            except:
-                                error_msg += f": {response.text}"
-                            
-                            logging.error(error_msg)
-                            self.send_response(500)
-                            self.send_header('Content-type', 'application/json')
-                            self.send_header('Access-Control-Allow-Origin', '*')
-                            self.end_headers()
-                            self.wfile.write(json.dumps({
-                                'success': False,
-                                'error': error_msg
-                            }).encode())
-                    except requests.exceptions.RequestException as e:
-                        error_msg = f"Failed to connect to ComfyUI: {str(e)}"
-                        logging.error(error_msg)
-                        self.send_response(500)
-                        self.send_header('Content-type', 'application/json')
-                        self.send_header('Access-Control-Allow-Origin', '*')
-                        self.end_headers()
-                        self.wfile.write(json.dumps({
-                            'success': False,
-                            'error': error_msg
-                        }).encode())
-                        
+                    self.run_workflow(unquote(self.path[len('/api/run-workflow/'):]))
                 except Exception as e:
                     logging.error(f"Error running workflow: {str(e)}")
                     self.send_error(500, str(e))
             elif self.path == '/api/restart':
                 try:
-                    self.send_response(200)
-                    self.send_header('Content-type', 'application/json')
-                    self.send_header('Access-Control-Allow-Origin', '*')
-                    self.end_headers()
-                    
-                    self.wfile.write(json.dumps({'status': 'restarting'}).encode())
+                    self.send_json({'status': 'restarting'}, cache_control='no-store')
                     
                     # Schedule server restart
                     threading.Thread(target=self.restart_server, daemon=True).start()
@@ -751,6 +998,14 @@ class GalleryHandler(SimpleHTTPRequestHandler):
                     logging.error(f"Error handling restart request: {str(e)}")
                     self.send_error(500, 'Internal Server Error')
             elif self.path == '/api/console':
+                if sse_hub:
+                    self.adopt_stream('console', console_broadcaster.backlog())
+                    return
+                if not self.server.begin_stream():
+                    self.send_error(503, 'Too many event stream clients')
+                    return
+                self.close_connection = True  # Streams run until the client leaves; never reused
+                subscriber = None
                 try:
                     self.send_response(200)
                     self.send_header('Content-type', 'text/event-stream')
@@ -759,35 +1014,74 @@ class GalleryHandler(SimpleHTTPRequestHandler):
                     self.end_headers()
                     
                     # Send existing console messages
-                    messages = []
-                    while not console_queue.empty():
-                        try:
-                            messages.append(console_queue.get_nowait())
-                        except:
-                            break
-                            
-                    for msg in messages:
-                        console_queue.put(msg)  # Put messages back
-                        self.wfile.write(f"data: {json.dumps(msg)}\n\n".encode())
-                        self.wfile.flush()
+                    subscriber = console_broadcaster.subscribe()
+                    self.wfile.write(b''.join(console_broadcaster.backlog()))
+                    self.wfile.flush()
                     
-                    connection_manager.add_client(self.wfile, is_console=True)
-                    
-                    # Keep connection alive
-                    while True:
+                    # Write batches from the broadcaster, with a keepalive when idle
+                    while not subscriber.dropped:
                         try:
-                            self.wfile.write(b":\n\n")  # Send keepalive
+                            frame = subscriber.frames.get(timeout=15)
+                        except Empty:
+                            frame = b":\n\n"
+                        try:
+                            self.wfile.write(frame)
                             self.wfile.flush()
-                            time.sleep(15)
                         except:
                             break
                             
-                    connection_manager.remove_client(self.wfile, is_console=True)
+                    console_broadcaster.unsubscribe(subscriber)
                     
                 except Exception as e:
                     logging.error(f"Error handling console stream: {str(e)}")
-                    if self.wfile in connection_manager.console_clients:
-                        connection_manager.remove_client(self.wfile, is_console=True)
+                    if subscriber:
+                        console_broadcaster.unsubscribe(subscriber)
+                self.server.end_stream()
+            elif self.path.startswith('/api/search?'):
+                try:
+                    query = parse_qs(urlparse(self.path).query)
+                    try:
+                        hits, next_offset = search_index.search(
+                            query.get('q', [''])[0],
+                            limit=int(query.get('limit', [DEFAULT_SEARCH_LIMIT])[0]),
+                            offset=int(query.get('offset', [0])[0]),
+                            kind=query.get('kind', [None])[0]
+                        )
+                    except ValueError as e:
+                        self.send_error(400, str(e))
+                        return
+                    for hit in hits:
+                        if hit['kind'] == 'image':
+                            entry = catalog.get(hit['path'])
+                            hit['thumbnail'] = entry['thumbnail'] if entry else None
+                    self.send_json({'results': hits, 'next_offset': next_offset})
+                except Exception as e:
+                    logging.error(f"Error searching outputs: {str(e)}")
+                    self.send_error(500, 'Internal Server Error')
+            elif self.path == '/api/server-stats':
+                try:
+                    stats = self.server.stats()
+                    if sse_hub:
+                        stats['sse'] = sse_hub.stats()
+                    stats['console'] = console_broadcaster.stats()
+                    stats['workflows'] = workflow_cache.stats()
+                    stats['backends'] = backend_pool.stats()
+                    stats['compression'] = precompressed.stats()
+                    self.send_json(stats, cache_control='no-store')
+                except Exception as e:
+                    logging.error(f"Error getting server stats: {str(e)}")
+                    self.send_error(500, 'Internal Server Error')
+            elif self.path == '/api/thumbnail-cache':
+                try:
+                    stats = thumbnail_cache.stats()
+                    stats['queued'] = thumbnail_pool.queued()
+                    stats['sprites'] = sprite_sheets.stats()
+                    
+                    self.send_json(stats, cache_control='no-store')
+                    
+                except Exception as e:
+                    logging.error(f"Error getting thumbnail cache stats: {str(e)}")
+                    self.send_error(500, 'Internal Server Error')
             elif self.path.startswith('/api/browse-folders'):
                 try:
                     # Get the current path and show_all parameter from headers
@@ -848,50 +1142,47 @@ class GalleryHandler(SimpleHTTPRequestHandler):
                         'items': items
                     }
                     
-                    self.send_response(200)
-                    self.send_header('Content-type', 'application/json')
-                    self.send_header('Access-Control-Allow-Origin', '*')
-                    self.end_headers()
-                    self.wfile.write(json.dumps(response_data).encode())
+                    self.send_json(response_data)
                     
                 except Exception as e:
                     logging.error(f"Error browsing folders: {str(e)}")
                     self.send_error(500, 'Internal Server Error')
-            elif self.path == '/api/text-files':
+            elif self.path == '/api/text-files' or self.path.startswith('/api/text-files?'):
                 try:
-                    text_files = []
-                    for root, _, files in os.walk(output_dir):
-                        for file in files:
-                            if file.lower().endswith(('.txt', '.json', '.md')):
-                                full_path = os.path.join(root, file)
-                                rel_path = os.path.relpath(full_path, output_dir).replace('\\', '/')
-                                
-                                # Read preview of text content
-                                try:
-                                    with open(full_path, 'r', encoding='utf-8') as f:
-                                        content = f.read(500)  # Read first 500 characters
-                                        preview = content[:500] + ('...' if len(content) > 500 else '')
-                                except Exception as e:
-                                    preview = f"Unable to read file content: {str(e)}"
-                                
-                                text_files.append({
-                                    'path': rel_path,
-                                    'name': file,
-                                    'date': datetime.fromtimestamp(os.path.getmtime(full_path)).strftime('%Y-%m-%d %H:%M:%S'),
-                                    'preview': preview,
-                                    'size': os.path.getsize(full_path)
-                                })
-                    
-                    # Sort files by date, newest first
-                    text_files.sort(key=lambda x: x['date'], reverse=True)
+                    parsed_url = urlparse(self.path)
+                    query = parse_qs(parsed_url.query)
                     
-                    self.send_response(200)
-                    self.send_header('Content-type', 'application/json')
-                    self.send_header('Access-Control-Allow-Origin', '*')
-                    self.send_header('Cache-Control', 'no-store')
-                    self.end_headers()
+                    columnar = query.pop('format', [None])[0] == 'columns'
+                    
+                    # Served from the text index; files are only reopened when the watcher reports a change
+                    query_hash = hashlib.md5(parsed_url.query.encode('utf-8')).hexdigest()[:12]
+                    etag = f'"text-{text_index.version_tag()}-{query_hash}"'
+                    if self.is_not_modified(etag):
+                        self.send_not_modified(etag, {'Cache-Control': 'no-cache'})
+                        return
+                    if self.send_precompressed(etag):
+                        return
                     
-                    self.wfile.write(json.dumps(text_files).encode())
+                    if query:
+                        # Paginated listing, same parameters as /api/images
+                        try:
+                            text_files, next_cursor = text_index.query_files(
+                                limit=int(query.get('limit', [DEFAULT_PAGE_SIZE])[0]),
+                                cursor=query.get('cursor', [None])[0],
+                                folder=query.get('folder', [None])[0],
+                                since=parse_date_bound(query.get('since', [None])[0]),
+                                until=parse_date_bound(query.get('until', [None])[0]),
+                                name=query.get('q', [None])[0]
+                            )
+                        except ValueError as e:
+                            self.send_error(400, str(e))
+                            return
+                        payload = {'files': to_columns(text_files) if columnar else text_files, 'next_cursor': next_cursor}
+                    else:
+                        text_files = text_index.list_files()
+                        payload = to_columns(text_files) if columnar else text_files
+                    
+                    self.send_json(payload, etag=etag, precompress=True)
                     logging.info(f"Found {len(text_files)} text files")
                     
                 except Exception as e:
@@ -974,11 +1265,7 @@ class GalleryHandler(SimpleHTTPRequestHandler):
                             'response': response_content
                         }
                         
-                        self.send_response(200)
-                        self.send_header('Content-type', 'application/json')
-                        self.send_header('Access-Control-Allow-Origin', '*')
-                        self.end_headers()
-                        self.wfile.write(json.dumps(response_data).encode())
+                        self.send_json(response_data, cache_control='no-store')
                         
                         logging.info(f"📤 Sent response to client")
                         
@@ -1010,11 +1297,7 @@ class GalleryHandler(SimpleHTTPRequestHandler):
                         'version': health_check.json() if health_check.status_code == 200 else None
                     }
                     
-                    self.send_response(200)
-                    self.send_header('Content-type', 'application/json')
-                    self.send_header('Access-Control-Allow-Origin', '*')
-                    self.end_headers()
-                    self.wfile.write(json.dumps(response_data).encode())
+                    self.send_json(response_data, cache_control='no-store')
                     
                 except Exception as e:
                     logging.error(f"Error testing ollama: {str(e)}")
@@ -1022,52 +1305,21 @@ class GalleryHandler(SimpleHTTPRequestHandler):
                 
             elif self.path.startswith('/api/workflow-parameters/'):
                 try:
-                    workflow_path = unquote(self.path[22:])  # Remove '/api/workflow-parameters/'
-                    # Normalize path separators and handle relative path
-                    workflow_path = workflow_path.replace('/', os.path.sep).replace('\\', os.path.sep)
-                    
-                    # Try different possible workflow locations
-                    possible_paths = [
-                        os.path.join(comfy_dir, workflow_path),
-                        os.path.join(comfy_dir, 'workflows', os.path.basename(workflow_path)),
-                        os.path.join(comfy_dir, 'user', 'default', 'workflows', os.path.basename(workflow_path)),
-                        os.path.join(comfy_dir, '.users', 'default', 'workflows', os.path.basename(workflow_path))
-                    ]
-                    
-                    full_path = None
-                    for path in possible_paths:
-                        if os.path.exists(path):
-                            full_path = path
-                            break
-                    
-                    if not full_path:
-                        logging.error(f"Workflow file not found in any location. Tried: {possible_paths}")
+                    workflow_path = unquote(self.path[len('/api/workflow-parameters/'):])
+                    cached = workflow_cache.get(workflow_path)
+                    if not cached:
+                        logging.error(f"Workflow file not found in any location. Tried: {workflow_cache.candidates(workflow_path)}")
                         self.send_error(404, 'Workflow file not found')
                         return
                     
-                    logging.info(f"Found workflow at: {full_path}")
-                    
-                    with open(full_path, 'r', encoding='utf-8') as f:
-                        workflow_data = json.load(f)
+                    logging.info(f"Found workflow at: {cached.path}")
                     
-                    # Extract parameters from workflow nodes
-                    parameters = {}
-                    if 'nodes' in workflow_data:
-                        for node in workflow_data['nodes']:
-                            node_id = str(node.get('id'))
-                            if 'widgets_values' in node:
-                                parameters[node_id] = {
-                                    'title': node.get('type', 'Unnamed Node'),
-                                    'widgets_values': node['widgets_values']
-                                }
+                    # Extracted once per file version by the cache
+                    parameters = cached.parameters
                     
                     logging.info(f"Extracted parameters: {parameters}")
                     
-                    self.send_response(200)
-                    self.send_header('Content-type', 'application/json')
-                    self.send_header('Access-Control-Allow-Origin', '*')
-                    self.end_headers()
-                    self.wfile.write(json.dumps(parameters).encode())
+                    self.send_json(parameters)
                     
                 except Exception as e:
                     logging.error(f"Error getting workflow parameters: {str(e)}")
@@ -1101,25 +1353,20 @@ class GalleryHandler(SimpleHTTPRequestHandler):
                 if os.path.exists(full_path):
                     try:
                         # Delete thumbnail if it exists
-                        mtime = os.path.getmtime(full_path)
-                        hash_input = f"{full_path}{mtime}".encode('utf-8')
-                        thumb_filename = hashlib.md5(hash_input).hexdigest() + '.jpg'
-                        thumb_path = os.path.join(THUMBNAIL_CACHE_DIR, thumb_filename)
+                        entry = catalog.get(catalog.rel_path(full_path))
+                        thumb_filename = os.path.basename(entry['thumbnail']) if entry and entry['thumbnail'] else None
                         
                         # Delete the original file
                         os.remove(full_path)
+                        catalog.remove(full_path)
                         logging.info(f"✅ Successfully deleted: {file_path}")
                         
-                        # Delete thumbnail if it exists
-                        if os.path.exists(thumb_path):
-                            os.remove(thumb_path)
+                        # Delete thumbnail unless an identical image still uses it
+                        if thumb_filename and not catalog.thumbnail_in_use(thumb_filename):
+                            thumbnail_cache.remove([thumb_filename])
                             logging.info(f"✅ Deleted associated thumbnail")
 
-                        self.send_response(200)
-                        self.send_header('Content-type', 'application/json')
-                        self.send_header('Access-Control-Allow-Origin', '*')
-                        self.end_headers()
-                        self.wfile.write(json.dumps({'success': True}).encode())
+                        self.send_json({'success': True}, cache_control='no-store')
                         
                     except Exception as e:
                         logging.error(f"❌ Error deleting file: {e}")
@@ -1145,11 +1392,7 @@ class GalleryHandler(SimpleHTTPRequestHandler):
                         os.remove(full_path)
                         logging.info(f"✅ Successfully deleted text file: {file_path}")
 
-                        self.send_response(200)
-                        self.send_header('Content-type', 'application/json')
-                        self.send_header('Access-Control-Allow-Origin', '*')
-                        self.end_headers()
-                        self.wfile.write(json.dumps({'success': True}).encode())
+                        self.send_json({'success': True}, cache_control='no-store')
                         
                     except Exception as e:
                         logging.error(f"❌ Error deleting text file: {e}")
@@ -1172,6 +1415,7 @@ class GalleryHandler(SimpleHTTPRequestHandler):
         self.send_header('Access-Control-Allow-Methods', 'GET, DELETE, OPTIONS')
         self.send_header('Access-Control-Allow-Headers', 'Content-Type')
         self.send_header('Access-Control-Max-Age', '86400')  # 24 hours
+        self.send_header('Content-Length', '0')
         self.end_headers()
 
     def log_message(self, format, *args):
@@ -1179,184 +1423,46 @@ class GalleryHandler(SimpleHTTPRequestHandler):
         logging.info(format % args)
 
     def do_HEAD(self):
-        """Handle HEAD requests for ETag support"""
-        if self.path == '/api/images':
-            try:
-                images = get_image_list()
-                # Generate ETag based on content
-                content = json.dumps(images).encode()
-                etag = hashlib.md5(content).hexdigest()
-                
-                self.send_response(200)
-                self.send_header('ETag', f'"{etag}"')
-                self.send_header('Last-Modified', formatdate(time.time(), usegmt=True))
-                self.send_header('Cache-Control', 'public, max-age=3600')
-                self.end_headers()
-            except Exception as e:
-                logging.error(f"Error handling HEAD request: {str(e)}")
-                self.send_error(500, 'Internal Server Error')
+        """Handle HEAD requests for the cacheable routes (validators only, no body)"""
+        path = urlparse(self.path).path
+        if (path in ('/', '/api/images', '/api/text-files')
+                or path.startswith(('/static/', '/output/', '/thumbnails/', '/sprites/'))):
+            self.do_GET()
+        else:
+            self.send_error(405, 'Method not allowed')
 
     def do_POST(self):
         try:
             if self.path.startswith('/api/run-workflow/'):
-                workflow_path = unquote(self.path[16:])
-                # Try different possible workflow locations
-                possible_paths = [
-                    os.path.join(comfy_dir, workflow_path),
-                    os.path.join(comfy_dir, 'workflows', os.path.basename(workflow_path)),
-                    os.path.join(comfy_dir, 'user', 'default', 'workflows', os.path.basename(workflow_path)),
-                    os.path.join(comfy_dir, '.users', 'default', 'workflows', os.path.basename(workflow_path))
-                ]
-                
-                full_path = None
-                for path in possible_paths:
-                    if os.path.exists(path):
-                        full_path = path
-                        break
-                
-                if not full_path:
-                    logging.error(f"Workflow file not found in any location. Tried: {possible_paths}")
-                    self.send_error(404, 'Workflow file not found')
+                self.run_workflow(unquote(self.path[len('/api/run-workflow/'):]))
+            elif self.path == '/api/bulk':
+                # {"action": "delete" | "move" | "archive", "paths": [...], "destination": "sub/folder"}
+                content_length = int(self.headers.get('Content-Length', 0))
+                try:
+                    request = json.loads(self.rfile.read(content_length).decode('utf-8') or '{}')
+                    if not isinstance(request, dict):
+                        raise ValueError('Expected a JSON object')
+                    job = bulk_operations.prepare(request.get('action'), request.get('paths'), request.get('destination'))
+                except ValueError as e:
+                    self.send_error(400, str(e))
                     return
-                
-                logging.info(f"Found workflow at: {full_path}")
-                
-                # Get request body for parameters
+                bulk_jobs.submit(job)
+                logging.info(f"🗂️ Queued bulk {job.action} of {job.total} files as job {job.id}")
+                self.send_json({'job': job.to_dict()}, status=202, cache_control='no-store')
+            elif self.path == '/api/export':
                 content_length = int(self.headers.get('Content-Length', 0))
-                post_data = self.rfile.read(content_length)
-                parameters = json.loads(post_data.decode('utf-8')).get('parameters', {})
-                
-                logging.info(f"Received parameters: {parameters}")
-                
-                # Read workflow
-                with open(full_path, 'r', encoding='utf-8') as f:
-                    workflow_data = json.load(f)
-                
-                # Update workflow with provided parameters
-                if 'nodes' in workflow_data:
-                    for node in workflow_data['nodes']:
-                        node_id = str(node.get('id'))
-                        if node_id in parameters:
-                            # Ensure widgets_values is a list
-                            if isinstance(parameters[node_id]['widgets_values'], list):
-                                node['widgets_values'] = parameters[node_id]['widgets_values']
-                            else:
-                                # Convert to list if it's not already
-                                node['widgets_values'] = [parameters[node_id]['widgets_values']]
-                            logging.info(f"Updated node {node_id} with values: {node['widgets_values']}")
-                
-                # Format the prompt data dynamically based on workflow structure
-                prompt_data = {
-                    "prompt": {},
-                    "client_id": "gallery_server",
-                    "extra_data": {
-                        "extra_pnginfo": {
-                            "workflow": workflow_data
-                        }
-                    }
-                }
-
-                # Build the prompt structure from the workflow nodes
-                if 'nodes' in workflow_data:
-                    for node in workflow_data['nodes']:
-                        node_id = str(node.get('id'))
-                        node_data = {
-                            "class_type": node.get('type'),
-                            "inputs": {}
-                        }
-                        
-                        # Add inputs from workflow connections
-                        if 'inputs' in node:
-                            for input_name, input_data in node['inputs'].items():
-                                if isinstance(input_data, dict) and 'link' in input_data:
-                                    # This is a connected input
-                                    continue
-                                else:
-                                    # This is a direct input value
-                                    node_data['inputs'][input_name] = input_data
-
-                        # Add widget values if present
-                        if 'widgets_values' in node:
-                            node_data['widgets_values'] = node['widgets_values']
-
-                        prompt_data['prompt'][node_id] = node_data
-
-                # Process connections between nodes
-                for node in workflow_data['nodes']:
-                    node_id = str(node.get('id'))
-                    if 'inputs' in node:
-                        for input_name, input_data in node['inputs'].items():
-                            if isinstance(input_data, dict) and 'link' in input_data:
-                                # Find the source node and output
-                                for link in workflow_data.get('links', []):
-                                    if link[0] == input_data['link']:  # If link ID matches
-                                        from_node = str(link[1])
-                                        from_output = link[3]
-                                        # Add the connection to inputs
-                                        prompt_data['prompt'][node_id]['inputs'][input_name] = {
-                                            'node': from_node,
-                                            'output': from_output
-                                        }
-                                        break
-
-                logging.info("Sending workflow to ComfyUI...")
-                logging.info(f"Prompt data: {json.dumps(prompt_data, indent=2)}")
-                
-                # Send modified workflow to ComfyUI
-                api_url = "http://127.0.0.1:8189/prompt"
-                headers = {
-                    'Content-Type': 'application/json',
-                    'Accept': 'application/json'
-                }
-                
+                post_data = self.rfile.read(content_length).decode('utf-8')
+                # Forms (used to trigger a browser download) carry the JSON in a 'selection' field
+                if self.headers.get('Content-Type', '').startswith('application/x-www-form-urlencoded'):
+                    post_data = parse_qs(post_data).get('selection', ['{}'])[0]
                 try:
-                    response = requests.post(api_url, json=prompt_data, headers=headers)
-                    logging.info(f"ComfyUI response status: {response.status_code}")
-                    logging.info(f"ComfyUI response headers: {response.headers}")
-                    logging.info(f"ComfyUI response text: {response.text}")
-                    
-                    if response.status_code == 200:
-                        response_data = response.json()
-                        logging.info(f"ComfyUI response data: {response_data}")
-                        
-                        self.send_response(200)
-                        self.send_header('Content-type', 'application/json')
-                        self.send_header('Access-Control-Allow-Origin', '*')
-                        self.end_headers()
-                        self.wfile.write(json.dumps({
-                            'success': True,
-                            'message': 'Workflow started successfully',
-                            'prompt_id': response_data.get('prompt_id')
-                        }).encode())
-                    else:
-                        error_msg = f"ComfyUI returned status code {response.status_code}"
-                        try:
-                            error_data = response.json()
-                            error_msg += f": {json.dumps(error_data)}"
-                        except:
-                            error_msg += f": {response.text}"
-                        
-                        logging.error(error_msg)
-                        self.send_response(500)
-                        self.send_header('Content-type', 'application/json')
-                        self.send_header('Access-Control-Allow-Origin', '*')
-                        self.end_headers()
-                        self.wfile.write(json.dumps({
-                            'success': False,
-                            'error': error_msg
-                        }).encode())
-                except requests.exceptions.RequestException as e:
-                    error_msg = f"Failed to connect to ComfyUI: {str(e)}"
-                    logging.error(error_msg)
-                    self.send_response(500)
-                    self.send_header('Content-type', 'application/json')
-                    self.send_header('Access-Control-Allow-Origin', '*')
-                    self.end_headers()
-                    self.wfile.write(json.dumps({
-                        'success': False,
-                        'error': error_msg
-                    }).encode())
-                    
+                    selection = json.loads(post_data or '{}')
+                except ValueError:
+                    selection = None
+                if not isinstance(selection, dict):
+                    self.send_error(400, 'Invalid export selection')
+                    return
+                self.export_zip(selection)
             else:
                 self.send_error(404, "Not found")
             
@@ -1364,6 +1470,124 @@ class GalleryHandler(SimpleHTTPRequestHandler):
             logging.error(f"Error handling POST request: {str(e)}")
             self.send_error(500, str(e))
 
+    def export_zip(self, selection):
+        """Stream the selected images as a stored ZIP, straight from disk to the socket"""
+        try:
+            entries = export_selection(selection)
+            first = next(entries, None)
+        except ValueError as e:
+            self.send_error(400, str(e))
+            return
+        if first is None:
+            self.send_error(404, 'No images match the export')
+            return
+        
+        filename = f"comfyui-export-{datetime.now().strftime('%Y%m%d-%H%M%S')}.zip"
+        # HTTP/1.0 can't decode chunked bodies; those clients get the raw ZIP, ended by closing the connection
+        chunked = self.request_version != 'HTTP/1.0'
+        self.send_response(200)
+        self.send_header('Content-type', 'application/zip')
+        self.send_header('Content-Disposition', f'attachment; filename="{filename}"')
+        if chunked:
+            self.send_header('Transfer-Encoding', 'chunked')
+        else:
+            self.close_connection = True
+        self.send_header('Cache-Control', 'no-store')
+        self.end_headers()
+        
+        started = time.time()
+        writer = ChunkedWriter(self.wfile, chunked=chunked)
+        try:
+            files, total = stream_zip(writer, itertools.chain([first], entries))
+            writer.close()
+        except Exception as e:
+            # Usually the client went away; headers are already sent, so the only option is to drop the connection
+            logging.warning(f"⚠️ Export to {self.client_address[0]} aborted: {e}")
+            self.close_connection = True
+            return
+        elapsed = time.time() - started
+        logging.info(f"📦 Exported {files} images ({total / 1024 ** 2:.1f} MB) in {elapsed:.1f}s "
+                     f"({total / 1024 ** 2 / max(elapsed, 0.001):.0f} MB/s)")
+
+    def run_workflow(self, workflow_path):
+        """Apply the posted parameters to a cached workflow and queue it on ComfyUI"""
+        # Resolved, read and parsed once; later runs are served from memory until the file changes
+        cached = workflow_cache.get(workflow_path)
+        if not cached:
+            logging.error(f"Workflow file not found in any location. Tried: {workflow_cache.candidates(workflow_path)}")
+            self.send_error(404, 'Workflow file not found')
+            return
+        
+        logging.info(f"Found workflow at: {cached.path}")
+        
+        # Get request body for parameters
+        content_length = int(self.headers.get('Content-Length', 0))
+        post_data = self.rfile.read(content_length)
+        parameters = json.loads(post_data.decode('utf-8')).get('parameters', {})
+        
+        logging.info(f"Received parameters: {parameters}")
+        
+        # Update workflow with provided parameters (copy-on-write; the cached parse stays untouched)
+        workflow_data = cached.with_parameters(parameters)
+        
+        # Links were resolved when the workflow was compiled; only the overridden widgets are re-applied
+        prompt_data = {
+            "prompt": cached.compiled.render(parameters),
+            "client_id": "gallery_server",
+            "extra_data": {
+                "extra_pnginfo": {
+                    "workflow": workflow_data
+                }
+            }
+        }
+
+        logging.info("Sending workflow to ComfyUI...")
+        logging.info(f"Prompt has {len(prompt_data['prompt'])} nodes")
+        
+        # Send modified workflow to the least busy live ComfyUI instance
+        headers = {
+            'Content-Type': 'application/json',
+            'Accept': 'application/json'
+        }
+        
+        try:
+            backend, response = backend_pool.submit(prompt_data, headers=headers)
+            logging.info(f"ComfyUI backend: {backend.url}")
+            logging.info(f"ComfyUI response status: {response.status_code}")
+            logging.info(f"ComfyUI response headers: {response.headers}")
+            logging.info(f"ComfyUI response text: {response.text}")
+            
+            if response.status_code == 200:
+                response_data = response.json()
+                logging.info(f"ComfyUI response data: {response_data}")
+                
+                self.send_json({
+                    'success': True,
+                    'message': 'Workflow started successfully',
+                    'prompt_id': response_data.get('prompt_id'),
+                    'backend': backend.url
+                }, cache_control='no-store')
+            else:
+                error_msg = f"ComfyUI returned status code {response.status_code}"
+                try:
+                    error_data = response.json()
+                    error_msg += f": {json.dumps(error_data)}"
+                except:
+                    error_msg += f": {response.text}"
+                
+                logging.error(error_msg)
+                self.send_json({
+                    'success': False,
+                    'error': error_msg
+                }, status=500)
+        except (requests.exceptions.RequestException, NoBackendAvailable) as e:
+            error_msg = f"Failed to connect to ComfyUI: {str(e)}"
+            logging.error(error_msg)
+            self.send_json({
+                'success': False,
+                'error': error_msg
+            }, status=500)
+
     def restart_server(self):
         """Restart the server by executing the script again"""
         try:
@@ -1414,29 +1638,12 @@ class GalleryHandler(SimpleHTTPRequestHandler):
         except Exception as e:
             logging.error(f"Error restarting server: {str(e)}")
 
-class ThreadedHTTPServer(HTTPServer):
-    def process_request(self, request, client_address):
-        """Start a new thread to process the request."""
-        thread = threading.Thread(target=self.process_request_thread,
-                                args=(request, client_address))
-        thread.daemon = True
-        thread.start()
-
-    def process_request_thread(self, request, client_address):
-        """Process the request in a separate thread."""
-        try:
-            self.finish_request(request, client_address)
-        except Exception:
-            self.handle_error(request, client_address)
-        finally:
-            self.shutdown_request(request)
-
 def schedule_restart():
     logging.info("Scheduling server restart in 12 hours")
     threading.Timer(12 * 60 * 60, lambda: os._exit(0)).start()
 
 def run_standalone_server():
-    global output_dir, comfy_dir
+    global output_dir, comfy_dir, catalog, text_index, search_index, workflow_cache, backend_pool, thumbnail_cache, thumbnail_pool, sprite_sheets, sse_hub, image_events, bulk_operations, bulk_jobs
     
     current_dir = os.path.dirname(os.path.abspath(__file__))
     comfy_dir = os.path.abspath(os.path.join(current_dir, '..', '..', '..'))
@@ -1448,12 +1655,37 @@ def run_standalone_server():
     logging.info(f"📂 Output directory: {output_dir}")
     logging.info(f"📂 ComfyUI directory: {comfy_dir}")
     
+    workflow_cache = WorkflowCache(comfy_dir)
+    backend_pool = BackendPool(parse_backends(COMFYUI_BACKENDS))
+    threading.Thread(target=backend_pool.start, daemon=True).start()
+    
+    # Open the persistent catalog and reconcile it with the disk in the background
+    catalog = ImageCatalog(CATALOG_DB_PATH, output_dir)
+    text_index = TextFileIndex(CATALOG_DB_PATH, output_dir)
+    search_index = SearchIndex(CATALOG_DB_PATH, output_dir)
+    thumbnail_cache = ThumbnailCache(THUMBNAIL_CACHE_DIR, max_bytes=THUMBNAIL_CACHE_MAX_BYTES,
+                                     max_entries=THUMBNAIL_CACHE_MAX_ENTRIES, on_evict=on_thumbnails_evicted)
+    thumbnail_pool = ThumbnailPool(thumbnail_cache, workers=THUMBNAIL_WORKERS, on_done=on_thumbnail_ready)
+    sprite_sheets = SpriteSheets(thumbnail_cache)
+    bulk_operations = BulkOperations(catalog, text_index, search_index, thumbnail_cache,
+                                     ARCHIVE_DIR or os.path.join(comfy_dir, 'output_archive'),
+                                     publish=broadcast_event, is_text=is_text)
+    bulk_jobs = JobQueue(bulk_operations.run, on_update=publish_job)
+    threading.Thread(target=build_catalog, daemon=True).start()
+    
+    if SSE_MODE == 'asyncio':
+        sse_hub = SSEHub(max_clients=SSE_MAX_CLIENTS)
+        console_broadcaster.hub = sse_hub
+    logging.info(f"📡 Event streams: {SSE_MODE} mode")
+    
+    image_events = EventCoalescer(apply_file_changes, window=EVENT_WINDOW, settle=EVENT_SETTLE_TIME)
     event_handler = ImageChangeHandler()
     observer = Observer()
     observer.schedule(event_handler, output_dir, recursive=True)
     observer.start()
     
-    server = ThreadedHTTPServer(('0.0.0.0', 8200), GalleryHandler)
+    server = ThreadedHTTPServer(('0.0.0.0', 8200), GalleryHandler, workers=POOL_WORKERS,
+                                queue_size=POOL_QUEUE_SIZE, max_streams=MAX_CLIENTS)
     
     hostname = socket.gethostname()
     local_ip = socket.gethostbyname(hostname)
@@ -1475,6 +1707,15 @@ def run_standalone_server():
         observer.stop()
         observer.join()
         server.server_close()
+        if sse_hub:
+            sse_hub.close()
+        backend_pool.close()
+        bulk_jobs.close()
+        thumbnail_pool.shutdown()
+        thumbnail_cache.close()
+        text_index.close()
+        search_index.close()
+        catalog.close()
 
 if __name__ == "__main__":
     try:
@@ -0,0 +1,207 @@
+import time
+import logging
+import threading
+from urllib.parse import urlparse
+
+import requests
+
+DEFAULT_BACKENDS = '8189'  # The instance the gallery always targeted; list more (e.g. '8189-8199') to spread prompts
+HEALTH_INTERVAL = 5  # Seconds between /system_stats + /prompt checks of every backend
+HEALTH_TIMEOUT = (1, 3)  # (connect, read) seconds for health checks
+SUBMIT_TIMEOUT = (3, 30)
+MAX_SUBMIT_ATTEMPTS = 3
+
+def parse_backends(spec):
+    """``"8188,8190-8192,gpu-box:8188,http://10.0.0.5:8188"`` -> list of base URLs (bare ports mean localhost)"""
+    urls = []
+    for part in (spec or '').replace(';', ',').split(','):
+        part = part.strip().rstrip('/')
+        if not part:
+            continue
+        if '://' in part:
+            urls.append(part)
+        elif ':' in part:
+            urls.append(f"http://{part}")
+        elif '-' in part:
+            first, last = (int(port) for port in part.split('-', 1))
+            urls.extend(f"http://127.0.0.1:{port}" for port in range(first, last + 1))
+        else:
+            urls.append(f"http://127.0.0.1:{int(part)}")
+    return list(dict.fromkeys(urls))
+
+class Backend:
+    """Health and load of one ComfyUI instance as last seen by the pool"""
+
+    def __init__(self, url):
+        self.url = url
+        parsed = urlparse(url)
+        self.host = parsed.hostname or '127.0.0.1'
+        self.port = parsed.port or 8188
+        self.alive = False
+        self.queue_remaining = 0
+        self.assigned = 0  # Prompts sent since the last health check (not yet in queue_remaining)
+        self.latency = None
+        self.failures = 0
+        self.checked_at = None
+        self.device = None
+
+    def load(self):
+        return self.queue_remaining + self.assigned
+
+    def to_dict(self):
+        return {
+            'url': self.url,
+            'alive': self.alive,
+            'queue_remaining': self.queue_remaining,
+            'assigned': self.assigned,
+            'latency_ms': round(self.latency * 1000, 1) if self.latency is not None else None,
+            'failures': self.failures,
+            'device': self.device
+        }
+
+class NoBackendAvailable(Exception):
+    pass
+
+class BackendPool:
+    """Registry of ComfyUI backends that routes each prompt to the shortest queue
+
+    A daemon thread checks every backend's ``/system_stats`` (liveness, device)
+    and ``/prompt`` (``exec_info.queue_remaining``). Between checks the pool
+    counts what it dispatched itself, so a burst of submissions is spread out
+    instead of all landing on whichever instance looked idle last time.
+    """
+
+    def __init__(self, urls, interval=HEALTH_INTERVAL, session=None):
+        self.backends = {url: Backend(url) for url in urls}
+        self.interval = interval
+        self.session = session or requests.Session()
+        self.lock = threading.Lock()
+        self.closed = threading.Event()
+        self.thread = None
+
+    def start(self):
+        """Check every backend once now, then keep checking in the background"""
+        self.refresh()
+        if self.thread is None:
+            self.thread = threading.Thread(target=self._run, daemon=True, name='backend-health')
+            self.thread.start()
+        return self
+
+    def add(self, url):
+        with self.lock:
+            backend = self.backends.setdefault(url.rstrip('/'), Backend(url.rstrip('/')))
+        self.check(backend)
+        return backend
+
+    def remove(self, url):
+        with self.lock:
+            self.backends.pop(url.rstrip('/'), None)
+
+    def _run(self):
+        while not self.closed.wait(self.interval):
+            try:
+                self.refresh()
+            except Exception as e:
+                logging.error(f"❌ Backend health check failed: {e}")
+
+    def refresh(self):
+        with self.lock:
+            backends = list(self.backends.values())
+        threads = [threading.Thread(target=self.check, args=(backend,), daemon=True) for backend in backends]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+    def check(self, backend):
+        started = time.monotonic()
+        try:
+            stats = self.session.get(f"{backend.url}/system_stats", timeout=HEALTH_TIMEOUT)
+            stats.raise_for_status()
+            queue = self.session.get(f"{backend.url}/prompt", timeout=HEALTH_TIMEOUT)
+            queue.raise_for_status()
+            remaining = queue.json().get('exec_info', {}).get('queue_remaining', 0)
+            devices = stats.json().get('devices') or [{}]
+        except Exception:
+            with self.lock:
+                if backend.alive:
+                    logging.warning(f"⚠️ ComfyUI backend {backend.url} is down")
+                backend.alive = False
+                backend.failures += 1
+                backend.checked_at = time.time()
+            return False
+        with self.lock:
+            if not backend.alive:
+                logging.info(f"🖥️ ComfyUI backend {backend.url} is up")
+            backend.alive = True
+            backend.queue_remaining = int(remaining or 0)
+            backend.assigned = 0
+            backend.latency = time.monotonic() - started
+            backend.failures = 0
+            backend.checked_at = time.time()
+            backend.device = devices[0].get('name')
+        return True
+
+    def acquire(self, exclude=()):
+        """Pick the live backend with the shortest queue and count one prompt against it"""
+        with self.lock:
+            candidates = [b for b in self.backends.values() if b.alive and b.url not in exclude]
+            if not candidates:
+                raise NoBackendAvailable(
+                    f"No live ComfyUI backend (tried {', '.join(self.backends) or 'none'})")
+            backend = min(candidates, key=lambda b: (b.load(), b.latency or 0))
+            backend.assigned += 1
+            return backend
+
+    def release(self, backend):
+        """The prompt finished (or failed) before the next health check saw it"""
+        with self.lock:
+            backend.assigned = max(0, backend.assigned - 1)
+
+    def mark_down(self, backend):
+        with self.lock:
+            if backend.alive:
+                logging.warning(f"⚠️ ComfyUI backend {backend.url} stopped responding")
+            backend.alive = False
+            backend.failures += 1
+            backend.assigned = 0
+
+    def submit(self, payload, attempts=MAX_SUBMIT_ATTEMPTS, headers=None):
+        """POST a prompt to the least loaded backend, moving on to the next one if it is unreachable
+
+        Returns ``(backend, response)``. Responses from a reachable backend are
+        returned as-is: a 400 for an invalid prompt would fail everywhere, and
+        a 5xx does not prove the prompt wasn't queued, so retrying it elsewhere
+        could run it twice.
+        """
+        tried = set()
+        last_error = None
+        for _ in range(max(1, attempts)):
+            try:
+                backend = self.acquire(exclude=tried)
+            except NoBackendAvailable:
+                if last_error:
+                    break
+                # Nothing looked alive at the last check; one may have started since
+                self.refresh()
+                backend = self.acquire(exclude=tried)
+            tried.add(backend.url)
+            try:
+                response = self.session.post(f"{backend.url}/prompt", json=payload, headers=headers,
+                                             timeout=SUBMIT_TIMEOUT)
+            except requests.exceptions.ConnectionError as e:
+                # Includes connect timeouts; a read timeout may mean it was queued, so it is not retried
+                self.mark_down(backend)
+                last_error = e
+                continue
+            return backend, response
+        raise NoBackendAvailable(f"All ComfyUI backends failed: {last_error}")
+
+    def stats(self):
+        with self.lock:
+            backends = [backend.to_dict() for backend in self.backends.values()]
+        return {'alive': sum(1 for b in backends if b['alive']), 'backends': backends}
+
+    def close(self):
+        self.closed.set()
+        self.session.close()
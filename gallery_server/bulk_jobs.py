@@ -0,0 +1,289 @@
+import os
+import time
+import uuid
+import shutil
+import logging
+import threading
+from collections import OrderedDict, deque
+from datetime import datetime
+
+from zip_export import stream_zip
+
+JOB_BATCH_SIZE = 500  # Files per index transaction and per progress event
+JOB_HISTORY = 50  # Finished jobs still reported by /api/jobs
+BULK_ACTIONS = ('delete', 'move', 'archive')
+
+class Job:
+    """One bulk operation over a list of output-relative paths"""
+
+    def __init__(self, action, paths, destination=None):
+        self.id = uuid.uuid4().hex[:12]
+        self.action = action
+        self.paths = paths
+        self.destination = destination
+        self.status = 'queued'
+        self.phase = None
+        self.total = len(paths)
+        self.done = 0
+        self.failed = []  # [path, reason]
+        self.result = {}
+        self.error = None
+        self.created = time.time()
+        self.started = None
+        self.finished = None
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'action': self.action,
+            'destination': self.destination,
+            'status': self.status,
+            'phase': self.phase,
+            'total': self.total,
+            'done': self.done,
+            'failed': self.failed[:100],
+            'failed_count': len(self.failed),
+            'result': self.result,
+            'error': self.error,
+            'created': self.created,
+            'started': self.started,
+            'finished': self.finished
+        }
+
+class JobQueue:
+    """Runs jobs one at a time on a background thread, publishing every state change
+
+    Jobs are serialised on purpose: two bulk moves racing over the same files
+    would otherwise interleave. ``on_update(job_dict)`` is called when a job is
+    queued, starts, reports progress and finishes.
+    """
+
+    def __init__(self, run, on_update=None, history=JOB_HISTORY):
+        self.run = run
+        self.on_update = on_update
+        self.history = history
+        self.jobs = OrderedDict()
+        self.pending = deque()
+        self.condition = threading.Condition()
+        self.closed = False
+        self.thread = threading.Thread(target=self._worker, daemon=True, name='bulk-jobs')
+        self.thread.start()
+
+    def submit(self, job):
+        with self.condition:
+            self.jobs[job.id] = job
+            self.pending.append(job)
+            self.condition.notify()
+        self.update(job)
+        return job
+
+    def get(self, job_id):
+        with self.condition:
+            return self.jobs.get(job_id)
+
+    def list(self):
+        with self.condition:
+            return [job.to_dict() for job in self.jobs.values()]
+
+    def update(self, job):
+        if self.on_update:
+            try:
+                self.on_update(job.to_dict())
+            except Exception as e:
+                logging.error(f"❌ Error publishing job {job.id}: {e}")
+
+    def _worker(self):
+        while True:
+            with self.condition:
+                while not self.pending and not self.closed:
+                    self.condition.wait()
+                if self.closed:
+                    return
+                job = self.pending.popleft()
+
+            job.status = 'running'
+            job.started = time.time()
+            self.update(job)
+            try:
+                self.run(job, lambda: self.update(job))
+                job.status = 'done'
+            except Exception as e:
+                logging.error(f"❌ Bulk {job.action} job {job.id} failed: {e}")
+                job.status = 'failed'
+                job.error = str(e)
+            job.finished = time.time()
+            self.update(job)
+            self._prune()
+
+    def _prune(self):
+        with self.condition:
+            finished = [job_id for job_id, job in self.jobs.items() if job.finished]
+            for job_id in finished[:max(0, len(finished) - self.history)]:
+                del self.jobs[job_id]
+
+    def close(self):
+        with self.condition:
+            self.closed = True
+            self.condition.notify_all()
+
+def unique_path(directory, name):
+    """``directory/name``, or ``name_1``, ``name_2``... if that is taken"""
+    base, extension = os.path.splitext(name)
+    candidate = os.path.join(directory, name)
+    counter = 1
+    while os.path.exists(candidate):
+        candidate = os.path.join(directory, f"{base}_{counter}{extension}")
+        counter += 1
+    return candidate
+
+class BulkOperations:
+    """Delete, move or archive many output files, keeping the indexes in step batch by batch
+
+    Each batch of JOB_BATCH_SIZE files is applied to the catalog in one
+    transaction, then the thumbnails it freed are dropped from the thumbnail
+    cache in one batch (a separate SQLite file; anything a crash leaves behind
+    is picked up by the thumbnail GC). ``publish`` receives the same
+    ``{'added': [...], 'removed': [...]}`` messages the watcher sends, so the
+    gallery updates as the job progresses rather than when the watcher catches up.
+    """
+
+    def __init__(self, catalog, text_index, search_index, thumbnail_cache, archive_dir, publish, is_text):
+        self.catalog = catalog
+        self.text_index = text_index
+        self.search_index = search_index
+        self.thumbnail_cache = thumbnail_cache
+        self.archive_dir = os.path.abspath(archive_dir)
+        self.output_dir = catalog.output_dir
+        self.publish = publish
+        self.is_text = is_text
+
+    def resolve(self, rel_path):
+        """Absolute path for an output-relative path, or None if it escapes the output directory"""
+        full_path = os.path.abspath(os.path.join(self.output_dir, rel_path))
+        if os.path.commonpath([full_path, self.output_dir]) != self.output_dir or full_path == self.output_dir:
+            return None
+        return full_path
+
+    def prepare(self, action, paths, destination=None):
+        """Validate a request and build its Job; raises ValueError for anything malformed"""
+        if action not in BULK_ACTIONS:
+            raise ValueError(f"Unknown action: {action}")
+        if not isinstance(paths, list) or not paths:
+            raise ValueError('paths must be a non-empty list')
+        paths = list(dict.fromkeys(str(path).replace('\\', '/').strip('/') for path in paths))
+        if any(self.resolve(path) is None for path in paths):
+            raise ValueError('Paths must be inside the output directory')
+        if action == 'move':
+            destination = str(destination or '').replace('\\', '/').strip('/')
+            if not destination or self.resolve(destination) is None:
+                raise ValueError('move needs a destination folder inside the output directory')
+        return Job(action, paths, destination if action == 'move' else None)
+
+    def run(self, job, progress):
+        started = time.time()
+        if job.action == 'archive':
+            self._archive(job, progress)
+        else:
+            job.phase = 'deleting' if job.action == 'delete' else 'moving'
+            step = self._delete if job.action == 'delete' else self._move
+            for start in range(0, len(job.paths), JOB_BATCH_SIZE):
+                step(job, job.paths[start:start + JOB_BATCH_SIZE])
+                progress()
+        job.result['seconds'] = round(time.time() - started, 2)
+        logging.info(f"🗂️ Bulk {job.action} of {len(job.paths)} files finished in {job.result['seconds']}s, "
+                     f"{len(job.failed)} failed")
+
+    def _delete(self, job, batch):
+        images, texts = [], []
+        for rel_path in batch:
+            job.done += 1
+            try:
+                os.remove(self.resolve(rel_path))
+            except FileNotFoundError:
+                pass  # Already gone; still drop it from the indexes
+            except OSError as e:
+                job.failed.append([rel_path, str(e)])
+                continue
+            (texts if self.is_text(rel_path) else images).append(rel_path)
+
+        freed = self.catalog.remove_many(images)
+        if freed:
+            self.thumbnail_cache.remove(freed)
+        self.search_index.remove_many(images + texts)
+        for rel_path in texts:
+            self.text_index.remove(self.resolve(rel_path))
+        job.result['deleted'] = job.result.get('deleted', 0) + len(images) + len(texts)
+        job.result['thumbnails_removed'] = job.result.get('thumbnails_removed', 0) + len(freed)
+        if images:
+            self.publish({'removed': images})
+
+    def _move(self, job, batch):
+        dest_dir = self.resolve(job.destination)
+        os.makedirs(dest_dir, exist_ok=True)
+        moves = []
+        for rel_path in batch:
+            job.done += 1
+            src_path = self.resolve(rel_path)
+            if os.path.dirname(src_path) == dest_dir:
+                continue
+            if not os.path.isfile(src_path):
+                job.failed.append([rel_path, 'Not a file'])
+                continue
+            try:
+                dest_path = unique_path(dest_dir, os.path.basename(src_path))
+                shutil.move(src_path, dest_path)
+            except OSError as e:
+                job.failed.append([rel_path, str(e)])
+                continue
+            moves.append((rel_path, self.catalog.rel_path(dest_path)))
+
+        image_moves = [move for move in moves if not self.is_text(move[0])]
+        self.catalog.move_many(image_moves)
+        self.search_index.move_many(moves)
+        for src_rel, dest_rel in moves:
+            if self.is_text(src_rel):
+                self.text_index.remove(self.resolve(src_rel))
+                self.text_index.upsert(self.resolve(dest_rel))
+        job.result['moved'] = job.result.get('moved', 0) + len(moves)
+        if image_moves:
+            added = [entry for entry in (self.catalog.get(dest) for _, dest in image_moves) if entry]
+            self.publish({'added': added, 'removed': [src for src, _ in image_moves]})
+
+    def _archive(self, job, progress):
+        """Write the files into one stored ZIP under archive_dir, then delete the ones that made it in"""
+        os.makedirs(self.archive_dir, exist_ok=True)
+        archive_path = os.path.join(self.archive_dir, f"archive-{datetime.now().strftime('%Y%m%d-%H%M%S')}-{job.id}.zip")
+        tmp_path = f"{archive_path}.tmp"
+        archived = []
+
+        def on_entry(arcname, full_path):
+            archived.append(arcname)
+            job.done += 1
+            if job.done % JOB_BATCH_SIZE == 0:
+                progress()
+
+        job.phase = 'archiving'
+        progress()
+        try:
+            with open(tmp_path, 'wb') as f:
+                _, total = stream_zip(f, ((path, self.resolve(path)) for path in job.paths), on_entry=on_entry)
+            os.replace(tmp_path, archive_path)
+        except Exception:
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+            raise
+        job.result['archive'] = archive_path
+        job.result['archived_bytes'] = total
+        archived_set = set(archived)
+        job.failed.extend([path, 'Could not be read'] for path in job.paths if path not in archived_set)
+
+        # Only now that the archive is complete are the originals removed
+        job.phase = 'deleting'
+        job.done = 0
+        job.total = len(archived)
+        progress()
+        for start in range(0, len(archived), JOB_BATCH_SIZE):
+            self._delete(job, archived[start:start + JOB_BATCH_SIZE])
+            progress()
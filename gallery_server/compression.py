@@ -0,0 +1,115 @@
+import gzip
+import threading
+from collections import OrderedDict
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+COMPRESSION_THRESHOLD = 1024  # Bytes; smaller bodies are sent as-is
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5  # Higher levels cost far more CPU for a few percent on JSON
+PRECOMPRESSED_CACHE_BYTES = 64 * 1024 * 1024
+PREFIXED_FIELDS = ('path', 'thumbnail')  # Columns whose values share directory prefixes (not free text like 'preview')
+
+def supported_encodings():
+    return ('br', 'gzip') if brotli else ('gzip',)
+
+def choose_encoding(accept_encoding):
+    """Pick ``br`` or ``gzip`` from an Accept-Encoding header (honouring q=0), or None for identity"""
+    if not accept_encoding:
+        return None
+    weights = {}
+    for part in accept_encoding.split(','):
+        coding, _, params = part.strip().partition(';')
+        coding = coding.strip().lower()
+        weight = 1.0
+        for param in params.split(';'):
+            name, _, value = param.strip().partition('=')
+            if name == 'q':
+                try:
+                    weight = float(value)
+                except ValueError:
+                    weight = 0.0
+        weights[coding] = weight
+
+    candidates = []
+    for preference, coding in enumerate(supported_encodings()):
+        weight = weights.get(coding, weights.get('*', 0.0))
+        if weight > 0:
+            candidates.append((-weight, preference, coding))
+    return min(candidates)[2] if candidates else None
+
+def compress(body, encoding):
+    if encoding == 'br':
+        return brotli.compress(body, quality=BROTLI_QUALITY)
+    if encoding == 'gzip':
+        return gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0)
+    return body
+
+def to_columns(rows, prefixed=PREFIXED_FIELDS):
+    """Listing entries as parallel arrays, with directory prefixes interned
+
+    ``[{'path': 'a/b/x.png', 'size': 1}, ...]`` becomes
+    ``{'format': 'columns', 'count': n, 'prefixed': ['path'], 'prefixes': ['a/b/'],
+    'columns': {'path': ['0:x.png'], 'size': [1]}}``. Values of the ``prefixed``
+    fields are ``"<index into prefixes>:<rest>"``; everything else (including
+    nulls) is stored unchanged.
+    """
+    fields = list(rows[0]) if rows else []
+    columns = {field: [] for field in fields}
+    prefixes = {}
+    for row in rows:
+        for field in fields:
+            value = row.get(field)
+            if field in prefixed and isinstance(value, str):
+                head, sep, tail = value.rpartition('/')
+                value = f"{prefixes.setdefault(head + sep, len(prefixes))}:{tail}"
+            columns[field].append(value)
+    return {'format': 'columns', 'count': len(rows), 'prefixed': [field for field in fields if field in prefixed],
+            'prefixes': list(prefixes), 'columns': columns}
+
+class PrecompressedCache:
+    """Byte-bounded LRU of encoded response bodies, keyed by ``(etag, encoding)``
+
+    Only responses whose ETag is derived from an index version are stored, so a
+    change to the catalog simply stops the old entries from being asked for.
+    """
+
+    def __init__(self, max_bytes=PRECOMPRESSED_CACHE_BYTES):
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()
+        self.bytes = 0
+        self.lock = threading.Lock()
+        self.counters = {'hits': 0, 'misses': 0}
+
+    def get(self, etag, encoding):
+        """``(body, applied_encoding)`` for a client accepting ``encoding``, or None"""
+        with self.lock:
+            entry = self.entries.get((etag, encoding))
+            if entry is None:
+                self.counters['misses'] += 1
+                return None
+            self.entries.move_to_end((etag, encoding))
+            self.counters['hits'] += 1
+            return entry
+
+    def put(self, etag, encoding, body, applied):
+        """Store ``body`` for clients accepting ``encoding``; ``applied`` is None if it was too small to compress"""
+        if len(body) > self.max_bytes:
+            return
+        with self.lock:
+            previous = self.entries.pop((etag, encoding), None)
+            if previous is not None:
+                self.bytes -= len(previous[0])
+            self.entries[(etag, encoding)] = (body, applied)
+            self.bytes += len(body)
+            while self.bytes > self.max_bytes:
+                _, (evicted, _) = self.entries.popitem(last=False)
+                self.bytes -= len(evicted)
+
+    def stats(self):
+        with self.lock:
+            return {'entries': len(self.entries), 'bytes': self.bytes, 'max_bytes': self.max_bytes,
+                    'encodings': list(supported_encodings()), **self.counters}
@@ -0,0 +1,111 @@
+import json
+import time
+import queue
+import threading
+from collections import deque
+from datetime import datetime
+
+BATCH_INTERVAL = 0.1  # Seconds between console frames; records logged in between share one write
+SUBSCRIBER_BACKLOG = 64  # Batches a threaded subscriber may fall behind before it is dropped
+
+def encode_entry(entry):
+    """One SSE frame for a ``(created, level, message)`` console entry"""
+    created, level, message = entry
+    data = {
+        'time': datetime.fromtimestamp(created).strftime('%Y-%m-%d %H:%M:%S'),
+        'level': level,
+        'message': message
+    }
+    return f"data: {json.dumps(data, default=str)}\n\n".encode()
+
+class ConsoleSubscriber:
+    """A threaded /api/console client; its own request thread drains ``frames``"""
+
+    def __init__(self):
+        self.frames = queue.Queue(maxsize=SUBSCRIBER_BACKLOG)
+        self.dropped = False
+
+class ConsoleBroadcaster:
+    """Ring buffer of log records plus a background thread that streams them to console clients
+
+    ``push()`` is what the logging call pays for: two deque appends, no locks
+    and no I/O. Every ``interval`` the broadcaster thread encodes whatever was
+    logged since the last tick into one batch and hands it to the SSE hub (asyncio
+    mode) and to each threaded subscriber's bounded queue. A subscriber that lets
+    its queue fill is marked dropped and disconnected by its own thread.
+    """
+
+    def __init__(self, history=1000, interval=BATCH_INTERVAL):
+        self.history = deque(maxlen=history)
+        self.pending = deque(maxlen=history)
+        self.interval = interval
+        self.hub = None
+        self.subscribers = set()
+        self.lock = threading.Lock()
+        self.batches = 0
+        self.dropped = 0
+        self.thread = threading.Thread(target=self._run, daemon=True, name='console-broadcaster')
+        self.thread.start()
+
+    def push(self, record):
+        entry = (record.created, record.levelname, record.msg)
+        self.history.append(entry)
+        self.pending.append(entry)
+
+    def backlog(self):
+        """Encoded frames for the records already broadcast, oldest first"""
+        entries = list(self.history)
+        # Records still pending go out with the next batch, which a new subscriber receives anyway
+        sent = len(entries) - min(len(self.pending), len(entries))
+        return [encode_entry(entry) for entry in entries[:sent]]
+
+    def subscribe(self):
+        subscriber = ConsoleSubscriber()
+        with self.lock:
+            self.subscribers.add(subscriber)
+        return subscriber
+
+    def unsubscribe(self, subscriber):
+        with self.lock:
+            self.subscribers.discard(subscriber)
+
+    def _run(self):
+        while True:
+            time.sleep(self.interval)
+            try:
+                self.flush()
+            except Exception as e:
+                # Don't log from here: the record would land straight back in our own queue
+                print(f"Console broadcaster error: {e}")
+
+    def flush(self):
+        entries = []
+        while self.pending:
+            entries.append(self.pending.popleft())
+        if not entries:
+            return
+        frame = b''.join(encode_entry(entry) for entry in entries)
+        self.batches += 1
+
+        if self.hub:
+            self.hub.publish('console', frame)
+        with self.lock:
+            subscribers = list(self.subscribers)
+        for subscriber in subscribers:
+            try:
+                subscriber.frames.put_nowait(frame)
+            except queue.Full:
+                subscriber.dropped = True
+                self.unsubscribe(subscriber)
+                self.dropped += 1
+
+    def stats(self):
+        with self.lock:
+            subscribers = len(self.subscribers)
+        return {
+            'buffered': len(self.history),
+            'pending': len(self.pending),
+            'batches': self.batches,
+            'threaded_subscribers': subscribers,
+            'dropped': self.dropped
+        }
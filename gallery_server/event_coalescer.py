@@ -0,0 +1,113 @@
+import os
+import time
+import logging
+import threading
+
+COALESCE_WINDOW = 1.0  # Seconds a batch stays open after its first ready event
+SETTLE_TIME = 0.5  # Seconds a file's size and mtime must hold still before it counts as written
+SETTLE_TIMEOUT = 30  # Give up waiting and publish anyway (e.g. a file that really is empty)
+POLL_INTERVAL = 0.25
+
+class EventCoalescer:
+    """Debounces watchdog events and delivers them in batches
+
+    Created and modified files are held until their size and mtime have stopped
+    changing for ``settle`` seconds, so a half-written PNG is never catalogued.
+    Everything that became ready within ``window`` seconds, together with any
+    deletes and directory moves, is handed to ``on_flush(upserts, removes, moves)``
+    in a single call from the coalescer's own thread.
+    """
+
+    def __init__(self, on_flush, window=COALESCE_WINDOW, settle=SETTLE_TIME, poll=POLL_INTERVAL):
+        self.on_flush = on_flush
+        self.window = window
+        self.settle = settle
+        self.poll = poll
+        self.lock = threading.RLock()
+        self.pending = {}  # path -> [signature, unchanged_since, first_seen]
+        self.ready = {}  # Insertion-ordered sets of full paths
+        self.removes = {}
+        self.moves = []
+        self.batch_started = None
+        self.thread = threading.Thread(target=self._run, daemon=True, name='event-coalescer')
+        self.thread.start()
+
+    def touched(self, path, settled=False):
+        """A file was created or modified; ``settled`` skips the stability wait (e.g. a rename)"""
+        with self.lock:
+            if settled:
+                self.pending.pop(path, None)
+                self._mark_ready(path)
+            else:
+                self.ready.pop(path, None)
+                if path not in self.pending:
+                    self.pending[path] = [None, None, time.monotonic()]
+
+    def deleted(self, path):
+        """A file or a whole directory went away"""
+        with self.lock:
+            prefix = path.rstrip(os.sep) + os.sep
+            for table in (self.pending, self.ready):
+                for stale in [p for p in table if p == path or p.startswith(prefix)]:
+                    del table[stale]
+            self.removes[path] = None
+            self._start_batch()
+
+    def moved_directory(self, src_path, dest_path):
+        with self.lock:
+            self.deleted(src_path)
+            self.moves.append((src_path, dest_path))
+
+    def _mark_ready(self, path):
+        self.removes.pop(path, None)
+        self.ready[path] = None
+        self._start_batch()
+
+    def _start_batch(self):
+        if self.batch_started is None:
+            self.batch_started = time.monotonic()
+
+    def _run(self):
+        while True:
+            time.sleep(self.poll)
+            try:
+                self.tick()
+            except Exception as e:
+                logging.error(f"❌ Error processing file events: {e}")
+
+    def _check_settled(self, now):
+        with self.lock:
+            paths = list(self.pending)
+        for path in paths:
+            try:
+                stat = os.stat(path)
+                signature = (stat.st_size, stat.st_mtime_ns)
+            except OSError:
+                signature = None
+            with self.lock:
+                state = self.pending.get(path)
+                if state is None:
+                    continue
+                if signature is None:
+                    # Gone before it settled; the delete event takes care of the rest
+                    del self.pending[path]
+                elif signature != state[0]:
+                    state[0], state[1] = signature, now
+                elif (signature[0] > 0 and now - state[1] >= self.settle) or now - state[2] >= SETTLE_TIMEOUT:
+                    del self.pending[path]
+                    self._mark_ready(path)
+
+    def tick(self):
+        now = time.monotonic()
+        self._check_settled(now)
+        with self.lock:
+            if self.batch_started is None or now - self.batch_started < self.window:
+                return
+            upserts, removes, moves = list(self.ready), list(self.removes), self.moves
+            self.ready, self.removes, self.moves = {}, {}, []
+            self.batch_started = None
+        self.on_flush(upserts, removes, moves)
+
+    def backlog(self):
+        with self.lock:
+            return len(self.pending) + len(self.ready) + len(self.removes) + len(self.moves)
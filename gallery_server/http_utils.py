@@ -0,0 +1,67 @@
+import re
+from email.utils import parsedate_to_datetime
+
+RANGE_PATTERN = re.compile(r'^bytes=(\d*)-(\d*)$')
+ENCODED_ETAG_PATTERN = re.compile(r'-(gzip|br)"$')
+
+def parse_range(header, size):
+    """Parse a single-range ``Range`` header against a file of ``size`` bytes
+
+    Returns ``None`` when the header is absent or should be ignored (malformed or
+    multi-range; the full file is sent instead), ``(start, end)`` inclusive for a
+    satisfiable range, or raises ``ValueError`` for an unsatisfiable one (416).
+    """
+    if not header:
+        return None
+    match = RANGE_PATTERN.match(header.strip())
+    if not match:
+        return None
+    start, end = match.groups()
+    if not start and not end:
+        return None
+
+    if not start:
+        # Suffix range: the last N bytes
+        length = int(end)
+        if length == 0 or size == 0:
+            raise ValueError('Empty suffix range')
+        return max(0, size - length), size - 1
+
+    start = int(start)
+    end = int(end) if end else size - 1
+    if start >= size or end < start:
+        raise ValueError('Range not satisfiable')
+    return start, min(end, size - 1)
+
+def file_etag(stat):
+    """Strong validator for a file, from its size and nanosecond mtime"""
+    return f'"{stat.st_size:x}-{stat.st_mtime_ns:x}"'
+
+def etag_matches(header, etag):
+    """``If-None-Match`` comparison (weak, as RFC 9110 requires for this header)"""
+    if not header:
+        return False
+    if header.strip() == '*':
+        return True
+    bare = identity_etag(etag.removeprefix('W/'))
+    return any(identity_etag(candidate.strip().removeprefix('W/')) == bare for candidate in header.split(','))
+
+def encoded_etag(etag, encoding):
+    """ETag of a compressed representation (``"v1"`` -> ``"v1-gzip"``); each encoding needs its own"""
+    return f'{etag[:-1]}-{encoding}"' if encoding else etag
+
+def identity_etag(etag):
+    """Undo ``encoded_etag``, so a client holding the gzip copy still validates against the same version"""
+    return ENCODED_ETAG_PATTERN.sub('"', etag)
+
+def not_modified_since(header, mtime):
+    """True when ``If-Modified-Since`` is at or after ``mtime`` (whole seconds)"""
+    if not header:
+        return False
+    try:
+        since = parsedate_to_datetime(header)
+    except (TypeError, ValueError):
+        return False
+    if since is None:
+        return False
+    return int(mtime) <= since.timestamp()
@@ -0,0 +1,311 @@
+import os
+import logging
+import sqlite3
+import threading
+import json
+import base64
+import uuid
+from contextlib import contextmanager
+from datetime import datetime
+
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.gif', '.webp')
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+
+def encode_cursor(mtime, path):
+    """Opaque cursor pointing just after (mtime, path) in date-descending order"""
+    raw = json.dumps([mtime, path]).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+def decode_cursor(cursor):
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        mtime, path = json.loads(raw.decode('utf-8'))
+        return float(mtime), str(path)
+    except Exception:
+        raise ValueError(f"Invalid cursor: {cursor}")
+
+def parse_date_bound(value):
+    """Accept an epoch timestamp, YYYY-MM-DD or YYYY-MM-DD HH:MM:SS"""
+    if value is None or value == '':
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    for fmt in ('%Y-%m-%d %H:%M:%S', '%Y-%m-%dT%H:%M:%S', '%Y-%m-%d'):
+        try:
+            return datetime.strptime(value, fmt).timestamp()
+        except ValueError:
+            continue
+    raise ValueError(f"Invalid date: {value}")
+
+def escape_like(value):
+    return value.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+
+def scan_files(root, extensions):
+    """Walk ``root`` once, yielding (rel_path, mtime, size) per file ending in one of ``extensions``"""
+    stack = [root]
+    while stack:
+        current = stack.pop()
+        try:
+            with os.scandir(current) as entries:
+                for entry in entries:
+                    try:
+                        if entry.is_dir(follow_symlinks=False):
+                            stack.append(entry.path)
+                        elif entry.name.lower().endswith(extensions):
+                            stat = entry.stat()
+                            yield os.path.relpath(entry.path, root).replace('\\', '/'), stat.st_mtime, stat.st_size
+                    except OSError:
+                        continue
+        except OSError as e:
+            logging.warning(f"⚠️ Unable to scan {current}: {e}")
+
+def keyset_page(conn, table, columns, limit=DEFAULT_PAGE_SIZE, cursor=None, folder=None, since=None, until=None,
+                name=None):
+    """One date-descending page of ``table`` rows plus the cursor for the next page
+
+    Uses keyset pagination on (mtime, path), so every page costs the same
+    regardless of how deep into the table it is. ``table`` needs ``path``,
+    ``name``, ``folder`` and ``mtime`` columns, and ``columns`` must select
+    ``path, name, mtime`` first.
+    """
+    limit = max(1, min(int(limit), MAX_PAGE_SIZE))
+    clauses = []
+    params = []
+
+    if cursor:
+        cursor_mtime, cursor_path = decode_cursor(cursor)
+        clauses.append('(mtime < ? OR (mtime = ? AND path > ?))')
+        params.extend([cursor_mtime, cursor_mtime, cursor_path])
+    if folder:
+        folder = folder.strip('/')
+        clauses.append("(folder = ? OR folder LIKE ? ESCAPE '\\')")
+        params.extend([folder, escape_like(folder) + '/%'])
+    if since is not None:
+        clauses.append('mtime >= ?')
+        params.append(since)
+    if until is not None:
+        clauses.append('mtime <= ?')
+        params.append(until)
+    if name:
+        clauses.append("name LIKE ? ESCAPE '\\'")
+        params.append('%' + escape_like(name) + '%')
+
+    where = ('WHERE ' + ' AND '.join(clauses)) if clauses else ''
+    sql = f'SELECT {columns} FROM {table} {where} ORDER BY mtime DESC, path LIMIT ?'
+    rows = conn.execute(sql, params + [limit + 1]).fetchall()
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1][2], rows[-1][0])
+    return rows, next_cursor
+
+class ImageCatalog:
+    """Persistent SQLite index of the images under the ComfyUI output directory"""
+
+    def __init__(self, db_path, output_dir):
+        self.db_path = db_path
+        self.output_dir = os.path.abspath(output_dir)
+        self.lock = threading.RLock()
+        self.conn = sqlite3.connect(db_path, check_same_thread=False)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('PRAGMA synchronous=NORMAL')
+        self.conn.execute('''
+            CREATE TABLE IF NOT EXISTS images (
+                path TEXT PRIMARY KEY,
+                name TEXT NOT NULL,
+                folder TEXT NOT NULL,
+                mtime REAL NOT NULL,
+                size INTEGER NOT NULL,
+                thumbnail TEXT
+            )
+        ''')
+        self.conn.execute('CREATE INDEX IF NOT EXISTS idx_images_mtime ON images (mtime DESC, path)')
+        self.conn.execute('CREATE INDEX IF NOT EXISTS idx_images_folder ON images (folder, mtime DESC, path)')
+        self.conn.execute('CREATE INDEX IF NOT EXISTS idx_images_thumbnail ON images (thumbnail)')
+        self.conn.commit()
+
+        # Bumped on every write; lets HTTP handlers build ETags without querying
+        self.generation = uuid.uuid4().hex[:8]
+        self.version = 0
+
+    @contextmanager
+    def transaction(self):
+        with self.lock:
+            with self.conn:
+                yield self.conn
+            self.version += 1
+
+    def version_tag(self):
+        """Opaque token that changes whenever the catalog contents change"""
+        return f"{self.generation}-{self.version}"
+
+    def rel_path(self, full_path):
+        """Return the catalog key (output-relative, forward slashes) for a file"""
+        return os.path.relpath(full_path, self.output_dir).replace('\\', '/')
+
+    def full_path(self, rel_path):
+        return os.path.join(self.output_dir, rel_path)
+
+    def scan(self):
+        """Walk the output directory once, yielding (rel_path, mtime, size) per image"""
+        return scan_files(self.output_dir, IMAGE_EXTENSIONS)
+
+    def sync(self):
+        """Reconcile the catalog with the disk, returning the paths that were added or changed"""
+        with self.lock:
+            known = {row[0]: (row[1], row[2]) for row in
+                     self.conn.execute('SELECT path, mtime, size FROM images')}
+
+        changed = []
+        seen = set()
+        for rel_path, mtime, size in self.scan():
+            seen.add(rel_path)
+            if known.get(rel_path) != (mtime, size):
+                changed.append((rel_path, mtime, size))
+
+        removed = [path for path in known if path not in seen]
+
+        with self.transaction():
+            self.conn.executemany(
+                'INSERT OR REPLACE INTO images (path, name, folder, mtime, size, thumbnail) VALUES (?, ?, ?, ?, ?, NULL)',
+                [self._row(rel_path, mtime, size) for rel_path, mtime, size in changed]
+            )
+            self.conn.executemany('DELETE FROM images WHERE path = ?', [(path,) for path in removed])
+
+        logging.info(f"📚 Catalog synced: {len(seen)} images, {len(changed)} new or changed, {len(removed)} removed")
+        return [rel_path for rel_path, _, _ in changed]
+
+    def _row(self, rel_path, mtime, size):
+        folder, name = os.path.split(rel_path)
+        return (rel_path, name, folder, mtime, size)
+
+    def upsert(self, full_path):
+        """Add or refresh a single image from disk, returning its catalog key"""
+        if not full_path.lower().endswith(IMAGE_EXTENSIONS):
+            return None
+        try:
+            stat = os.stat(full_path)
+        except OSError:
+            return self.remove(full_path)
+
+        rel_path = self.rel_path(full_path)
+        with self.transaction():
+            # An unchanged file (e.g. the watcher echoing a rename we already applied) keeps its thumbnail
+            self.conn.execute(
+                'INSERT INTO images (path, name, folder, mtime, size, thumbnail) VALUES (?, ?, ?, ?, ?, NULL) '
+                'ON CONFLICT(path) DO UPDATE SET name = excluded.name, folder = excluded.folder, '
+                'mtime = excluded.mtime, size = excluded.size, thumbnail = CASE '
+                'WHEN images.mtime = excluded.mtime AND images.size = excluded.size THEN images.thumbnail END',
+                self._row(rel_path, stat.st_mtime, stat.st_size)
+            )
+        return rel_path
+
+    def remove(self, full_path):
+        """Drop an image (or every image below a removed directory) from the catalog"""
+        rel_path = self.rel_path(full_path)
+        prefix = rel_path.rstrip('/') + '/'
+        with self.transaction():
+            self.conn.execute('DELETE FROM images WHERE path = ? OR substr(path, 1, ?) = ?',
+                              (rel_path, len(prefix), prefix))
+        return None
+
+    def remove_many(self, rel_paths):
+        """Drop many images in one transaction, returning the thumbnails no remaining image uses"""
+        with self.transaction():
+            thumbnails = set()
+            for rel_path in rel_paths:
+                row = self.conn.execute('SELECT thumbnail FROM images WHERE path = ?', (rel_path,)).fetchone()
+                if row and row[0]:
+                    thumbnails.add(row[0])
+            self.conn.executemany('DELETE FROM images WHERE path = ?', [(rel_path,) for rel_path in rel_paths])
+            return [name for name in thumbnails
+                    if not self.conn.execute('SELECT 1 FROM images WHERE thumbnail = ? LIMIT 1', (name,)).fetchone()]
+
+    def move_many(self, moves):
+        """Re-key ``(src_rel, dest_rel)`` renames in one transaction; thumbnails are content-addressed, so they carry over"""
+        rows = []
+        for src_rel, dest_rel in moves:
+            folder, name = os.path.split(dest_rel)
+            rows.append((dest_rel, name, folder, src_rel))
+        with self.transaction():
+            self.conn.executemany('UPDATE OR REPLACE images SET path = ?, name = ?, folder = ? WHERE path = ?', rows)
+
+    def set_thumbnail(self, rel_path, thumb_filename):
+        with self.transaction():
+            self.conn.execute('UPDATE images SET thumbnail = ? WHERE path = ?', (thumb_filename, rel_path))
+
+    def clear_thumbnails(self, thumb_filenames):
+        with self.transaction():
+            self.conn.executemany('UPDATE images SET thumbnail = NULL WHERE thumbnail = ?',
+                                  [(name,) for name in thumb_filenames])
+
+    def thumbnail_names(self):
+        with self.lock:
+            return {row[0] for row in
+                    self.conn.execute('SELECT DISTINCT thumbnail FROM images WHERE thumbnail IS NOT NULL')}
+
+    def thumbnail_in_use(self, thumb_filename):
+        with self.lock:
+            return self.conn.execute('SELECT 1 FROM images WHERE thumbnail = ? LIMIT 1',
+                                     (thumb_filename,)).fetchone() is not None
+
+    def path_for_thumbnail(self, thumb_filename):
+        """Catalog key of an image currently using ``thumb_filename``"""
+        with self.lock:
+            row = self.conn.execute('SELECT path FROM images WHERE thumbnail = ? LIMIT 1',
+                                    (thumb_filename,)).fetchone()
+        return row[0] if row else None
+
+    def missing_thumbnails(self):
+        with self.lock:
+            return [row[0] for row in
+                    self.conn.execute('SELECT path FROM images WHERE thumbnail IS NULL ORDER BY mtime DESC')]
+
+    def get(self, rel_path):
+        with self.lock:
+            row = self.conn.execute('SELECT path, name, mtime, size, thumbnail FROM images WHERE path = ?',
+                                    (rel_path,)).fetchone()
+        return self._entry(row) if row else None
+
+    def list_images(self):
+        """Return every catalogued image, newest first, in the /api/images format"""
+        with self.lock:
+            rows = self.conn.execute(
+                'SELECT path, name, mtime, size, thumbnail FROM images ORDER BY mtime DESC, path'
+            ).fetchall()
+        return [self._entry(row) for row in rows]
+
+    def query_images(self, limit=DEFAULT_PAGE_SIZE, cursor=None, folder=None, since=None, until=None, name=None):
+        """Return one date-descending page of images plus the cursor for the next page (see keyset_page)"""
+        with self.lock:
+            rows, next_cursor = keyset_page(self.conn, 'images', 'path, name, mtime, size, thumbnail', limit=limit,
+                                            cursor=cursor, folder=folder, since=since, until=until, name=name)
+        return [self._entry(row) for row in rows], next_cursor
+
+    def iter_images(self, folder=None, since=None, until=None, name=None):
+        """Yield every matching image, newest first, one MAX_PAGE_SIZE page in memory at a time"""
+        cursor = None
+        while True:
+            images, cursor = self.query_images(limit=MAX_PAGE_SIZE, cursor=cursor, folder=folder,
+                                               since=since, until=until, name=name)
+            yield from images
+            if not cursor:
+                return
+
+    def _entry(self, row):
+        path, name, mtime, size, thumbnail = row
+        return {
+            'path': path,
+            'name': name,
+            'date': datetime.fromtimestamp(mtime).strftime('%Y-%m-%d %H:%M:%S'),
+            'size': size,
+            'thumbnail': f'/thumbnails/{thumbnail}' if thumbnail else None
+        }
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
@@ -0,0 +1,301 @@
+import os
+import json
+import zlib
+import struct
+import logging
+import sqlite3
+import threading
+from datetime import datetime
+from text_index import TEXT_EXTENSIONS
+from image_catalog import scan_files
+
+SEARCH_EXTENSIONS = TEXT_EXTENSIONS + ('.png',)
+MAX_INDEXED_CHARS = 1024 * 1024  # Only the head of very large text files is searchable
+INDEX_BATCH_SIZE = 200  # Files read per write transaction during a full sync
+PNG_SIGNATURE = b'\x89PNG\r\n\x1a\n'
+PNG_TEXT_KEYS = ('prompt', 'workflow', 'parameters')  # ComfyUI API/UI graphs and A1111-style parameters
+DEFAULT_SEARCH_LIMIT = 20
+MAX_SEARCH_LIMIT = 200
+
+def png_text_chunks(path):
+    """Read tEXt/zTXt/iTXt chunks from a PNG without decoding any image data"""
+    chunks = {}
+    with open(path, 'rb') as f:
+        if f.read(8) != PNG_SIGNATURE:
+            return chunks
+        while True:
+            header = f.read(8)
+            if len(header) < 8:
+                break
+            length, chunk_type = struct.unpack('>I4s', header)
+            if chunk_type == b'IEND':
+                break
+            if chunk_type not in (b'tEXt', b'zTXt', b'iTXt'):
+                f.seek(length + 4, os.SEEK_CUR)  # Skip data and CRC
+                continue
+            data = f.read(length)
+            f.seek(4, os.SEEK_CUR)
+            try:
+                key, _, rest = data.partition(b'\0')
+                key = key.decode('latin-1')
+                if chunk_type == b'tEXt':
+                    value = rest.decode('latin-1')
+                elif chunk_type == b'zTXt':
+                    value = zlib.decompress(rest[1:]).decode('latin-1')
+                else:
+                    compressed, rest = rest[0], rest[2:]
+                    _, _, rest = rest.partition(b'\0')  # Language tag
+                    _, _, rest = rest.partition(b'\0')  # Translated keyword
+                    value = (zlib.decompress(rest) if compressed else rest).decode('utf-8')
+                chunks[key] = value
+            except Exception:
+                continue
+    return chunks
+
+def collect_strings(value, out):
+    """Gather the human-written strings (prompts, filenames, model names) from a JSON graph"""
+    if isinstance(value, str):
+        text = value.strip()
+        if text and not text.replace('.', '', 1).isdigit():
+            out.append(text)
+    elif isinstance(value, dict):
+        for item in value.values():
+            collect_strings(item, out)
+    elif isinstance(value, list):
+        for item in value:
+            collect_strings(item, out)
+
+def png_search_text(path):
+    """Searchable text from the generation metadata ComfyUI embeds in its PNGs"""
+    chunks = png_text_chunks(path)
+    strings = []
+    if 'prompt' in chunks:
+        try:
+            # API-format graph: only node inputs carry prompts, class names add noise
+            graph = json.loads(chunks['prompt'])
+            for node in graph.values():
+                if isinstance(node, dict):
+                    collect_strings(node.get('inputs', {}), strings)
+        except (ValueError, AttributeError):
+            strings.append(chunks['prompt'])
+    elif 'workflow' in chunks:
+        try:
+            workflow = json.loads(chunks['workflow'])
+            for node in workflow.get('nodes', []):
+                collect_strings(node.get('widgets_values', []), strings)
+        except (ValueError, AttributeError):
+            strings.append(chunks['workflow'])
+    if 'parameters' in chunks:
+        strings.append(chunks['parameters'])
+    return '\n'.join(dict.fromkeys(strings))
+
+def read_search_text(full_path):
+    if full_path.lower().endswith('.png'):
+        return 'image', png_search_text(full_path)
+    with open(full_path, 'r', encoding='utf-8', errors='replace') as f:
+        return 'text', f.read(MAX_INDEXED_CHARS)
+
+def fts_query(text):
+    """Turn free text into an FTS5 query: every term must match, the last one as a prefix"""
+    terms = [term.replace('"', '""') for term in text.split()]
+    if not terms:
+        return None
+    quoted = [f'"{term}"' for term in terms]
+    quoted[-1] += '*'
+    return ' '.join(quoted)
+
+class SearchIndex:
+    """SQLite FTS5 index over text outputs and the prompt metadata embedded in PNGs
+
+    ``search_sources`` remembers each file's (mtime, size) so a sync only reads
+    files that changed; ``search_documents`` is the inverted index, keyed by the
+    source row id so single files can be replaced or dropped cheaply.
+    """
+
+    def __init__(self, db_path, output_dir):
+        self.output_dir = os.path.abspath(output_dir)
+        self.lock = threading.RLock()
+        self.conn = sqlite3.connect(db_path, check_same_thread=False)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('PRAGMA synchronous=NORMAL')
+        self.conn.execute('''
+            CREATE TABLE IF NOT EXISTS search_sources (
+                id INTEGER PRIMARY KEY,
+                path TEXT UNIQUE NOT NULL,
+                kind TEXT NOT NULL,
+                mtime REAL NOT NULL,
+                size INTEGER NOT NULL
+            )
+        ''')
+        self.conn.execute('''
+            CREATE VIRTUAL TABLE IF NOT EXISTS search_documents
+            USING fts5(name, content, kind UNINDEXED, prefix = '2 3', tokenize = 'unicode61 remove_diacritics 2')
+        ''')
+        # Filename matches count five times as much as body matches; stored with the table
+        self.conn.execute("INSERT INTO search_documents (search_documents, rank) VALUES ('rank', 'bm25(5.0, 1.0)')")
+        self.conn.commit()
+
+    def rel_path(self, full_path):
+        return os.path.relpath(full_path, self.output_dir).replace('\\', '/')
+
+    def full_path(self, rel_path):
+        return os.path.join(self.output_dir, rel_path)
+
+    def scan(self):
+        """Walk the output directory once, yielding (rel_path, mtime, size) per searchable file"""
+        return scan_files(self.output_dir, SEARCH_EXTENSIONS)
+
+    def sync(self):
+        """Bring the index up to date with the disk, reading only new or changed files"""
+        with self.lock:
+            known = {row[0]: (row[1], row[2]) for row in
+                     self.conn.execute('SELECT path, mtime, size FROM search_sources')}
+
+        changed = []
+        seen = set()
+        for rel_path, mtime, size in self.scan():
+            seen.add(rel_path)
+            if known.get(rel_path) != (mtime, size):
+                changed.append((rel_path, mtime, size))
+        removed = [path for path in known if path not in seen]
+
+        for start in range(0, len(changed), INDEX_BATCH_SIZE):
+            documents = []
+            for rel_path, mtime, size in changed[start:start + INDEX_BATCH_SIZE]:
+                document = self._read(rel_path, mtime, size)
+                if document:
+                    documents.append(document)
+            with self.lock:
+                with self.conn:
+                    for document in documents:
+                        self._write(*document)
+        with self.lock:
+            with self.conn:
+                for path in removed:
+                    self._delete(path)
+
+        logging.info(f"🔎 Search index synced: {len(seen)} files, {len(changed)} new or changed, {len(removed)} removed")
+        return len(changed)
+
+    def _read(self, rel_path, mtime, size):
+        try:
+            kind, content = read_search_text(self.full_path(rel_path))
+        except Exception as e:
+            logging.warning(f"⚠️ Could not index {rel_path}: {e}")
+            return None
+        return rel_path, kind, mtime, size, content
+
+    def _write(self, rel_path, kind, mtime, size, content):
+        self._delete(rel_path)
+        cursor = self.conn.execute(
+            'INSERT INTO search_sources (path, kind, mtime, size) VALUES (?, ?, ?, ?)',
+            (rel_path, kind, mtime, size)
+        )
+        self.conn.execute('INSERT INTO search_documents (rowid, name, content, kind) VALUES (?, ?, ?, ?)',
+                          (cursor.lastrowid, os.path.basename(rel_path), content, kind))
+
+    def _delete(self, rel_path, prefix=None):
+        if prefix:
+            rows = self.conn.execute('SELECT id FROM search_sources WHERE path = ? OR substr(path, 1, ?) = ?',
+                                     (rel_path, len(prefix), prefix)).fetchall()
+        else:
+            rows = self.conn.execute('SELECT id FROM search_sources WHERE path = ?', (rel_path,)).fetchall()
+        ids = [(row[0],) for row in rows]
+        self.conn.executemany('DELETE FROM search_documents WHERE rowid = ?', ids)
+        self.conn.executemany('DELETE FROM search_sources WHERE id = ?', ids)
+
+    def upsert(self, full_path):
+        """Index (or re-index) one file reported by the watcher"""
+        if not full_path.lower().endswith(SEARCH_EXTENSIONS):
+            return None
+        try:
+            stat = os.stat(full_path)
+        except OSError:
+            return self.remove(full_path)
+        rel_path = self.rel_path(full_path)
+        with self.lock:
+            known = self.conn.execute('SELECT mtime, size FROM search_sources WHERE path = ?', (rel_path,)).fetchone()
+        if known == (stat.st_mtime, stat.st_size):
+            return rel_path
+        document = self._read(rel_path, stat.st_mtime, stat.st_size)
+        if document:
+            with self.lock:
+                with self.conn:
+                    self._write(*document)
+        return rel_path
+
+    def remove(self, full_path):
+        """Drop a file, or everything below a removed directory"""
+        rel_path = self.rel_path(full_path)
+        with self.lock:
+            with self.conn:
+                self._delete(rel_path, prefix=rel_path.rstrip('/') + '/')
+        return None
+
+    def remove_many(self, rel_paths):
+        with self.lock:
+            with self.conn:
+                for rel_path in rel_paths:
+                    self._delete(rel_path)
+
+    def move_many(self, moves):
+        """Follow ``(src_rel, dest_rel)`` renames without re-reading the files"""
+        with self.lock:
+            with self.conn:
+                for src_rel, dest_rel in moves:
+                    row = self.conn.execute('SELECT id FROM search_sources WHERE path = ?', (src_rel,)).fetchone()
+                    if not row:
+                        continue
+                    self._delete(dest_rel)
+                    self.conn.execute('UPDATE search_sources SET path = ? WHERE id = ?', (dest_rel, row[0]))
+                    self.conn.execute('UPDATE search_documents SET name = ? WHERE rowid = ?',
+                                      (os.path.basename(dest_rel), row[0]))
+
+    def search(self, text, limit=DEFAULT_SEARCH_LIMIT, offset=0, kind=None):
+        """Ranked hits for ``text`` (BM25, filename matches weighted up) plus the next page's offset"""
+        query = fts_query(text)
+        if not query:
+            return [], None
+        limit = max(1, min(int(limit), MAX_SEARCH_LIMIT))
+        offset = max(0, int(offset))
+        # ORDER BY rank lets FTS5 stop after the page, so snippets are only built for returned rows
+        sql = '''
+            SELECT rowid, kind, snippet(search_documents, 1, '<mark>', '</mark>', '…', 16), rank
+            FROM search_documents WHERE search_documents MATCH ?
+        '''
+        params = [query]
+        if kind:
+            sql += ' AND kind = ?'
+            params.append(kind)
+        sql += ' ORDER BY rank LIMIT ? OFFSET ?'
+        try:
+            with self.lock:
+                rows = self.conn.execute(sql, params + [limit + 1, offset]).fetchall()
+                rows = rows[:limit + 1]
+                placeholders = ','.join('?' * len(rows))
+                sources = {row[0]: row[1:] for row in self.conn.execute(
+                    f'SELECT id, path, mtime, size FROM search_sources WHERE id IN ({placeholders})',
+                    [row[0] for row in rows])}
+        except sqlite3.OperationalError as e:
+            raise ValueError(f"Invalid search query: {e}")
+
+        next_offset = offset + limit if len(rows) > limit else None
+        hits = []
+        for rowid, hit_kind, snippet, rank in rows[:limit]:
+            if rowid not in sources:
+                continue
+            path, mtime, size = sources[rowid]
+            hits.append({
+                'path': path,
+                'name': os.path.basename(path),
+                'kind': hit_kind,
+                'date': datetime.fromtimestamp(mtime).strftime('%Y-%m-%d %H:%M:%S'),
+                'size': size,
+                'snippet': snippet,
+                'score': round(-rank, 4)
+            })
+        return hits, next_offset
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
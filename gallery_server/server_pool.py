@@ -0,0 +1,276 @@
+import time
+import queue
+import socket
+import logging
+import selectors
+import threading
+from collections import deque
+from http.server import HTTPServer
+
+SATURATED_RESPONSE = (
+    b'HTTP/1.1 503 Service Unavailable\r\n'
+    b'Content-Type: text/plain\r\n'
+    b'Retry-After: 1\r\n'
+    b'Content-Length: 20\r\n'
+    b'Connection: close\r\n'
+    b'\r\n'
+    b'Server is saturated\n'
+)
+
+KEEPALIVE_TIMEOUT = 15  # Seconds an idle persistent connection is kept open
+MAX_KEEPALIVE_REQUESTS = 1000  # Requests served on one connection before it is closed
+MAX_IDLE_CONNECTIONS = 2048  # Parked connections beyond this are closed instead
+
+class LatencyWindow:
+    """Rolling window of recent durations, summarised in milliseconds"""
+
+    def __init__(self, size=1024):
+        self.samples = deque(maxlen=size)
+        self.lock = threading.Lock()
+
+    def add(self, seconds):
+        with self.lock:
+            self.samples.append(seconds)
+
+    def summary(self):
+        with self.lock:
+            samples = sorted(self.samples)
+        if not samples:
+            return {'count': 0, 'avg_ms': 0, 'p50_ms': 0, 'p95_ms': 0, 'max_ms': 0}
+        return {
+            'count': len(samples),
+            'avg_ms': round(sum(samples) / len(samples) * 1000, 2),
+            'p50_ms': round(samples[len(samples) // 2] * 1000, 2),
+            'p95_ms': round(samples[min(len(samples) - 1, int(len(samples) * 0.95))] * 1000, 2),
+            'max_ms': round(samples[-1] * 1000, 2)
+        }
+
+class ThreadedHTTPServer(HTTPServer):
+    """HTTP server backed by a fixed pool of worker threads and a bounded accept queue
+
+    Accepted connections wait in a queue of ``queue_size``; when it is full the
+    connection is answered with 503 straight from the accept thread. Handlers that
+    turn into long-lived streams (SSE) call ``begin_stream()``: the worker thread
+    is handed over to the stream, a replacement worker is started so the pool
+    keeps its size, and streams are capped separately at ``max_streams``.
+
+    Persistent (HTTP/1.1) connections do not hold a worker while idle: a handler
+    with nothing left to read calls ``park()``, and a selector thread puts the
+    connection back on the queue when its next request arrives, or closes it
+    after ``keepalive_timeout`` seconds of silence.
+    """
+
+    daemon_threads = True
+    request_queue_size = 128  # listen() backlog; the default of 5 drops SYNs under bursts
+
+    def __init__(self, server_address, handler_class, workers=32, queue_size=256, max_streams=100,
+                 keepalive_timeout=KEEPALIVE_TIMEOUT, max_idle=MAX_IDLE_CONNECTIONS):
+        super().__init__(server_address, handler_class)
+        self.workers = workers
+        self.max_streams = max_streams
+        self.keepalive_timeout = keepalive_timeout
+        self.max_idle = max_idle
+        self.requests = queue.Queue(maxsize=queue_size)
+        self.local = threading.local()
+        self.lock = threading.Lock()
+        self.busy = 0
+        self.streams = 0
+        self.handled = 0
+        self.rejected = 0
+        self.streams_rejected = 0
+        self.reused = 0
+        self.idle_closed = 0
+        self.idle_count = 0
+        self.detached = set()
+        self.served = {}  # connection -> requests answered on it so far
+        self.queue_wait = LatencyWindow()
+        self.service_time = LatencyWindow()
+        self.idle = selectors.DefaultSelector()
+        self.idle_pending = []
+        self.idle_wake_r, self.idle_wake_w = socket.socketpair()
+        self.idle_wake_r.setblocking(False)
+        self.idle.register(self.idle_wake_r, selectors.EVENT_READ)
+        self.idle_closing = False
+        threading.Thread(target=self._idle_loop, daemon=True, name='keepalive-idle').start()
+        for _ in range(workers):
+            self._spawn_worker()
+
+    def _spawn_worker(self):
+        threading.Thread(target=self._worker_loop, daemon=True).start()
+
+    def process_request(self, request, client_address):
+        """Queue the connection for a worker, or shed it with 503 if the queue is full"""
+        try:
+            self.requests.put_nowait((request, client_address, time.monotonic()))
+        except queue.Full:
+            with self.lock:
+                self.rejected += 1
+            try:
+                request.sendall(SATURATED_RESPONSE)
+            except OSError:
+                pass
+            self.shutdown_request(request)
+
+    def _worker_loop(self):
+        self.local.streaming = False
+        while True:
+            item = self.requests.get()
+            if item is None:
+                return
+            request, client_address, enqueued_at = item
+            started = time.monotonic()
+            self.queue_wait.add(started - enqueued_at)
+            self.local.parked = False
+            with self.lock:
+                self.busy += 1
+            try:
+                self.finish_request(request, client_address)
+            except Exception:
+                self.handle_error(request, client_address)
+                self.local.parked = False
+            finally:
+                if self.local.parked:
+                    self._park(request, client_address)
+                else:
+                    self.shutdown_request(request)
+                with self.lock:
+                    self.handled += 1
+                    if not self.local.streaming:
+                        self.busy -= 1
+            if self.local.streaming:
+                # This thread was handed to a stream; its replacement is already serving
+                return
+            self.service_time.add(time.monotonic() - started)
+
+    def begin_stream(self):
+        """Claim a stream slot for the current request; False when the stream limit is reached"""
+        with self.lock:
+            if self.streams >= self.max_streams:
+                self.streams_rejected += 1
+                return False
+            self.streams += 1
+            self.busy -= 1
+        self.local.streaming = True
+        self._spawn_worker()
+        return True
+
+    def end_stream(self):
+        with self.lock:
+            self.streams -= 1
+
+    def requests_served(self, request):
+        with self.lock:
+            return self.served.get(request, 0)
+
+    def park(self, request, requests_served):
+        """Called by a handler whose keep-alive connection is idle: release the worker once it returns"""
+        with self.lock:
+            self.served[request] = requests_served
+        self.local.parked = True
+
+    def _park(self, request, client_address):
+        with self.lock:
+            if self.idle_count + len(self.idle_pending) >= self.max_idle or self.idle_closing:
+                self.served.pop(request, None)
+                self.idle_closed += 1
+                park = False
+            else:
+                self.idle_pending.append((request, client_address, time.monotonic() + self.keepalive_timeout))
+                park = True
+        if not park:
+            super().shutdown_request(request)
+            return
+        try:
+            self.idle_wake_w.send(b'\0')
+        except OSError:
+            pass
+
+    def _idle_loop(self):
+        deadlines = {}
+        while not self.idle_closing:
+            try:
+                events = self.idle.select(timeout=1)
+            except OSError:
+                break
+            now = time.monotonic()
+            for key, _ in events:
+                if key.fileobj is self.idle_wake_r:
+                    try:
+                        while self.idle_wake_r.recv(4096):
+                            pass
+                    except OSError:
+                        pass
+                    continue
+                # The client sent its next request (or closed): back to the worker queue
+                request = key.fileobj
+                self.idle.unregister(request)
+                deadlines.pop(request, None)
+                with self.lock:
+                    self.reused += 1
+                    self.idle_count -= 1
+                self.process_request(request, key.data)
+            with self.lock:
+                pending, self.idle_pending = self.idle_pending, []
+            for request, client_address, deadline in pending:
+                try:
+                    self.idle.register(request, selectors.EVENT_READ, client_address)
+                    deadlines[request] = deadline
+                    with self.lock:
+                        self.idle_count += 1
+                except (ValueError, OSError):
+                    self._close_idle(request)
+            for request in [r for r, deadline in deadlines.items() if deadline <= now]:
+                self.idle.unregister(request)
+                del deadlines[request]
+                with self.lock:
+                    self.idle_count -= 1
+                self._close_idle(request)
+
+    def _close_idle(self, request):
+        with self.lock:
+            self.served.pop(request, None)
+            self.idle_closed += 1
+        super().shutdown_request(request)
+
+    def detach(self, request):
+        """Hand ownership of a connection to someone else (the SSE hub); the pool won't close it"""
+        with self.lock:
+            self.detached.add(request)
+
+    def shutdown_request(self, request):
+        with self.lock:
+            self.served.pop(request, None)
+            if request in self.detached:
+                self.detached.discard(request)
+                return
+        super().shutdown_request(request)
+
+    def stats(self):
+        with self.lock:
+            counters = {
+                'workers': self.workers,
+                'busy_workers': self.busy,
+                'queue_depth': self.requests.qsize(),
+                'queue_capacity': self.requests.maxsize,
+                'handled': self.handled,
+                'rejected': self.rejected,
+                'streams': self.streams,
+                'max_streams': self.max_streams,
+                'streams_rejected': self.streams_rejected,
+                'idle_connections': self.idle_count,
+                'keepalive_reused': self.reused,
+                'keepalive_closed': self.idle_closed
+            }
+        counters['queue_wait'] = self.queue_wait.summary()
+        counters['service_time'] = self.service_time.summary()
+        return counters
+
+    def server_close(self):
+        super().server_close()
+        self.idle_closing = True
+        for _ in range(self.workers):
+            try:
+                self.requests.put_nowait(None)
+            except queue.Full:
+                logging.warning("Request queue full while stopping workers")
+                break
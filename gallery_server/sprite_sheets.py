@@ -0,0 +1,241 @@
+import os
+import io
+import json
+import math
+import hashlib
+import logging
+import threading
+from PIL import Image
+
+from thumbnails import THUMBNAIL_SIZE
+
+MAX_SPRITE_TILES = 256  # Images per sheet; a /api/sprites page is capped to this
+MAX_SPRITE_SHEETS = 512  # Rendered sheets kept on disk; the least recently used are deleted beyond this
+MAX_SPRITE_MANIFESTS = 16384  # Page manifests without a rendered sheet (a few KB each; 400k images is ~2000 pages)
+EVICTION_HEADROOM = 0.9  # Evict down to this fraction of a cap so a full listing doesn't evict on every page
+SPRITE_QUALITY = 85
+SPRITE_NAME_LENGTH = 32  # Hex digits in a sheet key
+
+def sprite_key(thumb_filenames, tile=THUMBNAIL_SIZE):
+    """Sheet key: a digest of the member thumbnails (content-addressed) and the tile size
+
+    Any member being re-rendered, added or removed yields a different key, so
+    a sheet never has to be invalidated in place.
+    """
+    digest = hashlib.blake2b(digest_size=SPRITE_NAME_LENGTH // 2)
+    digest.update(f"{tile[0]}x{tile[1]}".encode('ascii'))
+    for name in thumb_filenames:
+        digest.update(b'\0' + name.encode('utf-8'))
+    return digest.hexdigest()
+
+def sprite_layout(count):
+    """(columns, rows) of a roughly square grid holding ``count`` tiles"""
+    columns = max(1, math.ceil(math.sqrt(count)))
+    rows = max(1, math.ceil(count / columns))
+    return columns, rows
+
+class SpriteSheets:
+    """Packs a page of thumbnails into one JPEG atlas, rendered on first request and kept on disk
+
+    ``describe(images)`` is cheap: it lays out the page, remembers which
+    thumbnails belong to the sheet and adds a ``sprite`` offset to every image
+    that has a thumbnail. The atlas itself is only drawn when ``/sprites/<key>.jpg``
+    is fetched, so listing the whole catalog does not render every page.
+
+    Rendered sheets and bare manifests are capped separately: listing every
+    page writes a manifest per page, and those must not push out the sheets
+    (or each other's manifests) that the gallery is about to request.
+    Evicting a sheet keeps its manifest, so it can be rendered again.
+    """
+
+    def __init__(self, thumbnail_cache, root=None, max_sheets=MAX_SPRITE_SHEETS, max_manifests=MAX_SPRITE_MANIFESTS,
+                 tile=THUMBNAIL_SIZE):
+        self.thumbnail_cache = thumbnail_cache
+        self.root = os.path.abspath(root or os.path.join(thumbnail_cache.root, 'sprites'))
+        self.max_sheets = max_sheets
+        self.max_manifests = max_manifests
+        self.tile = tile
+        os.makedirs(self.root, exist_ok=True)
+        self.lock = threading.Lock()
+        self.rendering = {}  # key -> [Lock, waiters], so concurrent requests for a new sheet render it once
+        self.counters = {'hits': 0, 'rendered': 0, 'incomplete': 0, 'evicted': 0, 'manifests_evicted': 0}
+        sheets, manifests = self._scan()
+        self.sheets = len(sheets)
+        self.manifests = len(manifests.keys() - sheets.keys())
+
+    def path_for(self, key, extension='jpg'):
+        if len(key) != SPRITE_NAME_LENGTH or any(c not in '0123456789abcdef' for c in key):
+            return None
+        return os.path.join(self.root, f"{key}.{extension}")
+
+    def describe(self, images):
+        """Add ``sprite: {x, y, w, h}`` (or None) to each image and return the sheet's description"""
+        members = [image['thumbnail'].rsplit('/', 1)[-1] for image in images if image.get('thumbnail')]
+        if not members:
+            for image in images:
+                image['sprite'] = None
+            return None
+
+        key = sprite_key(members, self.tile)
+        columns, rows = sprite_layout(len(members))
+        width, height = self.tile
+        index = 0
+        for image in images:
+            if not image.get('thumbnail'):
+                image['sprite'] = None
+                continue
+            image['sprite'] = {
+                'x': (index % columns) * width,
+                'y': (index // columns) * height,
+                'w': width,
+                'h': height
+            }
+            index += 1
+
+        manifest_path = self.path_for(key, 'json')
+        try:
+            os.utime(manifest_path)  # Listed again: keep it ahead of manifests no page uses any more
+        except FileNotFoundError:
+            tmp_path = f"{manifest_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump({'tile': list(self.tile), 'columns': columns, 'members': members}, f)
+            os.replace(tmp_path, manifest_path)
+            with self.lock:
+                self.manifests += 1
+                over_limits = self._over_limits()
+            if over_limits:
+                self.enforce_limits()
+
+        return {
+            'url': f'/sprites/{key}.jpg',
+            'width': columns * width,
+            'height': rows * height,
+            'columns': columns,
+            'rows': rows,
+            'tile': list(self.tile)
+        }
+
+    def get(self, key):
+        """``(path, None)`` for a cached sheet, ``(None, jpeg_bytes)`` for one with missing tiles, or None if unknown"""
+        sheet_path = self.path_for(key)
+        if not sheet_path:
+            return None
+        with self.lock:
+            entry = self.rendering.setdefault(key, [threading.Lock(), 0])
+            entry[1] += 1
+        try:
+            with entry[0]:
+                if os.path.exists(sheet_path):
+                    os.utime(sheet_path)
+                    with self.lock:
+                        self.counters['hits'] += 1
+                    return sheet_path, None
+                return self._render(key, sheet_path)
+        finally:
+            with self.lock:
+                # Only the last waiter drops the lock; anyone still queued on it must keep sharing it
+                entry[1] -= 1
+                if not entry[1]:
+                    del self.rendering[key]
+
+    def _render(self, key, sheet_path):
+        try:
+            with open(self.path_for(key, 'json'), encoding='utf-8') as f:
+                manifest = json.load(f)
+        except (OSError, ValueError):
+            return None
+
+        width, height = manifest['tile']
+        columns = manifest['columns']
+        members = manifest['members']
+        rows = math.ceil(len(members) / columns)
+        sheet = Image.new('RGB', (columns * width, rows * height), (0, 0, 0))
+        missing = 0
+        for index, name in enumerate(members):
+            thumb_path = self.thumbnail_cache.lookup(name)
+            if not thumb_path:
+                missing += 1
+                continue
+            try:
+                with Image.open(thumb_path) as thumb:
+                    if thumb.size != (width, height):
+                        thumb = thumb.resize((width, height))
+                    sheet.paste(thumb.convert('RGB'), ((index % columns) * width, (index // columns) * height))
+            except Exception as e:
+                logging.warning(f"⚠️ Could not add {name} to sprite sheet: {e}")
+                missing += 1
+
+        if missing:
+            # Don't pin the gaps on disk; the page gets a new key once the thumbnails are regenerated
+            buffer = io.BytesIO()
+            sheet.save(buffer, 'JPEG', quality=SPRITE_QUALITY)
+            with self.lock:
+                self.counters['incomplete'] += 1
+            logging.info(f"🧩 Sprite sheet {key} is missing {missing} of {len(members)} thumbnails")
+            return None, buffer.getvalue()
+
+        tmp_path = f"{sheet_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        sheet.save(tmp_path, 'JPEG', quality=SPRITE_QUALITY, optimize=True)
+        os.replace(tmp_path, sheet_path)
+        with self.lock:
+            self.counters['rendered'] += 1
+            self.sheets += 1
+            self.manifests = max(0, self.manifests - 1)
+            over_limits = self._over_limits()
+        logging.info(f"🧩 Rendered sprite sheet {key} ({len(members)} thumbnails)")
+        if over_limits:
+            self.enforce_limits()
+        return sheet_path, None
+
+    def _scan(self):
+        """``({key: mtime} of sheets, {key: mtime} of manifests)`` on disk"""
+        found = {'jpg': {}, 'json': {}}
+        with os.scandir(self.root) as entries:
+            for entry in entries:
+                key, _, extension = entry.name.partition('.')
+                if extension in found and entry.is_file():
+                    found[extension][key] = entry.stat().st_mtime
+        return found['jpg'], found['json']
+
+    def _over_limits(self):
+        return bool((self.max_sheets and self.sheets > self.max_sheets) or
+                    (self.max_manifests and self.manifests > self.max_manifests))
+
+    def _delete(self, keys, extension):
+        for key in keys:
+            try:
+                os.remove(self.path_for(key, extension))
+            except OSError:
+                pass
+
+    def enforce_limits(self):
+        """Delete the least recently used sheets beyond ``max_sheets`` and unrendered manifests beyond ``max_manifests``"""
+        sheets, manifests = self._scan()
+        evicted = []
+        if self.max_sheets and len(sheets) > self.max_sheets:
+            keep = int(self.max_sheets * EVICTION_HEADROOM)
+            evicted = sorted(sheets, key=sheets.get)[:len(sheets) - keep]
+            self._delete(evicted, 'jpg')
+            for key in evicted:
+                del sheets[key]
+
+        unrendered = {key: mtime for key, mtime in manifests.items() if key not in sheets}
+        expired = []
+        if self.max_manifests and len(unrendered) > self.max_manifests:
+            keep = int(self.max_manifests * EVICTION_HEADROOM)
+            expired = sorted(unrendered, key=unrendered.get)[:len(unrendered) - keep]
+            self._delete(expired, 'json')
+
+        with self.lock:
+            self.sheets = len(sheets)
+            self.manifests = len(unrendered) - len(expired)
+            self.counters['evicted'] += len(evicted)
+            self.counters['manifests_evicted'] += len(expired)
+        if evicted or expired:
+            logging.info(f"🧹 Evicted {len(evicted)} sprite sheets and {len(expired)} unused page manifests")
+        return len(evicted) + len(expired)
+
+    def stats(self):
+        with self.lock:
+            return {'root': self.root, 'sheets': self.sheets, 'max_sheets': self.max_sheets,
+                    'manifests': self.manifests, 'max_manifests': self.max_manifests, **self.counters}
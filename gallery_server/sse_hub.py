@@ -0,0 +1,141 @@
+import asyncio
+import logging
+import threading
+
+KEEPALIVE_INTERVAL = 15  # Seconds between ':' comment frames on idle streams
+CLIENT_QUEUE_SIZE = 256  # Frames buffered per client before it is dropped as too slow
+WRITE_TIMEOUT = 10  # Seconds a single write may wait on a client's socket buffer
+
+class Subscriber:
+    def __init__(self, channel):
+        self.channel = channel
+        self.queue = asyncio.Queue(maxsize=CLIENT_QUEUE_SIZE)
+        self.task = None
+
+class SSEHub:
+    """Fans server-sent events out to many clients from one asyncio event loop
+
+    HTTP worker threads send the response headers and then hand the socket to
+    the hub with ``adopt()``, so an idle subscriber costs a coroutine and a small
+    queue instead of a blocked thread. ``publish()`` is safe to call from any
+    thread and never blocks: frames are queued per client on the loop, and a
+    client whose queue fills up (or whose socket stops draining) is disconnected
+    rather than allowed to hold up the publisher.
+    """
+
+    def __init__(self, max_clients=10000, keepalive=KEEPALIVE_INTERVAL):
+        self.max_clients = max_clients
+        self.keepalive = keepalive
+        self.lock = threading.Lock()
+        self.clients = 0
+        self.counts = {}
+        self.published = 0
+        self.dropped = 0
+        self.rejected = 0
+        self.channels = {}  # channel -> set of Subscriber; only touched on the loop thread
+
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self._run, daemon=True, name='sse-hub')
+        self.thread.start()
+
+    def _run(self):
+        asyncio.set_event_loop(self.loop)
+        self.loop.create_task(self._keepalive())
+        self.loop.run_forever()
+
+    def reserve(self):
+        """Claim a client slot before sending headers; False when the hub is full"""
+        with self.lock:
+            if self.clients >= self.max_clients:
+                self.rejected += 1
+                return False
+            self.clients += 1
+            return True
+
+    def release(self):
+        """Give back a slot from reserve() when the socket never reached adopt()"""
+        with self.lock:
+            self.clients = max(0, self.clients - 1)
+
+    def adopt(self, channel, sock, frames=()):
+        """Take over a connected socket (headers already sent) that reserve() made room for"""
+        asyncio.run_coroutine_threadsafe(self._serve(channel, sock, list(frames)), self.loop)
+
+    def publish(self, channel, frame):
+        """Queue one encoded SSE frame for every subscriber of ``channel``; returns the subscriber count"""
+        try:
+            self.loop.call_soon_threadsafe(self._fan_out, channel, frame)
+        except RuntimeError:
+            # Loop already closed during shutdown
+            return 0
+        with self.lock:
+            self.published += 1
+            return self.counts.get(channel, 0)
+
+    def _fan_out(self, channel, frame):
+        for subscriber in list(self.channels.get(channel, ())):
+            try:
+                subscriber.queue.put_nowait(frame)
+            except asyncio.QueueFull:
+                with self.lock:
+                    self.dropped += 1
+                subscriber.task.cancel()
+
+    async def _keepalive(self):
+        while True:
+            await asyncio.sleep(self.keepalive)
+            for channel in list(self.channels):
+                self._fan_out(channel, b":\n\n")
+
+    async def _serve(self, channel, sock, frames):
+        subscriber = Subscriber(channel)
+        subscriber.task = asyncio.current_task()
+        for frame in frames[-CLIENT_QUEUE_SIZE:]:
+            subscriber.queue.put_nowait(frame)
+        self.channels.setdefault(channel, set()).add(subscriber)
+        with self.lock:
+            self.counts[channel] = self.counts.get(channel, 0) + 1
+
+        writer = None
+        try:
+            _, writer = await asyncio.open_connection(sock=sock)
+            while True:
+                frame = await subscriber.queue.get()
+                writer.write(frame)
+                await asyncio.wait_for(writer.drain(), WRITE_TIMEOUT)
+        except (OSError, asyncio.TimeoutError):
+            pass
+        except Exception as e:
+            logging.error(f"SSE hub error on {channel}: {e}")
+        finally:
+            self.channels[channel].discard(subscriber)
+            with self.lock:
+                self.counts[channel] -= 1
+                self.clients -= 1
+            if writer:
+                writer.close()
+            else:
+                sock.close()
+
+    def stats(self):
+        with self.lock:
+            return {
+                'clients': self.clients,
+                'max_clients': self.max_clients,
+                'channels': dict(self.counts),
+                'published': self.published,
+                'dropped': self.dropped,
+                'rejected': self.rejected
+            }
+
+    def close(self):
+        async def cancel_all():
+            for subscribers in self.channels.values():
+                for subscriber in list(subscribers):
+                    subscriber.task.cancel()
+
+        try:
+            asyncio.run_coroutine_threadsafe(cancel_all(), self.loop).result(timeout=5)
+        except Exception as e:
+            logging.warning(f"⚠️ Error closing event streams: {e}")
+        self.loop.call_soon_threadsafe(self.loop.stop)
@@ -63,6 +63,7 @@ document.addEventListener('DOMContentLoaded', () => {
     }
     
     toggleView(preferredView);
+    subscribeToGalleryEvents();
     
     // Add click handler for workflow modal close
     document.getElementById('workflowModal').addEventListener('click', (event) => {
@@ -233,6 +234,124 @@ function escapeHtml(unsafe) {
         .replace(/'/g, "&#039;");
 }
 
+function subscribeToGalleryEvents() {
+    const events = new EventSource('/events');
+
+    // New, changed and removed images arrive as one coalesced batch per burst
+    events.onmessage = (event) => {
+        const data = JSON.parse(event.data);
+        const added = data.added || [];
+        const removed = data.removed || [];
+        if (!added.length && !removed.length) return;
+
+        if (!cachedImages.length) {
+            loadImages(true);
+            return;
+        }
+
+        // Check each cached path's ancestors against a set, so a bulk delete of thousands stays linear
+        const removedPaths = new Set(removed);
+        const isRemoved = path => {
+            for (let end = path.length; end > 0; end = path.lastIndexOf('/', end - 1)) {
+                if (removedPaths.has(path.slice(0, end))) return true;
+            }
+            return false;
+        };
+        const addedPaths = new Set(added.map(image => image.path));
+        cachedImages = added.concat(
+            cachedImages.filter(image => !addedPaths.has(image.path) && !isRemoved(image.path))
+        );
+
+        const searchInput = document.getElementById('searchInput');
+        const searchTerm = searchInput ? searchInput.value.toLowerCase() : '';
+        displayedImages = cachedImages.filter(image => image.name.toLowerCase().includes(searchTerm));
+        sortAndDisplayImages(true);
+    };
+
+    events.addEventListener('job', (event) => {
+        const job = JSON.parse(event.data);
+        const waiter = jobWaiters.get(job.id);
+        if (waiter) waiter(job);
+    });
+
+    // Thumbnails are generated in the background; swap them in as they land
+    events.addEventListener('thumbnail', (event) => {
+        const data = JSON.parse(event.data);
+        const cached = cachedImages.find(image => image.path === data.path);
+        if (cached) cached.thumbnail = data.thumbnail;
+
+        const card = document.querySelector(`.image-card[data-image-path="${CSS.escape(data.path)}"]`);
+        const current = card && card.querySelector('img.thumbnail, .thumbnail.placeholder');
+        if (current) {
+            const label = current.getAttribute('alt') || current.getAttribute('aria-label');
+            current.outerHTML = thumbnailMarkup({ thumbnail: data.thumbnail }, label);
+        }
+    });
+}
+
+const IMAGE_PAGE_SIZE = 200;
+
+// Listings are requested as parallel arrays with shared directory prefixes; expand them back into objects
+function fromColumns(table) {
+    if (!table || table.format !== 'columns') return table;
+    const fields = Object.keys(table.columns);
+    const prefixed = new Set(table.prefixed);
+    const rows = [];
+    for (let i = 0; i < table.count; i++) {
+        const row = {};
+        for (const field of fields) {
+            let value = table.columns[field][i];
+            if (prefixed.has(field) && typeof value === 'string') {
+                const split = value.indexOf(':');
+                value = table.prefixes[Number(value.slice(0, split))] + value.slice(split + 1);
+            }
+            row[field] = value;
+        }
+        rows.push(row);
+    }
+    return rows;
+}
+
+async function fetchPages(endpoint, key, onFirstPage, prepare) {
+    let items = [];
+    let cursor = null;
+    do {
+        const params = new URLSearchParams({ limit: IMAGE_PAGE_SIZE, format: 'columns' });
+        if (cursor) params.set('cursor', cursor);
+        const response = await fetch(`${endpoint}?${params}`);
+        if (!response.ok) throw new Error(`HTTP error! status: ${response.status}`);
+
+        const page = await response.json();
+        page[key] = fromColumns(page[key]);
+        if (prepare) prepare(page);
+        if (!cursor && onFirstPage) onFirstPage(page[key]);
+        items = items.concat(page[key]);
+        cursor = page.next_cursor;
+    } while (cursor);
+    return items;
+}
+
+// Each page comes with one sprite sheet holding all of its thumbnails. Sheet tiles are 1x, so
+// high-DPI screens keep per-card <img srcset> with the 2x/4x WebP variants instead
+function fetchImagePages(onFirstPage) {
+    if (window.devicePixelRatio > 1) {
+        return fetchPages('/api/images', 'images', onFirstPage);
+    }
+    return fetchPages('/api/sprites', 'images', onFirstPage, page => {
+        page.images.forEach(image => { image.sheet = image.sprite ? page.sheet : null; });
+    });
+}
+
+function spriteStyle(image) {
+    const { sheet, sprite } = image;
+    const column = sprite.x / sprite.w;
+    const row = sprite.y / sprite.h;
+    const x = sheet.columns > 1 ? column / (sheet.columns - 1) * 100 : 0;
+    const y = sheet.rows > 1 ? row / (sheet.rows - 1) * 100 : 0;
+    return `background-image: url('${sheet.url}'); background-size: ${sheet.columns * 100}% ${sheet.rows * 100}%; ` +
+           `background-position: ${x}% ${y}%;`;
+}
+
 async function loadImages(force = false) {
     const now = Date.now();
     if (!force && now - lastUpdateTime < UPDATE_INTERVAL) {
@@ -241,10 +360,13 @@ async function loadImages(force = false) {
 
     try {
         console.log('Loading images...');
-        const response = await fetch('/api/images');
-        if (!response.ok) throw new Error(`HTTP error! status: ${response.status}`);
-        
-        const fetchedImages = await response.json();
+        const fetchedImages = await fetchImagePages(firstPage => {
+            // Paint the newest page straight away on the initial load
+            if (!cachedImages.length && firstPage.length) {
+                displayedImages = [...firstPage];
+                sortAndDisplayImages(true);
+            }
+        });
         console.log(`Fetched ${fetchedImages.length} images`);
         
         if (force || imagesHaveChanged(cachedImages, fetchedImages)) {
@@ -268,10 +390,12 @@ async function loadTextFiles(force = false) {
 
     try {
         console.log('Loading text files...');
-        const response = await fetch('/api/text-files');
-        if (!response.ok) throw new Error(`HTTP error! status: ${response.status}`);
-        
-        const fetchedFiles = await response.json();
+        const fetchedFiles = await fetchPages('/api/text-files', 'files', firstPage => {
+            if (!cachedTextFiles.length && firstPage.length) {
+                displayedTextFiles = [...firstPage];
+                sortAndDisplayTextFiles(true);
+            }
+        });
         console.log(`Fetched ${fetchedFiles.length} text files`);
         
         if (force || filesHaveChanged(cachedTextFiles, fetchedFiles)) {
@@ -320,6 +444,22 @@ async function sortAndDisplayImages(clearGallery = false) {
     displayedImages = imagesToSort;
 }
 
+// Resized WebP variants for high-DPI screens; the server generates them on first use
+function thumbnailSrcset(thumbnail) {
+    return `${thumbnail}?size=256 1x, ${thumbnail}?size=512 2x, ${thumbnail}?size=1024 4x`;
+}
+
+// Until the background pool has made its thumbnail, a card shows a placeholder rather than the full-size original
+function thumbnailMarkup(image, label) {
+    if (image.sheet) {
+        return `<div class="thumbnail sprite" role="img" aria-label="${label}" style="${spriteStyle(image)}"></div>`;
+    }
+    if (image.thumbnail) {
+        return `<img class="thumbnail" src="${image.thumbnail}" srcset="${thumbnailSrcset(image.thumbnail)}" alt="${label}">`;
+    }
+    return `<div class="thumbnail placeholder" role="img" aria-label="${label}"></div>`;
+}
+
 function createImageCard(image, index) {
     const formattedName = formatFilename(image.name);
     const formattedDate = formatDate(image.date);
@@ -332,9 +472,7 @@ function createImageCard(image, index) {
     card.innerHTML = `
         <div class="card-content">
             <div class="image-container">
-                <img class="thumbnail" 
-                     src="${image.thumbnail || `/output/${image.path}`}" 
-                     alt="${formattedName}">
+                ${thumbnailMarkup(image, formattedName)}
             </div>
             <div class="image-info">
                 <div class="formatted-filename">${formattedName}</div>
@@ -1223,10 +1361,66 @@ function updateSelectionUI() {
 }
 
 // Update deletion functions for both images and text files
+// One request for the whole selection: the server streams a ZIP and the browser saves it as a download
+function downloadSelected() {
+    if (selectedImages.size === 0) {
+        showToast('No images selected');
+        return;
+    }
+
+    const form = document.createElement('form');
+    form.method = 'POST';
+    form.action = '/api/export';
+    form.style.display = 'none';
+    const field = document.createElement('input');
+    field.type = 'hidden';
+    field.name = 'selection';
+    field.value = JSON.stringify({ paths: Array.from(selectedImages) });
+    form.appendChild(field);
+    document.body.appendChild(form);
+    form.submit();
+    form.remove();
+    showToast(`Exporting ${selectedImages.size} images`);
+}
+
+// Bulk delete/move/archive run as a server-side job; progress arrives as 'job' events on /events
+const jobWaiters = new Map();
+
+async function runBulkJob(action, paths, onProgress, extra = {}) {
+    const response = await fetch('/api/bulk', {
+        method: 'POST',
+        headers: { 'Content-Type': 'application/json' },
+        body: JSON.stringify({ action, paths, ...extra })
+    });
+    if (!response.ok) throw new Error(`HTTP error! status: ${response.status}`);
+    const { job } = await response.json();
+
+    return new Promise(resolve => {
+        // Poll slowly as well, in case the event stream is down
+        const poll = setInterval(async () => {
+            try {
+                const status = await fetch(`/api/jobs/${job.id}`);
+                if (status.ok) settle(await status.json());
+            } catch (error) {
+                console.warn('Error polling job status:', error);
+            }
+        }, 5000);
+
+        function settle(update) {
+            if (onProgress) onProgress(update);
+            if (update.status === 'done' || update.status === 'failed') {
+                clearInterval(poll);
+                jobWaiters.delete(job.id);
+                resolve(update);
+            }
+        }
+        jobWaiters.set(job.id, settle);
+    });
+}
+
 async function deleteSelected() {
     const currentView = localStorage.getItem('preferredView') || 'image';
     const selectedItems = currentView === 'image' ? selectedImages : selectedTextFiles;
-    const apiEndpoint = currentView === 'image' ? 'images' : 'texts';
     
     if (selectedItems.size === 0) return;
     
@@ -1244,45 +1438,25 @@ async function deleteSelected() {
     deleteButton.innerHTML = `<span class="button-icon">⌛</span>Deleting...`;
     deleteButton.disabled = true;
 
-    const failedDeletes = [];
-    const successfulDeletes = [];
-    
     try {
-        // Process deletions
-        for (const path of selectedItems) {
-            try {
-                console.log(`Attempting to delete: ${path}`);
-                const response = await fetch(`/api/${apiEndpoint}/${encodeURIComponent(path)}`, {
-                    method: 'DELETE'
-                });
-                
-                if (response.ok) {
-                    console.log(`Successfully deleted: ${path}`);
-                    successfulDeletes.push(path);
-                } else {
-                    console.warn(`Failed to delete ${path}, status: ${response.status}`);
-                    failedDeletes.push(path);
-                }
-            } catch (fetchError) {
-                console.error(`Network error deleting ${path}:`, fetchError);
-                failedDeletes.push(path);
-            }
-        }
+        const job = await runBulkJob('delete', Array.from(selectedItems), update => {
+            deleteButton.innerHTML = `<span class="button-icon">⌛</span>Deleting ${update.done}/${update.total}...`;
+        });
+        const deleted = job.result.deleted || 0;
 
         // Show results
-        if (successfulDeletes.length > 0) {
-            if (failedDeletes.length > 0) {
-                showToast(`Successfully deleted ${successfulDeletes.length} items, ${failedDeletes.length} failed`);
-            } else {
-                showToast(`Successfully deleted ${successfulDeletes.length} items`);
-            }
-        } else if (failedDeletes.length > 0) {
-            showToast(`Failed to delete ${failedDeletes.length} items`);
+        if (job.status === 'failed') {
+            showToast(`Delete failed after ${deleted} items: ${job.error}`);
+        } else if (job.failed_count > 0) {
+            showToast(`Successfully deleted ${deleted} items, ${job.failed_count} failed`);
+        } else {
+            showToast(`Successfully deleted ${deleted} items`);
         }
-
     } catch (error) {
         console.error('Unexpected error during deletion process:', error);
         showToast('Unexpected error during deletion');
+        deleteButton.innerHTML = originalText;
+        deleteButton.disabled = false;
         return;
     }
 
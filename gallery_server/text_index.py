@@ -0,0 +1,159 @@
+import os
+import logging
+import sqlite3
+import threading
+import uuid
+from contextlib import contextmanager
+from datetime import datetime
+from image_catalog import DEFAULT_PAGE_SIZE, scan_files, keyset_page
+
+TEXT_EXTENSIONS = ('.txt', '.json', '.md')
+PREVIEW_LENGTH = 500  # Characters of each file kept for the text gallery cards
+
+def read_preview(full_path):
+    try:
+        with open(full_path, 'r', encoding='utf-8') as f:
+            content = f.read(PREVIEW_LENGTH + 1)
+        return content[:PREVIEW_LENGTH] + ('...' if len(content) > PREVIEW_LENGTH else '')
+    except Exception as e:
+        return f"Unable to read file content: {str(e)}"
+
+class TextFileIndex:
+    """Persistent index of the text outputs (LLM responses, prompts, metadata) under output/
+
+    Each row caches the file's preview, so listing only has to open files whose
+    (mtime, size) changed since the last sync or watcher event.
+    """
+
+    def __init__(self, db_path, output_dir):
+        self.output_dir = os.path.abspath(output_dir)
+        self.lock = threading.RLock()
+        self.conn = sqlite3.connect(db_path, check_same_thread=False)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('PRAGMA synchronous=NORMAL')
+        self.conn.execute('''
+            CREATE TABLE IF NOT EXISTS text_files (
+                path TEXT PRIMARY KEY,
+                name TEXT NOT NULL,
+                folder TEXT NOT NULL,
+                mtime REAL NOT NULL,
+                size INTEGER NOT NULL,
+                preview TEXT NOT NULL
+            )
+        ''')
+        self.conn.execute('CREATE INDEX IF NOT EXISTS idx_text_files_mtime ON text_files (mtime DESC, path)')
+        self.conn.execute('CREATE INDEX IF NOT EXISTS idx_text_files_folder ON text_files (folder, mtime DESC, path)')
+        self.conn.commit()
+
+        self.generation = uuid.uuid4().hex[:8]
+        self.version = 0
+
+    @contextmanager
+    def transaction(self):
+        with self.lock:
+            with self.conn:
+                yield self.conn
+            self.version += 1
+
+    def version_tag(self):
+        return f"{self.generation}-{self.version}"
+
+    def rel_path(self, full_path):
+        return os.path.relpath(full_path, self.output_dir).replace('\\', '/')
+
+    def full_path(self, rel_path):
+        return os.path.join(self.output_dir, rel_path)
+
+    def scan(self):
+        """Walk the output directory once, yielding (rel_path, mtime, size) per text file"""
+        return scan_files(self.output_dir, TEXT_EXTENSIONS)
+
+    def sync(self):
+        """Reconcile with the disk, reading previews only for new or changed files"""
+        with self.lock:
+            known = {row[0]: (row[1], row[2]) for row in
+                     self.conn.execute('SELECT path, mtime, size FROM text_files')}
+
+        changed = []
+        seen = set()
+        for rel_path, mtime, size in self.scan():
+            seen.add(rel_path)
+            if known.get(rel_path) != (mtime, size):
+                changed.append(self._row(rel_path, mtime, size))
+
+        removed = [path for path in known if path not in seen]
+
+        with self.transaction():
+            self.conn.executemany(
+                'INSERT OR REPLACE INTO text_files (path, name, folder, mtime, size, preview) VALUES (?, ?, ?, ?, ?, ?)',
+                changed
+            )
+            self.conn.executemany('DELETE FROM text_files WHERE path = ?', [(path,) for path in removed])
+
+        logging.info(f"📚 Text index synced: {len(seen)} files, {len(changed)} new or changed, {len(removed)} removed")
+        return [row[0] for row in changed]
+
+    def _row(self, rel_path, mtime, size):
+        folder, name = os.path.split(rel_path)
+        return (rel_path, name, folder, mtime, size, read_preview(self.full_path(rel_path)))
+
+    def upsert(self, full_path):
+        """Add or refresh a single text file, returning its index key"""
+        if not full_path.lower().endswith(TEXT_EXTENSIONS):
+            return None
+        try:
+            stat = os.stat(full_path)
+        except OSError:
+            return self.remove(full_path)
+
+        rel_path = self.rel_path(full_path)
+        with self.lock:
+            known = self.conn.execute('SELECT mtime, size FROM text_files WHERE path = ?', (rel_path,)).fetchone()
+        if known == (stat.st_mtime, stat.st_size):
+            return rel_path
+
+        row = self._row(rel_path, stat.st_mtime, stat.st_size)
+        with self.transaction():
+            self.conn.execute(
+                'INSERT OR REPLACE INTO text_files (path, name, folder, mtime, size, preview) VALUES (?, ?, ?, ?, ?, ?)',
+                row
+            )
+        return rel_path
+
+    def remove(self, full_path):
+        """Drop a file (or everything below a removed directory)"""
+        rel_path = self.rel_path(full_path)
+        prefix = rel_path.rstrip('/') + '/'
+        with self.transaction():
+            self.conn.execute('DELETE FROM text_files WHERE path = ? OR substr(path, 1, ?) = ?',
+                              (rel_path, len(prefix), prefix))
+        return None
+
+    def list_files(self):
+        """Every indexed file, newest first, in the /api/text-files format"""
+        with self.lock:
+            rows = self.conn.execute(
+                'SELECT path, name, mtime, size, preview FROM text_files ORDER BY mtime DESC, path'
+            ).fetchall()
+        return [self._entry(row) for row in rows]
+
+    def query_files(self, limit=DEFAULT_PAGE_SIZE, cursor=None, folder=None, since=None, until=None, name=None):
+        """One date-descending page of files plus the cursor for the next page (keyset, like the image catalog)"""
+        with self.lock:
+            rows, next_cursor = keyset_page(self.conn, 'text_files', 'path, name, mtime, size, preview', limit=limit,
+                                            cursor=cursor, folder=folder, since=since, until=until, name=name)
+        return [self._entry(row) for row in rows], next_cursor
+
+    def _entry(self, row):
+        path, name, mtime, size, preview = row
+        return {
+            'path': path,
+            'name': name,
+            'date': datetime.fromtimestamp(mtime).strftime('%Y-%m-%d %H:%M:%S'),
+            'preview': preview,
+            'size': size
+        }
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
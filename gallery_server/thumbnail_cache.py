@@ -0,0 +1,201 @@
+import os
+import re
+import time
+import logging
+import sqlite3
+import threading
+
+THUMBNAIL_NAME_PATTERN = re.compile(r'^([0-9a-f]{32})(_\d+\.(jpg|webp|avif)|\.jpg)$')
+THUMBNAIL_EXTENSIONS = ('.jpg', '.webp', '.avif')
+EVICTION_HEADROOM = 0.9  # Evict down to this fraction of the cap so we don't evict on every insert
+STRAY_GRACE_PERIOD = 3600  # Leave files touched this recently alone; a worker may still be reporting them
+ACCESS_FLUSH_BATCH = 256  # Hits buffered before their last_access times are written
+ACCESS_FLUSH_INTERVAL = 30  # Seconds; buffered hits older than this are written on the next hit
+
+def base_thumbnail(filename):
+    """The default thumbnail a variant belongs to (``<digest>_512.webp`` -> ``<digest>.jpg``)"""
+    match = THUMBNAIL_NAME_PATTERN.match(filename)
+    return match.group(1) + '.jpg' if match else filename
+
+class ThumbnailCache:
+    """Size-bounded, content-addressed thumbnail store with an on-disk LRU index
+
+    Thumbnails are named after a digest of their source image's bytes, so a
+    renamed or re-saved-but-identical image keeps its thumbnail. The index
+    (``index.db`` in the cache root) tracks size and last access per entry;
+    once ``max_bytes`` or ``max_entries`` is exceeded the least recently used
+    entries (default thumbnails and resized variants alike) are evicted and
+    ``on_evict(filenames)`` is called so callers can forget about them.
+
+    Entry and byte totals are read once at startup and kept in memory, so
+    recording a thumbnail never scans the index; hits are buffered and their
+    access times written in batches.
+    """
+
+    def __init__(self, root, max_bytes=0, max_entries=0, on_evict=None):
+        self.root = os.path.abspath(root)
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self.on_evict = on_evict
+        os.makedirs(self.root, exist_ok=True)
+
+        self.lock = threading.RLock()
+        self.conn = sqlite3.connect(os.path.join(self.root, 'index.db'), check_same_thread=False)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('PRAGMA synchronous=NORMAL')
+        self.conn.execute('''
+            CREATE TABLE IF NOT EXISTS entries (
+                name TEXT PRIMARY KEY,
+                size INTEGER NOT NULL,
+                created REAL NOT NULL,
+                last_access REAL NOT NULL
+            )
+        ''')
+        self.conn.execute('CREATE INDEX IF NOT EXISTS idx_entries_access ON entries (last_access)')
+        self.conn.commit()
+        self.entries, self.bytes = self.conn.execute('SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries').fetchone()
+        self.accessed = {}  # name -> last access not yet written to the index
+        self.last_flush = time.time()
+
+        self.counters = {'hits': 0, 'misses': 0, 'evictions': 0, 'collected': 0}
+
+    def path_for(self, filename):
+        """Absolute path for a cache filename, or None if the name is not one of ours"""
+        if not THUMBNAIL_NAME_PATTERN.match(filename):
+            return None
+        return os.path.join(self.root, filename)
+
+    def lookup(self, filename):
+        """Return the path of a cached thumbnail, recording the access, or None on a miss"""
+        path = self.path_for(filename)
+        if path and os.path.exists(path):
+            now = time.time()
+            with self.lock:
+                self.accessed[filename] = now
+                self.counters['hits'] += 1
+                if len(self.accessed) >= ACCESS_FLUSH_BATCH or now - self.last_flush >= ACCESS_FLUSH_INTERVAL:
+                    self.flush_access()
+            return path
+        with self.lock:
+            self.counters['misses'] += 1
+        return None
+
+    def record(self, filename, size, reused=False, count=True):
+        """Register a thumbnail written by a worker and enforce the size limits"""
+        now = time.time()
+        with self.lock:
+            previous = self.conn.execute('SELECT size FROM entries WHERE name = ?', (filename,)).fetchone()
+            with self.conn:
+                self.conn.execute(
+                    'INSERT INTO entries (name, size, created, last_access) VALUES (?, ?, ?, ?) '
+                    'ON CONFLICT(name) DO UPDATE SET size = excluded.size, last_access = excluded.last_access',
+                    (filename, size, now, now)
+                )
+            self.accessed.pop(filename, None)
+            if previous:
+                self.bytes += size - previous[0]
+            else:
+                self.entries += 1
+                self.bytes += size
+            if count:
+                self.counters['hits' if reused else 'misses'] += 1
+            over_limits = self._over_limits()
+        if over_limits:
+            self.enforce_limits()
+
+    def remove(self, filenames):
+        """Delete entries and their files"""
+        filenames = list(filenames)
+        with self.lock:
+            for name in filenames:
+                row = self.conn.execute('SELECT size FROM entries WHERE name = ?', (name,)).fetchone()
+                if row:
+                    self.entries -= 1
+                    self.bytes -= row[0]
+                self.accessed.pop(name, None)
+            with self.conn:
+                self.conn.executemany('DELETE FROM entries WHERE name = ?', [(name,) for name in filenames])
+        for name in filenames:
+            try:
+                os.remove(os.path.join(self.root, name))
+            except FileNotFoundError:
+                pass
+            except OSError as e:
+                logging.warning(f"⚠️ Could not remove thumbnail {name}: {e}")
+
+    def flush_access(self):
+        """Write buffered hits to the index so eviction sees them"""
+        with self.lock:
+            if self.accessed:
+                with self.conn:
+                    self.conn.executemany('UPDATE entries SET last_access = ? WHERE name = ?',
+                                          [(when, name) for name, when in self.accessed.items()])
+                self.accessed.clear()
+            self.last_flush = time.time()
+
+    def _over_limits(self):
+        return bool((self.max_entries and self.entries > self.max_entries) or
+                    (self.max_bytes and self.bytes > self.max_bytes))
+
+    def enforce_limits(self):
+        with self.lock:
+            if not self._over_limits():
+                return []
+            self.flush_access()
+            entries, total_bytes = self.entries, self.bytes
+
+            target_entries = int(self.max_entries * EVICTION_HEADROOM) if self.max_entries else entries
+            target_bytes = int(self.max_bytes * EVICTION_HEADROOM) if self.max_bytes else total_bytes
+            evicted = []
+            for name, size in self.conn.execute('SELECT name, size FROM entries ORDER BY last_access'):
+                if entries <= target_entries and total_bytes <= target_bytes:
+                    break
+                evicted.append(name)
+                entries -= 1
+                total_bytes -= size
+            self.remove(evicted)
+            self.counters['evictions'] += len(evicted)
+
+        logging.info(f"🧹 Evicted {len(evicted)} thumbnails from cache")
+        if evicted and self.on_evict:
+            self.on_evict(evicted)
+        return evicted
+
+    def collect_garbage(self, referenced):
+        """Remove entries no catalogued image uses any more, plus stray files not in the index"""
+        cutoff = time.time() - STRAY_GRACE_PERIOD
+        with self.lock:
+            self.flush_access()
+            indexed = {row[0]: row[1] for row in self.conn.execute('SELECT name, last_access FROM entries')}
+        orphans = [name for name, last_access in indexed.items()
+                   if base_thumbnail(name) not in referenced and last_access < cutoff]
+
+        stray = []
+        with os.scandir(self.root) as entries:
+            for entry in entries:
+                if (entry.is_file() and entry.name.endswith(THUMBNAIL_EXTENSIONS) and entry.name not in indexed
+                        and base_thumbnail(entry.name) not in referenced and entry.stat().st_mtime < cutoff):
+                    stray.append(entry.name)
+
+        self.remove(orphans + stray)
+        with self.lock:
+            self.counters['collected'] += len(orphans) + len(stray)
+        if orphans or stray:
+            logging.info(f"🧹 Collected {len(orphans)} orphaned and {len(stray)} untracked thumbnails")
+        return len(orphans) + len(stray)
+
+    def stats(self):
+        with self.lock:
+            return {
+                'root': self.root,
+                'entries': self.entries,
+                'bytes': self.bytes,
+                'max_entries': self.max_entries,
+                'max_bytes': self.max_bytes,
+                **self.counters
+            }
+
+    def close(self):
+        with self.lock:
+            self.flush_access()
+            self.conn.close()
@@ -0,0 +1,276 @@
+import os
+import logging
+import hashlib
+import threading
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeout
+from PIL import Image
+
+try:
+    import pillow_avif  # noqa: F401 - registers the AVIF plugin on older Pillow builds
+except ImportError:
+    pass
+
+THUMBNAIL_SIZE = (250, 250)  # Size for thumbnails
+THUMBNAIL_REDUCING_GAP = 2  # Decode/reduce to at most this multiple of the target before the LANCZOS pass
+PALETTE_BAND_ROWS = 64  # Output rows per band when expanding and reducing a palette image
+
+# On-demand variants: long-edge sizes (no letterbox) and output formats
+THUMBNAIL_VARIANT_SIZES = (128, 256, 512, 1024)
+VARIANT_TIMEOUT = 15  # Seconds a request waits for a variant before the default thumbnail is served instead
+VARIANT_FORMATS = {
+    'avif': ('AVIF', 'image/avif', {'quality': 60}),
+    'webp': ('WEBP', 'image/webp', {'quality': 80, 'method': 4}),
+    'jpeg': ('JPEG', 'image/jpeg', {'quality': 85, 'optimize': True}),
+}
+VARIANT_EXTENSIONS = {'avif': 'avif', 'webp': 'webp', 'jpeg': 'jpg'}
+Image.init()
+AVIF_SUPPORTED = 'AVIF' in Image.SAVE
+
+def thumbnail_filename(image_path):
+    """Content-addressed cache filename: a digest of the source image's bytes"""
+    digest = hashlib.blake2b(digest_size=16)
+    with open(image_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(chunk)
+    return digest.hexdigest() + '.jpg'
+
+def variant_filename(thumb_filename, edge, fmt):
+    """Cache filename of a resized variant of the thumbnail ``thumb_filename``"""
+    digest = thumb_filename.split('.')[0]
+    return f"{digest}_{edge}.{VARIANT_EXTENSIONS[fmt]}"
+
+def snap_variant_size(requested):
+    """Smallest supported long edge that covers the requested size"""
+    for edge in THUMBNAIL_VARIANT_SIZES:
+        if requested <= edge:
+            return edge
+    return THUMBNAIL_VARIANT_SIZES[-1]
+
+def choose_variant_format(requested, accept_header):
+    """Pick a variant format from ?format= or, failing that, the Accept header
+
+    Returns ``(fmt, negotiated)``; ``negotiated`` is True when the Accept header
+    decided, in which case responses must carry ``Vary: Accept``.
+    """
+    if requested:
+        requested = requested.lower().replace('jpg', 'jpeg')
+        if requested in VARIANT_FORMATS and (requested != 'avif' or AVIF_SUPPORTED):
+            return requested, False
+    accept = (accept_header or '').lower()
+    if AVIF_SUPPORTED and 'image/avif' in accept:
+        return 'avif', True
+    if 'image/webp' in accept:
+        return 'webp', True
+    return 'jpeg', True
+
+def open_reduced(img, size, reducing_gap=THUMBNAIL_REDUCING_GAP):
+    """Decode ``img`` at the smallest resolution that still covers ``reducing_gap * size``
+
+    JPEG is decoded directly at 1/2, 1/4 or 1/8 scale through ``Image.draft``.
+    PNG and WebP have no reduced decode in Pillow, so they are loaded once and
+    shrunk with an integer box ``reduce()`` before any other work is done on them.
+    Palette images can't be reduced directly, so they are expanded to RGBA one
+    band at a time and only the reduced bands are kept.
+    """
+    target = (size[0] * reducing_gap, size[1] * reducing_gap)
+    if img.format == 'JPEG':
+        img.draft('RGB', target)
+        img.load()
+        return img
+
+    img.load()
+    factor = min(img.width // target[0], img.height // target[1])
+    if img.mode == 'P':
+        if factor < 2:
+            return img.convert('RGBA')
+        reduced = Image.new('RGBA', (-(-img.width // factor), -(-img.height // factor)))
+        band = PALETTE_BAND_ROWS * factor
+        for top in range(0, img.height, band):
+            strip = img.crop((0, top, img.width, min(img.height, top + band)))
+            reduced.paste(strip.convert('RGBA').reduce(factor), (0, top // factor))
+        return reduced
+    if factor >= 2 and img.mode in ('L', 'LA', 'RGB', 'RGBA'):
+        img = img.reduce(factor)
+    return img
+
+def generate_thumbnail(image_path, cache_dir):
+    """Generate a thumbnail for an image and cache it
+
+    Returns ``(thumb_filename, size_in_bytes, reused)``, or None on failure.
+    """
+    try:
+        # Ensure thumbnail directory exists
+        os.makedirs(cache_dir, exist_ok=True)
+
+        # Thumbnails are keyed by content, so an existing file is always current
+        thumb_filename = thumbnail_filename(image_path)
+        thumb_path = os.path.join(cache_dir, thumb_filename)
+        if os.path.exists(thumb_path):
+            return thumb_filename, os.path.getsize(thumb_path), True
+
+        # Generate new thumbnail
+        with Image.open(image_path) as source:
+            # Decode at reduced scale; the mode conversion happens after resizing
+            img = open_reduced(source, THUMBNAIL_SIZE)
+
+            # Calculate aspect ratio
+            aspect = img.width / img.height
+            if aspect > 1:
+                new_width = THUMBNAIL_SIZE[0]
+                new_height = int(THUMBNAIL_SIZE[0] / aspect)
+            else:
+                new_height = THUMBNAIL_SIZE[1]
+                new_width = int(THUMBNAIL_SIZE[1] * aspect)
+
+            # Resize with proper aspect ratio
+            img.thumbnail((new_width, new_height), Image.Resampling.LANCZOS,
+                          reducing_gap=THUMBNAIL_REDUCING_GAP)
+
+            # Convert to RGB if necessary
+            if img.mode != 'RGB':
+                img = img.convert('RGB')
+
+            # Create background
+            thumb = Image.new('RGB', THUMBNAIL_SIZE, (0, 0, 0))
+            # Paste resized image centered
+            x = (THUMBNAIL_SIZE[0] - new_width) // 2
+            y = (THUMBNAIL_SIZE[1] - new_height) // 2
+            thumb.paste(img, (x, y))
+
+            # Save with optimization; write then rename so readers never see a partial file
+            tmp_path = f"{thumb_path}.{os.getpid()}.tmp"
+            thumb.save(tmp_path, 'JPEG', quality=85, optimize=True)
+            os.replace(tmp_path, thumb_path)
+            logging.info(f"Generated thumbnail: {thumb_path}")
+
+        return thumb_filename, os.path.getsize(thumb_path), False
+
+    except Exception as e:
+        logging.error(f"Error generating thumbnail for {image_path}: {str(e)}")
+        return None
+
+def generate_variant(image_path, cache_dir, thumb_filename, edge, fmt):
+    """Generate a long-edge ``edge`` variant in ``fmt``, returning ``(filename, size, reused)``"""
+    variant = variant_filename(thumb_filename, edge, fmt)
+    variant_path = os.path.join(cache_dir, variant)
+    if os.path.exists(variant_path):
+        return variant, os.path.getsize(variant_path), True
+
+    pil_format, _, save_options = VARIANT_FORMATS[fmt]
+    with Image.open(image_path) as source:
+        img = open_reduced(source, (edge, edge))
+        img.thumbnail((edge, edge), Image.Resampling.LANCZOS, reducing_gap=THUMBNAIL_REDUCING_GAP)
+
+        # Keep transparency where the format can carry it
+        keep_alpha = fmt != 'jpeg' and img.mode in ('RGBA', 'LA')
+        target_mode = 'RGBA' if keep_alpha else 'RGB'
+        if img.mode != target_mode:
+            img = img.convert(target_mode)
+
+        tmp_path = f"{variant_path}.{os.getpid()}.tmp"
+        img.save(tmp_path, pil_format, **save_options)
+        os.replace(tmp_path, variant_path)
+        logging.info(f"Generated {edge}px {fmt} variant: {variant_path}")
+
+    return variant, os.path.getsize(variant_path), False
+
+class VariantUnavailable(Exception):
+    """No worker slot was free for a variant, or it wasn't ready within VARIANT_TIMEOUT"""
+
+class ThumbnailPool:
+    """Generates thumbnails in worker processes, off the HTTP and watchdog threads
+
+    At most ``max_pending`` jobs are queued at once; submit() blocks beyond that so
+    a large backfill cannot grow the executor queue without bound (pass
+    ``block=False`` from request threads to skip instead). Requests for a path
+    that is already queued are coalesced. Finished thumbnails are registered with
+    ``cache`` and then ``on_done(rel_path, thumb_filename)`` runs on the
+    executor's callback thread.
+    """
+
+    def __init__(self, cache, workers=None, on_done=None, max_pending=None):
+        self.cache = cache
+        self.cache_dir = cache.root
+        self.workers = workers or os.cpu_count() or 1
+        self.on_done = on_done
+        self.executor = ProcessPoolExecutor(max_workers=self.workers)
+        self.slots = threading.BoundedSemaphore(max_pending or self.workers * 4)
+        self.pending = set()
+        self.lock = threading.Lock()
+
+    def submit(self, rel_path, full_path, block=True):
+        with self.lock:
+            if rel_path in self.pending:
+                return False
+            self.pending.add(rel_path)
+
+        if not self.slots.acquire(blocking=block):
+            with self.lock:
+                self.pending.discard(rel_path)
+            return False
+        try:
+            future = self.executor.submit(generate_thumbnail, full_path, self.cache_dir)
+        except Exception:
+            self._finish(rel_path)
+            raise
+        future.add_done_callback(lambda f: self._completed(rel_path, f))
+        return True
+
+    def _completed(self, rel_path, future):
+        self._finish(rel_path)
+        try:
+            result = future.result()
+        except Exception as e:
+            logging.error(f"Thumbnail worker failed for {rel_path}: {e}")
+            return
+        if not result:
+            return
+        thumb_filename, size, reused = result
+        try:
+            if self.on_done:
+                self.on_done(rel_path, thumb_filename)
+            self.cache.record(thumb_filename, size, reused)
+        except Exception as e:
+            logging.error(f"Error publishing thumbnail for {rel_path}: {e}")
+
+    def _finish(self, rel_path):
+        with self.lock:
+            self.pending.discard(rel_path)
+        self.slots.release()
+
+    def variant(self, full_path, thumb_filename, edge, fmt):
+        """Generate a variant on a worker and wait for it; returns its cache path
+
+        Variants share the ``slots`` bound with background thumbnails, so a
+        burst of requests can't hold every HTTP worker. Raises
+        VariantUnavailable when no slot is free or the wait times out; the job
+        keeps its slot until it really finishes and is still recorded then.
+        """
+        if not self.slots.acquire(blocking=False):
+            raise VariantUnavailable('Thumbnail workers are busy')
+        try:
+            future = self.executor.submit(generate_variant, full_path, self.cache_dir, thumb_filename, edge, fmt)
+        except Exception:
+            self.slots.release()
+            raise
+        future.add_done_callback(self._variant_completed)
+        try:
+            variant, _, _ = future.result(timeout=VARIANT_TIMEOUT)
+        except FutureTimeout:
+            raise VariantUnavailable(f"{edge}px {fmt} variant of {thumb_filename} not ready after {VARIANT_TIMEOUT}s")
+        return os.path.join(self.cache_dir, variant)
+
+    def _variant_completed(self, future):
+        self.slots.release()
+        try:
+            variant, size, reused = future.result()
+            self.cache.record(variant, size, reused, count=False)
+        except Exception as e:
+            logging.error(f"Thumbnail variant worker failed: {e}")
+
+    def queued(self):
+        with self.lock:
+            return len(self.pending)
+
+    def shutdown(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
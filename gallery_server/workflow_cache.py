@@ -0,0 +1,145 @@
+import os
+import json
+import time
+import threading
+from collections import OrderedDict
+from workflow_compiler import CompiledWorkflow
+
+WORKFLOW_CACHE_SIZE = 64  # Parsed workflows kept in memory
+REVALIDATE_INTERVAL = 1.0  # Seconds a cached entry is trusted before its file is stat()ed again
+
+class CachedWorkflow:
+    """A parsed workflow file plus the lookups every request needs"""
+
+    def __init__(self, path, stat, workflow):
+        self.path = path
+        self.signature = (stat.st_mtime_ns, stat.st_size)
+        self.checked_at = time.monotonic()
+        self.workflow = workflow
+        nodes = workflow.get('nodes', []) if isinstance(workflow, dict) else []
+        self.node_index = {str(node.get('id')): i for i, node in enumerate(nodes)}
+        # The /api/workflow-parameters payload
+        self.parameters = {
+            str(node.get('id')): {
+                'title': node.get('type', 'Unnamed Node'),
+                'widgets_values': node['widgets_values']
+            }
+            for node in nodes if 'widgets_values' in node
+        }
+        self._compiled = None
+
+    @property
+    def compiled(self):
+        """The API prompt template, compiled on first use and reused until the file changes"""
+        if self._compiled is None:
+            self._compiled = CompiledWorkflow(self.workflow)
+        return self._compiled
+
+    def with_parameters(self, parameters):
+        """Copy of the workflow with ``{node_id: {'widgets_values': ...}}`` applied
+
+        Only the overridden nodes (and the node list) are copied; everything
+        else is shared with the cached parse, which must never be mutated.
+        """
+        if not parameters or 'nodes' not in self.workflow:
+            return self.workflow
+        nodes = list(self.workflow['nodes'])
+        for node_id, values in parameters.items():
+            index = self.node_index.get(str(node_id))
+            if index is None:
+                continue
+            widgets_values = values['widgets_values']
+            if not isinstance(widgets_values, list):
+                widgets_values = [widgets_values]
+            nodes[index] = dict(nodes[index], widgets_values=widgets_values)
+        return dict(self.workflow, nodes=nodes)
+
+class WorkflowCache:
+    """LRU cache of parsed workflow files, validated against the file's mtime and size
+
+    Request paths are resolved against the same candidate locations the gallery
+    has always searched, and the resolution is remembered too, so a repeated
+    run costs at most one stat() instead of four existence checks, a read and
+    a JSON parse.
+    """
+
+    def __init__(self, comfy_dir, max_entries=WORKFLOW_CACHE_SIZE):
+        self.comfy_dir = comfy_dir
+        self.max_entries = max_entries
+        self.entries = OrderedDict()  # resolved path -> CachedWorkflow
+        self.resolved = {}  # requested path -> resolved path
+        self.lock = threading.Lock()
+        self.counters = {'hits': 0, 'misses': 0, 'reloads': 0}
+
+    def candidates(self, workflow_path):
+        workflow_path = workflow_path.replace('/', os.path.sep).replace('\\', os.path.sep)
+        name = os.path.basename(workflow_path)
+        return [
+            os.path.join(self.comfy_dir, workflow_path),
+            os.path.join(self.comfy_dir, 'workflows', name),
+            os.path.join(self.comfy_dir, 'user', 'default', 'workflows', name),
+            os.path.join(self.comfy_dir, '.users', 'default', 'workflows', name)
+        ]
+
+    def resolve(self, workflow_path):
+        for path in self.candidates(workflow_path):
+            if os.path.isfile(path):
+                return path
+        return None
+
+    def get(self, workflow_path):
+        """Return the CachedWorkflow for a requested path, or None if no candidate exists"""
+        now = time.monotonic()
+        with self.lock:
+            full_path = self.resolved.get(workflow_path)
+            entry = self.entries.get(full_path) if full_path else None
+            if entry and now - entry.checked_at < REVALIDATE_INTERVAL:
+                self.entries.move_to_end(full_path)
+                self.counters['hits'] += 1
+                return entry
+
+        if entry:
+            try:
+                stat = os.stat(full_path)
+                if (stat.st_mtime_ns, stat.st_size) == entry.signature:
+                    with self.lock:
+                        entry.checked_at = now
+                        self.entries.move_to_end(full_path)
+                        self.counters['hits'] += 1
+                    return entry
+            except OSError:
+                pass
+
+        full_path = self.resolve(workflow_path)
+        if not full_path:
+            with self.lock:
+                self.resolved.pop(workflow_path, None)
+            return None
+        stat = os.stat(full_path)
+        with self.lock:
+            # Another spelling of a path we already parsed
+            entry = self.entries.get(full_path)
+            if entry and (stat.st_mtime_ns, stat.st_size) == entry.signature:
+                entry.checked_at = now
+                self.resolved[workflow_path] = full_path
+                self.entries.move_to_end(full_path)
+                self.counters['hits'] += 1
+                return entry
+
+        with open(full_path, 'r', encoding='utf-8') as f:
+            workflow = json.load(f)
+        entry = CachedWorkflow(full_path, stat, workflow)
+
+        with self.lock:
+            self.counters['reloads' if full_path in self.entries else 'misses'] += 1
+            self.resolved[workflow_path] = full_path
+            self.entries[full_path] = entry
+            self.entries.move_to_end(full_path)
+            while len(self.entries) > self.max_entries:
+                evicted, _ = self.entries.popitem(last=False)
+                self.resolved = {key: value for key, value in self.resolved.items() if value != evicted}
+        return entry
+
+    def stats(self):
+        with self.lock:
+            return {'entries': len(self.entries), 'max_entries': self.max_entries, **self.counters}
@@ -0,0 +1,119 @@
+import threading
+from collections import OrderedDict
+
+TEMPLATE_CACHE_SIZE = 64  # Compiled workflows kept by CompilerCache
+
+def link_fields(link):
+    """(id, from_node, from_slot, to_node, to_slot) for both the list and the dict link formats"""
+    if isinstance(link, dict):
+        return (link.get('id'), link.get('origin_id'), link.get('origin_slot'),
+                link.get('target_id'), link.get('target_slot'))
+    return link[0], link[1], link[2], link[3], link[4]
+
+def index_links(links):
+    """Index a workflow's links once, by link id and by (target node, target slot)"""
+    by_id = {}
+    by_target = {}
+    for link in links or []:
+        try:
+            link_id, from_node, from_slot, to_node, to_slot = link_fields(link)
+        except (IndexError, TypeError):
+            continue
+        source = [str(from_node), from_slot]
+        by_id[link_id] = source
+        by_target[(str(to_node), to_slot)] = source
+    return by_id, by_target
+
+def widget_inputs(widgets_values):
+    """API inputs for a node's widget values (``widget_<index>``, the naming prepare_prompt has always used)"""
+    if isinstance(widgets_values, dict):
+        return dict(widgets_values)
+    if not isinstance(widgets_values, list):
+        widgets_values = [widgets_values]
+    return {f"widget_{i}": value for i, value in enumerate(widgets_values)}
+
+class CompiledWorkflow:
+    """A UI workflow compiled to the API prompt format, ready to be re-rendered with new widget values
+
+    Links are resolved once at compile time; ``render`` only rebuilds the input
+    dicts of nodes whose widget values are overridden and shares the rest.
+    """
+
+    def __init__(self, workflow):
+        self.prompt = {}
+        self.widget_keys = {}
+        nodes = workflow.get('nodes', []) if isinstance(workflow, dict) else []
+        by_id, by_target = index_links(workflow.get('links') if isinstance(workflow, dict) else None)
+
+        for node in nodes:
+            node_id = str(node.get('id'))
+            inputs = {}
+            widgets = widget_inputs(node['widgets_values']) if 'widgets_values' in node else {}
+            self.widget_keys[node_id] = tuple(widgets)
+            inputs.update(widgets)
+
+            for slot, input_data in enumerate(node.get('inputs') or []):
+                if not isinstance(input_data, dict):
+                    continue
+                link_id = input_data.get('link')
+                if link_id is None:
+                    continue
+                source = by_id.get(link_id) or by_target.get((node_id, slot))
+                if source:
+                    inputs[input_data.get('name', f"input_{slot}")] = source
+
+            self.prompt[node_id] = {
+                'class_type': node.get('type'),
+                'inputs': inputs
+            }
+
+    def render(self, parameters=None):
+        """The prompt dict with ``{node_id: {'widgets_values': ...}}`` applied
+
+        Untouched nodes are shared with the template, so callers must treat the
+        result as read-only (serialising it is fine).
+        """
+        prompt = dict(self.prompt)
+        for node_id, values in (parameters or {}).items():
+            node_id = str(node_id)
+            node = prompt.get(node_id)
+            if node is None:
+                continue
+            stale = self.widget_keys[node_id]
+            inputs = widget_inputs(values['widgets_values'])
+            # Linked inputs keep precedence over widget values, as at compile time
+            inputs.update((key, value) for key, value in node['inputs'].items() if key not in stale)
+            prompt[node_id] = dict(node, inputs=inputs)
+        return prompt
+
+    def override(self, values, parameters=None):
+        """Like ``render`` but with single inputs set: ``{node_id: {'widget_0': 42, 'text': '...'}}``"""
+        prompt = self.render(parameters)
+        for node_id, inputs in (values or {}).items():
+            node_id = str(node_id)
+            node = prompt.get(node_id)
+            if node is None:
+                raise KeyError(f"Node {node_id} is not in the workflow")
+            prompt[node_id] = dict(node, inputs=dict(node['inputs'], **inputs))
+        return prompt
+
+class CompilerCache:
+    """Small LRU of compiled workflows keyed by the caller's own (path, signature) key"""
+
+    def __init__(self, max_entries=TEMPLATE_CACHE_SIZE):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key, workflow):
+        with self.lock:
+            compiled = self.entries.get(key)
+            if compiled is not None:
+                self.entries.move_to_end(key)
+                return compiled
+        compiled = CompiledWorkflow(workflow)
+        with self.lock:
+            self.entries[key] = compiled
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+        return compiled
@@ -0,0 +1,85 @@
+import os
+import time
+import logging
+import zipfile
+
+EXPORT_CHUNK_SIZE = 1024 * 1024  # Bytes read per file read and sent per HTTP chunk
+ZIP_EPOCH = (1980, 1, 1, 0, 0, 0)  # Earliest timestamp a ZIP entry can carry
+
+class ChunkedWriter:
+    """Write-only file object that frames everything as HTTP/1.1 chunked transfer encoding
+
+    zipfile only needs ``write``/``flush`` (and ``tell``, which it emulates for
+    unseekable streams), so the archive goes straight to the socket. Small
+    writes (entry headers) are coalesced with the data that follows them.
+    With ``chunked=False`` the bytes are sent unframed, for HTTP/1.0 clients
+    that read the body until the connection closes.
+    """
+
+    def __init__(self, wfile, flush_size=EXPORT_CHUNK_SIZE, chunked=True):
+        self.wfile = wfile
+        self.flush_size = flush_size
+        self.chunked = chunked
+        self.buffer = bytearray()
+
+    def write(self, data):
+        self.buffer += data
+        if len(self.buffer) >= self.flush_size:
+            self._send()
+        return len(data)
+
+    def _send(self):
+        if self.buffer:
+            if self.chunked:
+                self.buffer[:0] = b'%x\r\n' % len(self.buffer)
+                self.buffer += b'\r\n'
+            self.wfile.write(self.buffer)
+            self.buffer = bytearray()
+
+    def flush(self):
+        self._send()
+        self.wfile.flush()
+
+    def close(self):
+        """Send what is buffered and the terminating zero-length chunk"""
+        self._send()
+        if self.chunked:
+            self.wfile.write(b'0\r\n\r\n')
+        self.wfile.flush()
+
+def zip_timestamp(mtime):
+    return max(ZIP_EPOCH, time.localtime(mtime)[:6])
+
+def stream_zip(fileobj, entries, on_entry=None):
+    """Write ``(arcname, full_path)`` pairs to ``fileobj`` as a stored (uncompressed) ZIP
+
+    Only one file's chunk is held in memory at a time; sizes are taken from the
+    open file so ZIP64 records are used exactly when needed. Files that vanish
+    before they are reached are skipped; ``on_entry(arcname, full_path)`` is
+    called for every file that was written. Returns ``(files, bytes)`` archived.
+    """
+    files = total = 0
+    with zipfile.ZipFile(fileobj, 'w', compression=zipfile.ZIP_STORED, allowZip64=True) as archive:
+        for arcname, full_path in entries:
+            try:
+                source = open(full_path, 'rb')
+            except OSError as e:
+                logging.warning(f"⚠️ Skipping {arcname} in export: {e}")
+                continue
+            with source:
+                stat = os.fstat(source.fileno())
+                info = zipfile.ZipInfo(arcname, date_time=zip_timestamp(stat.st_mtime))
+                info.compress_type = zipfile.ZIP_STORED
+                info.file_size = stat.st_size
+                info.external_attr = 0o644 << 16
+                with archive.open(info, 'w', force_zip64=stat.st_size >= zipfile.ZIP64_LIMIT) as target:
+                    while True:
+                        chunk = source.read(EXPORT_CHUNK_SIZE)
+                        if not chunk:
+                            break
+                        target.write(chunk)
+                files += 1
+                total += stat.st_size
+            if on_entry:
+                on_entry(arcname, full_path)
+    return files, total
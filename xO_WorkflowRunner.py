@@ -1,7 +1,38 @@
 import os
+import json
+import itertools
+import threading
+import requests
+from concurrent.futures import ThreadPoolExecutor
 from .xO_comfyui_api import ComfyUIAPI
+from .gallery_server.backend_pool import BackendPool, parse_backends, MAX_SUBMIT_ATTEMPTS
 import time
 
+def expand_sweep(sweep):
+    """Turn a sweep spec into a list of ``{node_id: {input: value}}`` overrides
+
+    A JSON list is taken as-is, one entry per run. A JSON object is a grid
+    (``{"3": {"widget_0": [1, 2, 3]}, "6": {"text": ["a", "b"]}}``) and expands
+    to the cartesian product of every listed value.
+    """
+    spec = json.loads(sweep) if isinstance(sweep, str) else sweep
+    if isinstance(spec, list):
+        return spec
+    if not isinstance(spec, dict):
+        raise ValueError("Sweep must be a JSON list of overrides or an object of value lists")
+    axes = []
+    for node_id, inputs in spec.items():
+        for input_name, values in inputs.items():
+            values = values if isinstance(values, list) else [values]
+            axes.append([(str(node_id), input_name, value) for value in values])
+    variants = []
+    for combination in itertools.product(*axes):
+        variant = {}
+        for node_id, input_name, value in combination:
+            variant.setdefault(node_id, {})[input_name] = value
+        variants.append(variant)
+    return variants
+
 class xO_WorkflowRunner:
     def __init__(self):
         self.api = None
@@ -15,6 +46,11 @@ class xO_WorkflowRunner:
                 "run": ("BOOLEAN", {"default": False}),
                 "open_browser": ("BOOLEAN", {"default": True}),
             },
+            "optional": {
+                "sweep": ("STRING", {"default": "", "multiline": True}),
+                "max_in_flight": ("INT", {"default": 4, "min": 1, "max": 64, "step": 1}),
+                "backends": ("STRING", {"default": ""}),
+            },
         }
 
     RETURN_TYPES = ("STRING",)
@@ -22,10 +58,13 @@ class xO_WorkflowRunner:
     CATEGORY = "💦xObiomesh/Utils🛠"
     TITLE = "🔄 Workflow Runner"
 
-    def run_workflow(self, workflow_path, port, run, open_browser):
+    def run_workflow(self, workflow_path, port, run, open_browser, sweep="", max_in_flight=4, backends=""):
         if not run:
             return ("Set 'run' to True to execute workflow",)
 
+        if (sweep and sweep.strip()) or (backends and backends.strip()):
+            return self.run_sweep(workflow_path, port, sweep.strip() or "[{}]", max_in_flight, backends)
+
         try:
             print(f"\n{'='*50}")
             print(f"Starting workflow execution on port {port}")
@@ -78,4 +117,108 @@ class xO_WorkflowRunner:
         except Exception as e:
             error_msg = f"Error running workflow: {str(e)}"
             print(f"ERROR: {error_msg}")
-            return (error_msg,) 
\ No newline at end of file
+            return (error_msg,)
+        finally:
+            if self.api:
+                self.api.close() 
+
+    def run_sweep(self, workflow_path, port, sweep, max_in_flight, backends=""):
+        """Queue every variant of one compiled workflow, keeping up to ``max_in_flight`` on the backends
+
+        With ``backends`` (e.g. ``"8188,8190-8199"``) each variant goes to the
+        live instance with the shortest queue and is resubmitted elsewhere if
+        that instance dies; otherwise everything runs on ``port``.
+        """
+        pool = None
+        apis = {}
+        try:
+            if not os.path.exists(workflow_path):
+                return (f"Workflow file not found: {workflow_path}",)
+            variants = expand_sweep(sweep)
+            if not variants:
+                return ("Sweep produced no variants",)
+
+            print(f"\n{'='*50}")
+            self.api = ComfyUIAPI(port=port)
+            if backends and backends.strip():
+                pool = BackendPool(parse_backends(backends)).start()
+                stats = pool.stats()
+                print(f"Starting sweep of {len(variants)} variants on {stats['alive']}/{len(stats['backends'])} "
+                      f"live backends ({max_in_flight} in flight)")
+            else:
+                print(f"Starting sweep of {len(variants)} variants on port {port} ({max_in_flight} in flight)")
+                self.api.check_connection()
+                apis[self.api.base_url] = self.api
+
+            # Links are resolved once; each variant only swaps the overridden inputs
+            compiled = self.api.compile(self.api.read_workflow(workflow_path))
+            prompts = [compiled.override(variant) for variant in variants]
+            apis_lock = threading.Lock()
+
+            def backend_api(backend):
+                with apis_lock:
+                    if backend.url not in apis:
+                        apis[backend.url] = ComfyUIAPI(backend.host, backend.port)
+                    return apis[backend.url]
+
+            def run_on(api, prompt, abort=None):
+                prompt_id = api.submit_prompt(prompt)['prompt_id']
+                history = api.wait_for_prompt(prompt_id, abort=abort)
+                return prompt_id, api.get_images(history)
+
+            def run_variant(index):
+                if pool is None:
+                    try:
+                        return (index, *run_on(self.api, prompts[index]), None)
+                    except Exception as e:
+                        return index, None, [], str(e)
+                tried = set()
+                error = None
+                for _ in range(MAX_SUBMIT_ATTEMPTS):
+                    try:
+                        backend = pool.acquire(exclude=tried)
+                    except Exception as e:
+                        return index, None, [], str(error or e)
+                    tried.add(backend.url)
+                    try:
+                        prompt_id, images = run_on(backend_api(backend), prompts[index],
+                                                   abort=lambda: not backend.alive)
+                        pool.release(backend)
+                        return index, f"{prompt_id} @ {backend.url}", images, None
+                    except (ConnectionError, requests.exceptions.ConnectionError) as e:
+                        # The backend died: try the variant again on another one
+                        pool.mark_down(backend)
+                        error = e
+                        print(f"Backend {backend.url} failed, resubmitting variant {index}: {str(e)}")
+                    except Exception as e:
+                        pool.release(backend)
+                        return index, None, [], str(e)
+                return index, None, [], str(error)
+
+            started = time.time()
+            with ThreadPoolExecutor(max_workers=max(1, max_in_flight)) as executor:
+                results = list(executor.map(run_variant, range(len(variants))))
+            elapsed = time.time() - started
+
+            failed = sum(1 for result in results if result[3])
+            lines = [f"Sweep finished: {len(results) - failed}/{len(results)} succeeded in {elapsed:.1f}s"]
+            for index, prompt_id, images, error in results:
+                lines.append(f"[{index}] {json.dumps(variants[index])}")
+                if error:
+                    lines.append(f"    ERROR: {error}")
+                else:
+                    lines.append(f"    prompt {prompt_id}: " + (", ".join(images) if images else "no images"))
+            print(f"{'='*50}\n")
+            return ("\n".join(lines),)
+
+        except Exception as e:
+            error_msg = f"Error running sweep: {str(e)}"
+            print(f"ERROR: {error_msg}")
+            return (error_msg,)
+        finally:
+            for api in apis.values():
+                api.close()
+            if self.api:
+                self.api.close()
+            if pool:
+                pool.close()
@@ -1,27 +1,74 @@
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+import asyncio
 import json
 import time
 import os
 import webbrowser
 import base64
+import uuid
+import threading
+from .xO_comfyui_ws import ComfyUIEvents
+from .gallery_server.workflow_compiler import CompiledWorkflow, CompilerCache
+
+# Compiled prompt templates shared by every ComfyUIAPI instance, keyed by workflow file and mtime
+compiled_workflows = CompilerCache()
+
+CONNECT_TIMEOUT = 5  # Seconds to establish a connection to ComfyUI
+READ_TIMEOUT = 30  # Seconds to wait for any single response
+POOL_SIZE = 64  # Keep-alive connections per backend (covers the sweep's max_in_flight)
+RETRIES = 3
+RETRY_BACKOFF = 0.3  # 0.3 s, 0.6 s, 1.2 s between attempts
+
+def create_session(retries=RETRIES, backoff=RETRY_BACKOFF, pool_size=POOL_SIZE):
+    """Keep-alive session that retries refused connections for every method,
+    but only retries GETs once a request may have reached the server, so a
+    prompt is never queued twice"""
+    retry = Retry(
+        total=retries,
+        connect=retries,
+        read=retries,
+        status=retries,
+        backoff_factor=backoff,
+        status_forcelist=(502, 503, 504),
+        allowed_methods=frozenset({"GET", "HEAD"}),
+        raise_on_status=False
+    )
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+    session = requests.Session()
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
 
 class ComfyUIAPI:
-    def __init__(self, host="127.0.0.1", port=8188):
+    def __init__(self, host="127.0.0.1", port=8188, timeout=(CONNECT_TIMEOUT, READ_TIMEOUT), session=None):
+        self.host = host
+        self.port = port
         self.base_url = f"http://{host}:{port}"
+        self.client_id = f"xObiomesh-{uuid.uuid4().hex[:12]}"
+        self.events = None
+        self.events_lock = threading.Lock()
+        self.workflow_data = None
+        self.workflow_key = None
+        self.timeout = timeout
+        self.session = session or create_session()
         
     def check_connection(self, max_retries=30, retry_delay=1):
         """Check if ComfyUI server is responding"""
         print(f"Checking connection to {self.base_url}")
-        for i in range(max_retries):
-            try:
-                response = requests.get(f"{self.base_url}/system_stats")
-                if response.status_code == 200:
-                    print("Successfully connected to ComfyUI server")
-                    return True
-                print(f"Attempt {i+1}/{max_retries}: Server not ready (status {response.status_code})")
-            except requests.exceptions.ConnectionError:
-                print(f"Attempt {i+1}/{max_retries}: Server not responding")
-            time.sleep(retry_delay)
+        # This loop is the retry policy; a probe without adapter retries keeps each attempt to one request
+        with create_session(retries=0, pool_size=1) as probe:
+            for i in range(max_retries):
+                try:
+                    response = probe.get(f"{self.base_url}/system_stats", timeout=self.timeout)
+                    if response.status_code == 200:
+                        print("Successfully connected to ComfyUI server")
+                        return True
+                    print(f"Attempt {i+1}/{max_retries}: Server not ready (status {response.status_code})")
+                except (requests.exceptions.ConnectionError, requests.exceptions.Timeout):
+                    print(f"Attempt {i+1}/{max_retries}: Server not responding")
+                time.sleep(retry_delay)
         raise Exception(f"Could not connect to ComfyUI server at {self.base_url} after {max_retries} attempts")
 
     def open_in_browser(self, workflow_data=None):
@@ -42,11 +89,19 @@ class ComfyUIAPI:
         except Exception as e:
             print(f"Warning: Could not open browser: {str(e)}")
 
+    def read_workflow(self, workflow_path):
+        """Parse a workflow file and remember it so its compiled template can be reused"""
+        stat = os.stat(workflow_path)
+        with open(workflow_path, 'r') as f:
+            workflow_data = json.load(f)
+        self.workflow_data = workflow_data
+        self.workflow_key = (os.path.abspath(workflow_path), stat.st_mtime_ns, stat.st_size)
+        return workflow_data
+
     def load_workflow(self, workflow_path):
         """Load a workflow from a JSON file"""
         try:
-            with open(workflow_path, 'r') as f:
-                workflow_data = json.load(f)
+            workflow_data = self.read_workflow(workflow_path)
             print(f"Successfully loaded workflow from {workflow_path}")
             
             # Convert workflow to API format
@@ -54,7 +109,7 @@ class ComfyUIAPI:
             
             # Load workflow via API
             url = f"{self.base_url}/load"
-            response = requests.post(url, json=api_data)
+            response = self.session.post(url, json=api_data, timeout=self.timeout)
             response.raise_for_status()
             
             print("Successfully loaded workflow via API")
@@ -63,44 +118,19 @@ class ComfyUIAPI:
         except Exception as e:
             raise Exception(f"Failed to load workflow: {str(e)}")
 
-    def prepare_prompt(self, workflow_data):
+    def compile(self, workflow_data):
+        """Compiled prompt template for a workflow (cached when it came from load_workflow)"""
+        if workflow_data is self.workflow_data and self.workflow_key:
+            return compiled_workflows.get(self.workflow_key, workflow_data)
+        return CompiledWorkflow(workflow_data)
+
+    def prepare_prompt(self, workflow_data, parameters=None):
         """Convert workflow data to API format"""
         try:
-            prompt = {}
-            
-            # Process nodes
-            for node in workflow_data.get("nodes", []):
-                node_id = str(node["id"])
-                node_data = {
-                    "class_type": node["type"],
-                    "inputs": {}
-                }
-                
-                # Handle inputs/links
-                if "inputs" in node:
-                    for input_data in node["inputs"]:
-                        input_name = input_data["name"]
-                        if "link" in input_data:
-                            # Find the corresponding link
-                            for link in workflow_data.get("links", []):
-                                if link[3] == node["id"] and link[4] == 0:  # Match target node and input index
-                                    source_node_id = str(link[1])
-                                    source_output_index = link[2]
-                                    node_data["inputs"][input_name] = [source_node_id, source_output_index]
-                                    break
-                
-                # Handle widget values
-                if "widgets_values" in node:
-                    for i, value in enumerate(node["widgets_values"]):
-                        node_data["inputs"][f"widget_{i}"] = value
-                
-                prompt[node_id] = node_data
-            
             return {
-                "prompt": prompt,
-                "client_id": "xObiomesh-workflow-runner"
+                "prompt": self.compile(workflow_data).render(parameters),
+                "client_id": self.client_id
             }
-            
         except Exception as e:
             raise Exception(f"Failed to prepare prompt: {str(e)}")
 
@@ -115,27 +145,45 @@ class ComfyUIAPI:
             print("Sending API data:")
             print(json.dumps(api_data, indent=2))
             
-            response = requests.post(url, json=api_data)
-            
-            # Print response details if there's an error
-            if response.status_code != 200:
-                print(f"Error response status: {response.status_code}")
-                print("Response headers:", dict(response.headers))
-                print("Response content:", response.text)
-                response.raise_for_status()
-                
-            prompt_data = response.json()
-            print(f"Successfully queued prompt with ID: {prompt_data.get('prompt_id')}")
-            return prompt_data
+            return self.submit_prompt(api_data["prompt"], client_id=api_data["client_id"])
             
         except Exception as e:
             raise Exception(f"Failed to queue prompt: {str(e)}")
 
+    def watch(self):
+        """Start listening on /ws so completions are pushed instead of polled (best effort)"""
+        with self.events_lock:
+            if self.events is None:
+                self.events = ComfyUIEvents(self.host, self.port, self.client_id)
+                if not self.events.wait_connected():
+                    print(f"Websocket not available on {self.base_url}, falling back to /history polling")
+            return self.events.connected.is_set()
+
+    def submit_prompt(self, prompt, client_id=None):
+        """POST an already compiled API prompt to the queue"""
+        # Listen before queueing so a fast prompt's completion message is not missed
+        self.watch()
+        url = f"{self.base_url}/prompt"
+        response = self.session.post(url, json={"prompt": prompt, "client_id": client_id or self.client_id},
+                                     timeout=self.timeout)
+        
+        # Print response details if there's an error
+        if response.status_code != 200:
+            print(f"Error response status: {response.status_code}")
+            print("Response headers:", dict(response.headers))
+            print("Response content:", response.text)
+            response.raise_for_status()
+            
+        prompt_data = response.json()
+        print(f"Successfully queued prompt with ID: {prompt_data.get('prompt_id')}")
+        return prompt_data
+
     def get_history(self, prompt_id):
         """Get the history/status of a prompt"""
         try:
-            url = f"{self.base_url}/history"
-            response = requests.get(url)
+            # Only this prompt's entry, not every prompt the server has run
+            url = f"{self.base_url}/history/{prompt_id}"
+            response = self.session.get(url, timeout=self.timeout)
             response.raise_for_status()
             history = response.json()
             return history.get(str(prompt_id))
@@ -146,36 +194,57 @@ class ComfyUIAPI:
         """Get current execution progress"""
         try:
             url = f"{self.base_url}/progress"
-            response = requests.get(url)
+            response = self.session.get(url, timeout=self.timeout)
             response.raise_for_status()
             return response.json()
         except Exception as e:
             print(f"Error getting progress: {str(e)}")
             return None
 
-    def wait_for_prompt(self, prompt_id, timeout=300):
-        """Wait for a prompt to complete"""
+    def wait_for_prompt(self, prompt_id, timeout=300, poll_interval=5, abort=None):
+        """Wait for a prompt to complete
+
+        Completion is pushed over the websocket; /history/{prompt_id} is still
+        checked every ``poll_interval`` seconds (every 0.25-1 s without a
+        websocket) in case the message was missed during a reconnect.
+        ``abort`` is polled as often and raises ConnectionError when it returns
+        True (e.g. the backend pool saw this instance die).
+        """
         print(f"Waiting for prompt {prompt_id} to complete (timeout: {timeout}s)")
-        start_time = time.time()
-        while time.time() - start_time < timeout:
+        deadline = time.time() + timeout
+        backoff = 0.25
+        while time.time() < deadline:
+            if abort and abort():
+                raise ConnectionError(f"{self.base_url} went away while running prompt {prompt_id}")
+            finished = None
+            if self.events and self.events.connected.is_set():
+                finished = self.events.wait(prompt_id, min(poll_interval, max(0, deadline - time.time())))
+            else:
+                time.sleep(min(backoff, max(0, deadline - time.time())))
+                backoff = min(backoff * 2, 1)
             try:
-                # Check progress
-                progress = self.get_progress()
-                if progress:
-                    print(f"Progress: {progress.get('value', 0)}% - {progress.get('text', 'Processing...')}")
-                
-                # Check history
+                if finished and finished[0] == 'error':
+                    message = finished[1].get('exception_message', 'execution failed')
+                    raise RuntimeError(f"Prompt {prompt_id} failed: {message}")
                 history = self.get_history(prompt_id)
                 if history and "outputs" in history:
                     print(f"Prompt {prompt_id} completed successfully")
                     return history
-                    
-                time.sleep(1)
+                if finished:
+                    # Reported finished but the history entry is not written yet
+                    time.sleep(0.25)
+            except RuntimeError:
+                raise
             except Exception as e:
                 print(f"Error checking prompt status: {str(e)}")
-                time.sleep(1)
         raise Exception(f"Timeout waiting for prompt completion after {timeout}s")
 
+    def close(self):
+        if self.events:
+            self.events.close()
+            self.events = None
+        self.session.close()
+
     def get_images(self, history_data):
         """Extract image paths from history data"""
         try:
@@ -189,4 +258,111 @@ class ComfyUIAPI:
                         print(f"Found image: {image_url}")
             return images
         except Exception as e:
-            raise Exception(f"Failed to extract images: {str(e)}")
\ No newline at end of file
+            raise Exception(f"Failed to extract images: {str(e)}")
+
+class AsyncComfyUIAPI:
+    """asyncio counterpart of ComfyUIAPI for driving many prompts from one process
+
+    HTTP calls run on the shared keep-alive session in worker threads, while
+    completions are awaited as futures resolved by the websocket listener, so
+    thousands of pending prompts cost no threads and no polling.
+    """
+
+    def __init__(self, host="127.0.0.1", port=8188, timeout=(CONNECT_TIMEOUT, READ_TIMEOUT), session=None):
+        self.api = ComfyUIAPI(host, port, timeout=timeout, session=session)
+        self.base_url = self.api.base_url
+        self.client_id = self.api.client_id
+        self.waiters = {}  # prompt_id -> [futures]
+        self.loop = None
+
+    async def check_connection(self, max_retries=30, retry_delay=1):
+        return await asyncio.to_thread(self.api.check_connection, max_retries, retry_delay)
+
+    def prepare_prompt(self, workflow_data, parameters=None):
+        return self.api.prepare_prompt(workflow_data, parameters)
+
+    async def watch(self):
+        self.loop = asyncio.get_running_loop()
+        connected = await asyncio.to_thread(self.api.watch)
+        if self._on_finished not in self.api.events.listeners:
+            self.api.events.listeners.append(self._on_finished)
+        return connected
+
+    async def submit_prompt(self, prompt, client_id=None):
+        await self.watch()
+        return await asyncio.to_thread(self.api.submit_prompt, prompt, client_id)
+
+    async def get_history(self, prompt_id):
+        return await asyncio.to_thread(self.api.get_history, prompt_id)
+
+    def get_images(self, history_data):
+        return self.api.get_images(history_data)
+
+    def _on_finished(self, prompt_id, status, data):
+        # Websocket thread -> event loop
+        if self.loop and prompt_id in self.waiters:
+            self.loop.call_soon_threadsafe(self._resolve, prompt_id, (status, data))
+
+    def _resolve(self, prompt_id, result):
+        for future in self.waiters.pop(prompt_id, []):
+            if not future.done():
+                future.set_result(result)
+
+    async def wait_for_prompt(self, prompt_id, timeout=300, poll_interval=5):
+        """Await a prompt's completion; /history/{prompt_id} is checked every ``poll_interval`` seconds as a fallback"""
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        future = loop.create_future()
+        self.waiters.setdefault(prompt_id, []).append(future)
+        try:
+            events = self.api.events
+            finished = events.finished.get(prompt_id) if events else None
+            while loop.time() < deadline:
+                if finished is None:
+                    connected = events is not None and events.connected.is_set()
+                    wait = min(poll_interval if connected else 1, max(0, deadline - loop.time()))
+                    if future.done():
+                        # Reported finished but the history entry is not written yet
+                        await asyncio.sleep(min(0.25, wait))
+                        finished = future.result()
+                    else:
+                        try:
+                            finished = await asyncio.wait_for(asyncio.shield(future), wait)
+                        except asyncio.TimeoutError:
+                            pass
+                if finished and finished[0] == 'error':
+                    message = finished[1].get('exception_message', 'execution failed')
+                    raise RuntimeError(f"Prompt {prompt_id} failed: {message}")
+                try:
+                    history = await self.get_history(prompt_id)
+                except Exception as e:
+                    print(f"Error checking prompt status: {str(e)}")
+                    history = None
+                if history and "outputs" in history:
+                    return history
+                finished = None
+            raise Exception(f"Timeout waiting for prompt completion after {timeout}s")
+        finally:
+            futures = self.waiters.get(prompt_id)
+            if futures and future in futures:
+                futures.remove(future)
+                if not futures:
+                    del self.waiters[prompt_id]
+
+    async def run_prompt(self, prompt, timeout=300):
+        """Queue one compiled prompt and return its history entry"""
+        prompt_id = (await self.submit_prompt(prompt))['prompt_id']
+        return await self.wait_for_prompt(prompt_id, timeout)
+
+    async def run_many(self, prompts, max_in_flight=8, timeout=300):
+        """Run prompts with at most ``max_in_flight`` on the backend; exceptions are returned in place"""
+        semaphore = asyncio.Semaphore(max(1, max_in_flight))
+
+        async def run(prompt):
+            async with semaphore:
+                return await self.run_prompt(prompt, timeout)
+
+        return await asyncio.gather(*(run(prompt) for prompt in prompts), return_exceptions=True)
+
+    async def close(self):
+        await asyncio.to_thread(self.api.close)
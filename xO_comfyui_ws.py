@@ -0,0 +1,227 @@
+import os
+import json
+import time
+import base64
+import socket
+import struct
+import hashlib
+import threading
+from collections import OrderedDict
+
+WS_GUID = "258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+CONNECT_TIMEOUT = 5
+READ_TIMEOUT = 30  # ComfyUI sends no pings; an idle read just loops
+RECONNECT_DELAY = 1
+MAX_RECONNECT_DELAY = 15
+FINISHED_HISTORY = 1000  # Completed prompt ids remembered for late waiters
+
+class WebSocketClosed(Exception):
+    pass
+
+class ComfyUIEvents:
+    """Listens on ComfyUI's ``/ws?clientId=`` stream and records when prompts finish
+
+    ComfyUI reports a prompt as done with an ``executing`` message whose node is
+    null (newer builds also send ``execution_success``), and as failed with
+    ``execution_error`` or ``execution_interrupted``. Those messages are only
+    sent to the client id the prompt was queued with, so prompts must be
+    submitted with ``self.client_id``. The listener reconnects on its own;
+    callers should still keep a slow fallback check for anything that finished
+    while it was disconnected.
+    """
+
+    def __init__(self, host, port, client_id):
+        self.host = host
+        self.port = port
+        self.client_id = client_id
+        self.finished = OrderedDict()  # prompt_id -> (status, data)
+        self.progress = {}  # prompt_id -> (value, max)
+        self.condition = threading.Condition()
+        self.listeners = []  # Called as listener(prompt_id, status, data) from the websocket thread
+        self.connected = threading.Event()
+        self.attempted = threading.Event()  # Set once the first connection attempt has succeeded or failed
+        self.closed = False
+        self.sock = None
+        self.buffer = b''
+        self.thread = threading.Thread(target=self._run, daemon=True, name=f"comfyui-ws-{port}")
+        self.thread.start()
+
+    def wait_connected(self, timeout=CONNECT_TIMEOUT):
+        self.attempted.wait(timeout)
+        return self.connected.is_set()
+
+    def wait(self, prompt_id, timeout):
+        """Block until the prompt finishes; returns (status, data) or None on timeout"""
+        deadline = time.monotonic() + timeout
+        with self.condition:
+            while prompt_id not in self.finished:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0 or self.closed:
+                    return None
+                self.condition.wait(remaining)
+            return self.finished[prompt_id]
+
+    def close(self):
+        self.closed = True
+        self.connected.clear()
+        if self.sock:
+            try:
+                self.sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+        with self.condition:
+            self.condition.notify_all()
+
+    def _run(self):
+        delay = RECONNECT_DELAY
+        while not self.closed:
+            try:
+                self._connect()
+                self.attempted.set()
+                delay = RECONNECT_DELAY
+                self._read_messages()
+            except Exception as e:
+                self.attempted.set()
+                if not self.closed and self.connected.is_set():
+                    print(f"ComfyUI websocket disconnected: {str(e)}")
+            finally:
+                self.connected.clear()
+                if self.sock:
+                    try:
+                        self.sock.close()
+                    except OSError:
+                        pass
+                    self.sock = None
+            if not self.closed:
+                time.sleep(delay)
+                delay = min(delay * 2, MAX_RECONNECT_DELAY)
+
+    def _connect(self):
+        sock = socket.create_connection((self.host, self.port), timeout=CONNECT_TIMEOUT)
+        key = base64.b64encode(os.urandom(16)).decode('ascii')
+        request = (
+            f"GET /ws?clientId={self.client_id} HTTP/1.1\r\n"
+            f"Host: {self.host}:{self.port}\r\n"
+            "Upgrade: websocket\r\n"
+            "Connection: Upgrade\r\n"
+            f"Sec-WebSocket-Key: {key}\r\n"
+            "Sec-WebSocket-Version: 13\r\n\r\n"
+        )
+        sock.sendall(request.encode('ascii'))
+
+        response = b''
+        while b'\r\n\r\n' not in response:
+            chunk = sock.recv(4096)
+            if not chunk:
+                raise WebSocketClosed("Connection closed during handshake")
+            response += chunk
+        head, self.buffer = response.split(b'\r\n\r\n', 1)
+        lines = head.decode('latin-1').split('\r\n')
+        status = lines[0].split()
+        if len(status) < 2 or status[1] != '101':
+            raise WebSocketClosed(f"Handshake refused: {lines[0]}")
+        expected = base64.b64encode(hashlib.sha1((key + WS_GUID).encode('ascii')).digest()).decode('ascii')
+        headers = {name.strip().lower(): value.strip() for name, _, value in (line.partition(':') for line in lines[1:])}
+        if headers.get('sec-websocket-accept') != expected:
+            raise WebSocketClosed("Handshake returned a bad Sec-WebSocket-Accept")
+
+        sock.settimeout(READ_TIMEOUT)
+        self.sock = sock
+        self.connected.set()
+
+    def _recv_exact(self, size):
+        while len(self.buffer) < size:
+            try:
+                chunk = self.sock.recv(65536)
+            except socket.timeout:
+                continue
+            if not chunk:
+                raise WebSocketClosed("Connection closed")
+            self.buffer += chunk
+        data, self.buffer = self.buffer[:size], self.buffer[size:]
+        return data
+
+    def _send_frame(self, opcode, payload=b''):
+        # Client frames must be masked (RFC 6455 5.3)
+        mask = os.urandom(4)
+        header = bytes([0x80 | opcode])
+        if len(payload) < 126:
+            header += bytes([0x80 | len(payload)])
+        elif len(payload) < 65536:
+            header += bytes([0x80 | 126]) + struct.pack('>H', len(payload))
+        else:
+            header += bytes([0x80 | 127]) + struct.pack('>Q', len(payload))
+        masked = bytes(b ^ mask[i % 4] for i, b in enumerate(payload))
+        self.sock.sendall(header + mask + masked)
+
+    def _read_frame(self):
+        first, second = self._recv_exact(2)
+        fin, opcode = first & 0x80, first & 0x0F
+        length = second & 0x7F
+        if length == 126:
+            length = struct.unpack('>H', self._recv_exact(2))[0]
+        elif length == 127:
+            length = struct.unpack('>Q', self._recv_exact(8))[0]
+        mask = self._recv_exact(4) if second & 0x80 else None
+        payload = self._recv_exact(length)
+        if mask:
+            payload = bytes(b ^ mask[i % 4] for i, b in enumerate(payload))
+        return fin, opcode, payload
+
+    def _read_messages(self):
+        message, message_opcode = b'', None
+        while not self.closed:
+            fin, opcode, payload = self._read_frame()
+            if opcode == 0x8:
+                try:
+                    self._send_frame(0x8, payload[:2])
+                except OSError:
+                    pass
+                raise WebSocketClosed("Server closed the websocket")
+            if opcode == 0x9:
+                self._send_frame(0xA, payload)
+                continue
+            if opcode == 0xA:
+                continue
+            if opcode != 0x0:
+                message, message_opcode = b'', opcode
+            message += payload
+            if not fin:
+                continue
+            # Binary frames are latent previews; only JSON text messages carry status
+            if message_opcode == 0x1:
+                try:
+                    self._handle(json.loads(message.decode('utf-8')))
+                except ValueError:
+                    pass
+            message, message_opcode = b'', None
+
+    def _handle(self, event):
+        kind = event.get('type')
+        data = event.get('data') or {}
+        prompt_id = data.get('prompt_id')
+        if not prompt_id:
+            return
+        if kind == 'progress':
+            self.progress[prompt_id] = (data.get('value', 0), data.get('max', 0))
+        elif kind == 'executing' and data.get('node') is None:
+            self._finish(prompt_id, 'success', data)
+        elif kind == 'execution_success':
+            self._finish(prompt_id, 'success', data)
+        elif kind in ('execution_error', 'execution_interrupted'):
+            self._finish(prompt_id, 'error', data)
+
+    def _finish(self, prompt_id, status, data):
+        with self.condition:
+            if prompt_id in self.finished and status == 'success':
+                return  # execution_success and the final executing message both arrive
+            self.finished[prompt_id] = (status, data)
+            while len(self.finished) > FINISHED_HISTORY:
+                self.finished.popitem(last=False)
+            self.progress.pop(prompt_id, None)
+            self.condition.notify_all()
+        for listener in list(self.listeners):
+            try:
+                listener(prompt_id, status, data)
+            except Exception as e:
+                print(f"Error in websocket listener: {str(e)}")